@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+#
+# harness.py - measure the performance of srtime's own hot paths
+#
+# Usage: python benchmarks/harness.py [-n <repeats>] [-k <substring>]
+#            [--full] [--save <file>] [--compare <file>]
+#            [--tolerance <fraction>]
+#
+# Times each hot path of the harness at several scales, and reports
+# its latency and throughput:
+#
+#   spawn/<backend>          spawning a null command
+#   output/<backend>/<n>     spawning a command which prints n lines,
+#                            which are decoded and passed to a hook
+#   print/<backend>/<n>      as output, but also printing the lines to
+#                            stdout, which is sent to /dev/null
+#   stats/<n>                constructing Stats from n samples
+#   format/<fmt>/<n>         formatting Stats of n samples, 100 times
+#
+# The largest scales (10M samples and 1M lines) are only run with
+# --full. Results can be saved to a file, and compared against a saved
+# baseline. If any case is significantly slower than the baseline by
+# more than the tolerance, the comparison fails with exit status 1.
+import argparse
+import json
+import os
+import random
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from srtime.spawn import BACKENDS, spawn
+from srtime.stats import FORMATS, Accumulator, Stats, ratiointerval
+
+
+SAMPLE_SCALES = [10, 1000, 100000, 1000000]
+LINE_SCALES = [0, 1000, 100000]
+FULL_SAMPLE_SCALES = SAMPLE_SCALES + [10000000]
+FULL_LINE_SCALES = LINE_SCALES + [1000000]
+# The number of calls per timed run of the format cases:
+FORMAT_CALLS = 100
+
+
+# Return a list of "n" samples, with the same seed every time.
+def samples(n):
+  rng = random.Random(n)
+  return [rng.gauss(1, 0.1) for _ in range(n)]
+
+
+# Call "fn" with stdout sent to /dev/null, both sys.stdout and the file
+# descriptor which children inherit, and return its result.
+def to_devnull(fn):
+  sys.stdout.flush()
+  saved = os.dup(1)
+  devnull = os.open(os.devnull, os.O_WRONLY)
+  try:
+    os.dup2(devnull, 1)
+    return fn()
+  finally:
+    sys.stdout.flush()
+    os.dup2(saved, 1)
+    os.close(saved)
+    os.close(devnull)
+
+
+# Return the benchmark cases, as a list of (name, items, fn) tuples,
+# where "fn" is the function which is timed, and "items" is the number
+# of items it processes, for reporting throughput.
+def cases(full=False):
+  sample_scales = FULL_SAMPLE_SCALES if full else SAMPLE_SCALES
+  line_scales = FULL_LINE_SCALES if full else LINE_SCALES
+
+  cases = []
+  for backend in BACKENDS:
+    cases.append(("spawn/" + backend, 1,
+                  lambda backend=backend: spawn("true", backend=backend,
+                                                quiet=True)))
+
+  for backend in BACKENDS:
+    for n in line_scales:
+      command = "seq {0}".format(n) if n else "true"
+      fn = (lambda command=command, backend=backend:
+            spawn(command, backend=backend, hook=lambda line: None,
+                  quiet=True))
+      cases.append(("output/{0}/{1}".format(backend, n), n, fn))
+
+  for backend in BACKENDS:
+    for n in line_scales:
+      if not n:
+        continue
+      command = "seq {0}".format(n)
+      fn = (lambda command=command, backend=backend:
+            to_devnull(lambda: spawn(command, backend=backend,
+                                     hook=lambda line: None)))
+      cases.append(("print/{0}/{1}".format(backend, n), n, fn))
+
+  for n in sample_scales:
+    l = samples(n)
+    cases.append(("stats/{0}".format(n), n, lambda l=l: Stats(l)))
+    # Formatting is too quick to time a single call:
+    stats = Stats(l)
+    for fmt in FORMATS:
+      fn = (lambda fmt=fmt, stats=stats:
+            [stats.format(fmt=fmt) for _ in range(FORMAT_CALLS)])
+      cases.append(("format/{0}/{1}".format(fmt, n), FORMAT_CALLS, fn))
+
+  return cases
+
+
+# Return an Accumulator of the times taken to run "fn" "repeats" times,
+# after a warmup run.
+def time_case(fn, repeats):
+  fn()
+  acc = Accumulator()
+  for _ in range(repeats):
+    start = perf_counter()
+    fn()
+    acc.push(perf_counter() - start)
+  return acc
+
+
+# Return a string of a time in seconds with an appropriate unit.
+def fmt_time(t):
+  for unit, scale in [("s", 1), ("ms", 1e3), ("us", 1e6)]:
+    if abs(t) >= 1 / scale:
+      return "{0:.2f} {1}".format(t * scale, unit)
+  return "{0:.2f} ns".format(t * 1e9)
+
+
+# Compare a result against its baseline, and return whether it
+# regressed. Both are Accumulators of the times of a case.
+def compare(name, result, baseline, tolerance):
+  speedup, c1, c2 = ratiointerval(baseline, result)
+  if speedup is None:
+    print("  {0}: not enough samples to compare".format(name))
+    return False
+
+  regressed = c2 < 1 / (1 + tolerance)
+  improved = c1 > 1 + tolerance
+  verdict = ("REGRESSED" if regressed else
+             "improved" if improved else "unchanged")
+  print("  {0}: {1:.3f}x ({2:.3f} - {3:.3f}) {4}"
+        .format(name, speedup, c1, c2, verdict))
+  return regressed
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description="Measure the performance of srtime's hot paths.")
+  parser.add_argument("-n", "--repeats", type=int, default=5)
+  parser.add_argument("-k", "--filter", default="",
+                      help="only run cases whose name contains this")
+  parser.add_argument("--full", action="store_true",
+                      help="include the largest scales")
+  parser.add_argument("--save", metavar="<file>",
+                      help="save the results to a file")
+  parser.add_argument("--compare", metavar="<file>",
+                      help="compare the results against a saved baseline")
+  parser.add_argument("--tolerance", type=float, default=0.1,
+                      help=("the fraction by which a case may be slower "
+                            "than the baseline before it fails"))
+  args = parser.parse_args()
+
+  baseline = {}
+  if args.compare:
+    with open(args.compare) as f:
+      baseline = json.load(f)
+
+  results = {}
+  for name, items, fn in cases(args.full):
+    if args.filter not in name:
+      continue
+    acc = time_case(fn, args.repeats)
+    results[name] = acc
+    c1, c2 = acc.confinterval()
+    line = "{0}: {1} ({2} - {3})".format(name, fmt_time(acc.mean),
+                                         fmt_time(c1), fmt_time(c2))
+    if items > 1:
+      line += ", {0:.3g} items/s".format(items / acc.mean)
+    print(line)
+    sys.stdout.flush()
+
+  if args.save:
+    with open(args.save, "w") as f:
+      json.dump(dict((name, {"n": acc.n, "mean": acc.mean, "m2": acc.m2,
+                             "min": acc.min, "max": acc.max})
+                     for name, acc in results.items()),
+                f, indent=2, sort_keys=True)
+
+  if args.compare:
+    print("Speedup relative to {0}:".format(args.compare))
+    regressions = []
+    for name, acc in results.items():
+      if name not in baseline:
+        print("  {0}: not in baseline".format(name))
+        continue
+      base = Accumulator()
+      for attr, value in baseline[name].items():
+        setattr(base, attr, value)
+      if compare(name, acc, base, args.tolerance):
+        regressions.append(name)
+
+    if regressions:
+      sys.stderr.write("\nPERFORMANCE REGRESSION: {0} of {1} cases are "
+                       "more than {2:.0%} slower than the baseline:\n"
+                       .format(len(regressions), len(results),
+                               args.tolerance))
+      for name in regressions:
+        sys.stderr.write("  {0}\n".format(name))
+      sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+#
+# startup.py - measure the time taken to start srtime
+#
+# Usage: python benchmarks/startup.py [-n <iterations>]
+#
+# Reports the time taken to import srtime, and to run it end-to-end
+# on a null command, in a fresh interpreter.
+import argparse
+import os
+import subprocess
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from srtime.stats import Stats
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CASES = [
+  ("import", "import srtime"),
+  ("main", ("import srtime; srtime.main(['-s', 'posix_spawn', "
+            "'-m', '1', '-t', '0', 'true'])")),
+]
+
+
+# Return the times taken to run "script" in a fresh interpreter.
+def time_script(script, iterations):
+  env = dict(os.environ, PYTHONPATH=ROOT)
+  times = []
+  for _ in range(iterations):
+    start = perf_counter()
+    subprocess.check_call([sys.executable, "-c", script], env=env,
+                          stdout=subprocess.DEVNULL,
+                          stderr=subprocess.DEVNULL)
+    times.append(perf_counter() - start)
+  return times
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Measure srtime startup time.")
+  parser.add_argument("-n", "--iterations", type=int, default=20)
+  args = parser.parse_args()
+
+  # Startup time without srtime, for reference:
+  cases = [("python", "pass")] + CASES
+  for name, script in cases:
+    stats = Stats(time_script(script, args.iterations))
+    print("{0}: {1:.1f} ms ({2:.1f} - {3:.1f})"
+          .format(name, stats.mean * 1000, stats.c1 * 1000, stats.c2 * 1000))
+
+
+if __name__ == "__main__":
+  main()
@@ -1,21 +1,22 @@
 import logging as log
 import sys
 
-import matplotlib.pyplot as plt
+from srtime.environment import cpu_frequency, preflight
 from srtime.exceptions import ProcessException
 from srtime.parser import ArgumentParser
-from srtime.stats import Stats
-from srtime.timer import Timer
+from srtime.stats import Stats, format_attrs, format_table
+from srtime.timer import Timer, calibrate
 
 
-# Plot and show a graph of the results for the given command.
-def graph(results, command):
-  plt.plot(range(1, len(results) + 1), results)
-  plt.suptitle(command, fontsize=16)
-  plt.xlabel('Iteration')
-  plt.ylabel('Execution time (ms)')
-  plt.xlim(1, len(results))
-  plt.show()
+# Config is only imported when it is used, since dataclasses and typing
+# are slow to import.
+def __getattr__(name):
+  if name == "Config":
+    from srtime.config import Config
+
+    return Config
+  raise AttributeError("module 'srtime' has no attribute '{0}'"
+                       .format(name))
 
 
 def run(options):
@@ -26,10 +27,16 @@ def run(options):
 # If no "args" are supplied, they will be taken from the process
 # environment.
 def main(args=None):
+  cache_control = None
+  # Whether the results are checked against a baseline, whose exit
+  # statuses are reserved for the verdicts:
+  checking = False
   # Get arguments from command line:
   try:
     parser = ArgumentParser()
     args = parser.parse_args(args)
+    cache_control = args.cache_control
+    checking = bool(args.baseline and args.check)
 
     # Set program verbosity:
     if args.verbose:
@@ -37,25 +44,136 @@ def main(args=None):
     else:
       log.basicConfig()
 
+    # Warn of CPU frequency scaling which adds variance to the times:
+    environment = args.environment
+    frequency = cpu_frequency(environment.cpus if environment else None)
+    for warning in preflight(frequency):
+      log.warning(warning)
+
+    # Run a suite of benchmarks, and print their results as a table:
+    if args.suite:
+      # Only import the suite module, and with it Config, when used:
+      from srtime.suite import Suite
+
+      suite = Suite(args.suite, args)
+      suite.run()
+      sys.stderr.write(suite.format(fmt=args.fmt, precision=args.precision))
+      return 0
+
+    # Find the baseline to check against before running:
+    if args.baseline:
+      # Only import the baseline module, which uses hashlib and json,
+      # when used:
+      from srtime.baseline import Baselines
+
+      baselines = Baselines(args.baseline_dir)
+      if args.check:
+        baselines.find(args.baseline)
+
     # Run timer:
-    results = run(args)
-    stats = Stats(results, confidence=args.confidence,
-                  threshold=args.threshold)
+    timer = Timer(args)
+    benchmarks = timer.benchmarks()
+
+    # Print results. Results are labelled with the command when
+    # comparing, the point when sweeping, and with the metric unless
+    # only the time is reported. A sweep in the csv or tsv format is
+    # printed as a single table, with a row per point and metric:
+    table = args.points and args.fmt.lower() in ["csv", "tsv"]
+    rows = []
+    for benchmark in benchmarks:
+      for metric in args.metrics:
+        # If every iteration timed out, only the time is reported:
+        if metric != "time" and not benchmark.accumulator(metric).n:
+          continue
+        if table:
+          row = list(benchmark.point.items())
+          if args.metrics != ["time"]:
+            row.append(("metric", metric))
+          rows.append(row + benchmark.stats(metric).items())
+          continue
 
-    # Print results:
-    sys.stderr.write(stats.format(fmt=args.fmt, precision=args.precision))
+        labels = []
+        if args.compare:
+          labels.append(benchmark.command)
+        if args.points:
+          labels.append(" ".join("{0}={1}".format(*param)
+                                 for param in benchmark.point.items()))
+        if args.metrics != ["time"]:
+          labels.append(metric)
+        stats = benchmark.stats(metric, name=": ".join(labels) or None)
+        sys.stderr.write(stats.format(fmt=args.fmt, precision=args.precision))
+    if table:
+      sys.stderr.write(format_table(rows, args.fmt, args.precision))
+
+    # Print comparisons:
+    for comparison in timer.comparisons():
+      sys.stderr.write(comparison.format(fmt=args.fmt,
+                                         precision=args.precision))
+
+    # Report the settings applied to the environment of the command,
+    # along with the CPU frequency scaling, since the variance of the
+    # results depends on them:
+    if environment:
+      sys.stderr.write("Environment:\n")
+      sys.stderr.write(format_attrs(environment.settings() + frequency,
+                                    None, args.fmt, args.precision))
+
+    # Report the harness overhead:
+    if args.calibrate or args.subtract_overhead:
+      overhead = timer.overhead or calibrate(args)
+      sys.stderr.write("Harness overhead:\n")
+      sys.stderr.write(Stats(overhead, confidence=args.confidence,
+                             threshold=args.threshold)
+                       .format(fmt=args.fmt, precision=args.precision))
+
+    # Report the time taken to prepare the page cache, which is not
+    # included in the results:
+    if args.cache_control and timer.cache_times.n:
+      sys.stderr.write("Cache {0} time:\n".format(args.cache))
+      sys.stderr.write(Stats(timer.cache_times, confidence=args.confidence,
+                             threshold=args.threshold)
+                       .format(fmt=args.fmt, precision=args.precision))
+
+    # Save the results as the baseline, or check them against it. The
+    # exit status is that of the check:
+    status = 0
+    if args.baseline:
+      results = benchmarks[0].robust_results()
+      if args.save:
+        baselines.save(args.baseline, benchmarks[0].command, results)
+        sys.stderr.write("Saved baseline '{0}' of {1} results.\n"
+                         .format(args.baseline, len(results)))
+      else:
+        check = baselines.check(args.baseline, results,
+                                confidence=args.confidence,
+                                threshold=args.threshold,
+                                effect=args.effect_size)
+        sys.stderr.write(check.format(fmt=args.fmt,
+                                      precision=args.precision))
+        status = check.status()
     sys.stderr.flush()
 
-    # Graph results:
+    # Graph results. A file is rendered without a display, and
+    # matplotlib is slow to import, so only do so when graphing:
     if args.graph:
-      graph(results, args.command)
+      from srtime.plot import plot
+
+      plot([(b.command, b.results(), b.counts(), b.accumulator())
+            for b in benchmarks],
+           path=args.graph if isinstance(args.graph, str) else None,
+           ordered=not args.sketch)
   except ProcessException as err:
     # If the process fails with a non-zero return code, then print
-    # the exception message and return the error code.
+    # the exception message and return the error code, unless it could
+    # be mistaken for the verdict of a check.
     print(err)
-    return err._errcode
+    return 1 if checking else err._errcode
   except Exception as err:
     print(err)
     return 1
+  finally:
+    # Stop the cache control's privileged helper, if any:
+    if cache_control:
+      cache_control.close()
 
-  return 0
+  return status
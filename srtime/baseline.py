@@ -0,0 +1,130 @@
+# Named baselines, and regression checks against them.
+#
+# A baseline is the distribution of the results of a run, saved under a
+# name so that later runs can be checked against it. The samples of
+# each baseline are kept in their own sample store, and an index maps
+# each name to its store and summary statistics, so that checking a
+# baseline never reads the stores of the others. The index and stores
+# are replaced atomically, so an interrupted save leaves the previous
+# baseline intact.
+import hashlib
+import json
+import os
+from time import time
+
+from srtime.exceptions import BaselineException
+from srtime.stats import Accumulator, Comparison
+from srtime.store import Store, load
+
+
+INDEX = "index.json"
+
+# The exit status of a check for each verdict:
+EXIT_CODES = {
+  "unchanged": 0,
+  "regressed": 3,
+  "improved": 4,
+  "inconclusive": 5,
+}
+
+
+# The check of the results of a run against a baseline. Like a
+# Comparison, the speedup is the ratio of the mean of the baseline to
+# the mean of the new results. If the difference is significant under
+# both the t-test and the rank test, and the speedup differs from 1 by
+# more than "effect", the results have regressed or improved. If
+# instead the confidence interval of the speedup lies within "effect"
+# of 1, they are unchanged. Otherwise, the check is inconclusive.
+class Check(Comparison):
+  def __init__(self, a, b, la, lb, confidence=0.95, threshold=30,
+               effect=0.05, name=None):
+    super().__init__(a, b, la, lb, confidence=confidence,
+                     threshold=threshold, name=name)
+
+    if self.speedup is None:
+      self.verdict = "inconclusive"
+    elif self.significant() and self.speedup < 1 - effect:
+      self.verdict = "regressed"
+    elif self.significant() and self.speedup > 1 + effect:
+      self.verdict = "improved"
+    elif 1 - effect <= self.c1 and self.c2 <= 1 + effect:
+      self.verdict = "unchanged"
+    else:
+      self.verdict = "inconclusive"
+    self.effect = effect
+    self._attrs += [("effect", effect), ("verdict", self.verdict)]
+
+  # Return the exit status of the check.
+  def status(self):
+    return EXIT_CODES[self.verdict]
+
+  def format(self, fmt="min", precision=2):
+    s = super().format(fmt, precision)
+    if fmt.lower() == "min":
+      s += ("Effect size threshold {effect}: {verdict}\n"
+            .format(effect=self.effect, verdict=self.verdict))
+    return s
+
+
+# A directory of named baselines.
+class Baselines:
+  def __init__(self, path):
+    self.path = path
+    self._index_path = os.path.join(path, INDEX)
+    self.index = {}
+    if os.path.exists(self._index_path):
+      try:
+        with open(self._index_path) as f:
+          self.index = json.load(f)
+      except ValueError as err:
+        raise BaselineException(self._index_path,
+                                "invalid index: {0}".format(err))
+
+  # Return the path of the sample store of a baseline. Names may
+  # contain any characters, so stores are named by a hash.
+  def _store_path(self, name):
+    digest = hashlib.sha1(name.encode()).hexdigest()[:16]
+    return os.path.join(self.path, digest + ".bin")
+
+  # Save a list of results as the baseline "name", replacing any
+  # baseline of the same name.
+  def save(self, name, command, results):
+    if not len(results):
+      raise BaselineException(name, "no results to save")
+    os.makedirs(self.path, exist_ok=True)
+
+    path = self._store_path(name)
+    store = Store(path + ".tmp")
+    for i, result in enumerate(results):
+      store.append(0, i, "time", result)
+    store.close()
+    os.replace(path + ".tmp", path)
+
+    acc = Accumulator(results)
+    self.index[name] = dict(store=os.path.basename(path), command=command,
+                            n=acc.n, mean=acc.mean, stdev=acc.stdev(),
+                            saved=time())
+    with open(self._index_path + ".tmp", "w") as f:
+      json.dump(self.index, f, indent=2, sort_keys=True)
+    os.replace(self._index_path + ".tmp", self._index_path)
+
+  # Return the index entry of the baseline "name".
+  def find(self, name):
+    if name not in self.index:
+      raise BaselineException(name, "not found in '{0}'".format(self.path))
+    return self.index[name]
+
+  # Return a numpy array of the results of the baseline "name".
+  def samples(self, name):
+    path = os.path.join(self.path, self.find(name)["store"])
+    return load(path).values("time")
+
+  # Return the Check of a list of results against the baseline "name".
+  def check(self, name, results, confidence=0.95, threshold=30,
+            effect=0.05):
+    if not len(results):
+      raise BaselineException(name, "no results to check")
+    baseline = self.samples(name)
+    return Check(Accumulator(baseline), Accumulator(results), baseline,
+                 results, confidence=confidence, threshold=threshold,
+                 effect=effect, name="baseline '{0}'".format(name))
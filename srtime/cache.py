@@ -0,0 +1,149 @@
+# Control of the page cache before each iteration.
+#
+# There are three modes:
+#
+#   drop   Write back dirty pages, and drop the whole page cache, dentries
+#          and inodes. When running as root, this writes to drop_caches
+#          directly. Otherwise, a single privileged helper is started
+#          using sudo on the first drop, and then signalled once per
+#          iteration, so that sudo is only run once.
+#   evict  Evict only the named files, and the files under the named
+#          directories, using posix_fadvise(). This does not require
+#          privileges.
+#   warm   Read the named files into the page cache, for hot cache runs.
+#
+# The time taken to prepare the cache is returned, so that it can be
+# reported separately from the times of the benchmark.
+import logging as log
+import os
+import subprocess
+from time import perf_counter
+
+from srtime.exceptions import CacheException
+
+
+CACHE_MODES = ["drop", "evict", "warm"]
+
+DROP_CACHES = "/proc/sys/vm/drop_caches"
+
+# The size of the buffer used to read files into the cache:
+_CHUNK_SIZE = 1 << 20
+
+
+# Return the script of the privileged helper, which drops the caches
+# by writing to "path" for each line read from its input, and
+# acknowledges each with the exit status of the write.
+def helper_script(path=DROP_CACHES):
+  return "while read _; do echo 3 > {0}; echo $?; done".format(path)
+
+
+# Return the paths of the regular files named by a list of files and
+# directories.
+def files(paths):
+  found = []
+  for path in paths:
+    if os.path.isdir(path):
+      for root, _, names in os.walk(path):
+        for name in sorted(names):
+          found.append(os.path.join(root, name))
+    else:
+      found.append(path)
+  return [path for path in found if os.path.isfile(path)]
+
+
+# Evict the pages of a file from the page cache. Only clean pages can be
+# evicted, so dirty pages are written back first.
+def evict(path):
+  fd = os.open(path, os.O_RDONLY)
+  try:
+    os.fdatasync(fd)
+    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+  finally:
+    os.close(fd)
+
+
+# Read the pages of a file into the page cache.
+def warm(path):
+  buf = bytearray(_CHUNK_SIZE)
+  with open(path, "rb", buffering=0) as f:
+    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+    while f.readinto(buf):
+      pass
+
+
+class CacheControl:
+  # "paths" is the list of files and directories to evict or warm. It
+  # is ignored when dropping the whole cache.
+  def __init__(self, mode, paths=None):
+    self.mode = mode
+    self.paths = paths or []
+    self._helper = None
+    # The command which starts the privileged helper:
+    self._helper_argv = ["sudo", "sh", "-c", helper_script()]
+
+    if mode not in CACHE_MODES:
+      raise CacheException("unknown mode '{0}'".format(mode))
+    if mode != "drop":
+      if not self.paths:
+        raise CacheException("no paths to {0}".format(mode))
+      for path in self.paths:
+        if not os.path.exists(path):
+          raise CacheException("no such file or directory '{0}'"
+                               .format(path))
+
+  # Prepare the cache for an iteration, and return the time taken in
+  # seconds.
+  def prepare(self):
+    start = perf_counter()
+    if self.mode == "drop":
+      self._drop()
+    else:
+      # Directories are walked each time, since the benchmark may
+      # create files:
+      fn = evict if self.mode == "evict" else warm
+      for path in files(self.paths):
+        fn(path)
+    return perf_counter() - start
+
+  def _drop(self):
+    os.sync()
+    if os.geteuid() == 0:
+      try:
+        with open(DROP_CACHES, "w") as f:
+          f.write("3\n")
+      except OSError as err:
+        raise CacheException(str(err))
+      return
+    self._drop_with_helper()
+
+  # Drop the caches using the privileged helper, starting it if it is
+  # not running.
+  def _drop_with_helper(self):
+    if self._helper is None:
+      log.info("Starting privileged helper to drop caches")
+      self._helper = subprocess.Popen(self._helper_argv,
+                                      stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE)
+    # Wait until the helper has dropped the caches:
+    try:
+      self._helper.stdin.write(b"\n")
+      self._helper.stdin.flush()
+      ack = self._helper.stdout.readline()
+    except OSError:
+      ack = b""
+    if not ack:
+      self.close()
+      raise CacheException("failed to drop caches using sudo")
+    if ack.strip() != b"0":
+      self.close()
+      raise CacheException("failed to write to {0} using sudo: exit "
+                           "status {1}".format(DROP_CACHES,
+                                               ack.strip().decode()))
+
+  # Stop the privileged helper, if it was started.
+  def close(self):
+    if self._helper is not None:
+      self._helper.stdin.close()
+      self._helper.wait()
+      self._helper.stdout.close()
+      self._helper = None
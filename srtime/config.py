@@ -0,0 +1,90 @@
+# A typed configuration of a Timer, for using srtime as a library
+# rather than from the command line.
+#
+# Each field is the option of srtime.parser.ArgumentParser of the same
+# name, with the same default, except that the output of the commands
+# is discarded by default. "commands" is a list of commands: one is
+# timed, or if there are several they are compared. Options which only
+# affect how main() reports the results are not included, and take
+# their defaults.
+#
+# A Config is converted to the arguments namespace which the Timer
+# uses by the argument parser, so it is validated in the same way as
+# the command line:
+#
+#   timer = Timer(Config(["sleep 0.1", "sleep 0.2"], target_time=5),
+#                 start=False)
+#   for sample in timer.samples():
+#     ...
+from argparse import Namespace
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Union
+
+from srtime.parser import ArgumentParser
+
+
+@dataclass
+class Config:
+  commands: List[str]
+  sweep: Optional[List[str]] = None
+  python: bool = False
+  setup: str = "pass"
+  gc: bool = False
+  isolate: bool = False
+  filter: bool = False
+  filter_regex: Optional[str] = None
+  filter_kv: Optional[str] = None
+  metrics: Optional[List[str]] = None
+  min_iterations: int = 5
+  target_time: float = 10
+  target_precision: Optional[float] = None
+  warmup: Union[int, str] = 0
+  warmup_window: int = 10
+  threshold: int = 30
+  confidence: float = 0.95
+  ci_method: str = "parametric"
+  bootstrap_method: str = "bca"
+  resamples: int = 10000
+  sketch: bool = False
+  sketch_k: int = 200
+  reservoir: int = 10000
+  outliers: str = "keep"
+  outlier_method: str = "tukey"
+  iteration_timeout: Optional[float] = None
+  max_timeouts: Optional[int] = None
+  output: Optional[str] = None
+  resume: bool = False
+  stream: Optional[str] = None
+  stream_interval: float = 1
+  jobs: int = 1
+  spawn: str = "pty"
+  subtract_overhead: bool = False
+  calibration_time: float = 1
+  cache: Optional[str] = None
+  cache_paths: Optional[List[str]] = None
+  cpus: Optional[str] = None
+  nice: Optional[int] = None
+  ionice: Optional[str] = None
+  scheduler: Optional[str] = None
+  aslr: bool = True
+  env_size: Optional[int] = None
+  quiet: bool = True
+
+  # Return the arguments namespace of the configuration. Raises an
+  # ArgumentParserException if it is invalid.
+  def options(self):
+    fields = asdict(self)
+    commands = fields.pop("commands")
+    quiet = fields.pop("quiet")
+    if fields["metrics"] is not None:
+      fields["metrics"] = ",".join(fields["metrics"])
+    fields["compare"] = len(commands) > 1
+
+    # Values which are given in the namespace are not replaced by the
+    # defaults of the parser:
+    parser = ArgumentParser()
+    args = parser.parse_args(["--"] + list(commands),
+                             namespace=Namespace(**fields))
+    parser.check_choices(args)
+    args.quiet = quiet
+    return args
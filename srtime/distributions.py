@@ -0,0 +1,181 @@
+# Pure-Python normal and Student's t-distribution functions. These
+# provide the quantiles needed for confidence intervals without the
+# cost of importing scipy at startup.
+from math import atan, exp, lgamma, log, log1p, pi, sqrt, tan
+from statistics import NormalDist
+
+
+_NORMAL = NormalDist()
+
+# The convergence tolerance and iteration limit of the continued
+# fraction used by the incomplete beta function:
+_EPS = 1e-16
+_MAXITER = 10000
+
+# Above this many degrees of freedom, the t-distribution is
+# indistinguishable from the normal distribution:
+_NORMAL_DF = 1e7
+
+
+# Return the cumulative distribution function of the standard normal
+# distribution at "x".
+def normcdf(x):
+  return _NORMAL.cdf(x)
+
+
+# Return the quantile of the standard normal distribution for
+# probability "p".
+def normppf(p):
+  return _NORMAL.inv_cdf(p)
+
+
+# Evaluate the continued fraction for the incomplete beta function
+# using the modified Lentz's method.
+def _betacf(a, b, x):
+  tiny = 1e-300
+  qab, qap, qam = a + b, a + 1, a - 1
+  c = 1
+  d = 1 - qab * x / qap
+  if abs(d) < tiny:
+    d = tiny
+  d = 1 / d
+  h = d
+
+  for m in range(1, _MAXITER + 1):
+    m2 = 2 * m
+    aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+    d = 1 + aa * d
+    if abs(d) < tiny:
+      d = tiny
+    c = 1 + aa / c
+    if abs(c) < tiny:
+      c = tiny
+    d = 1 / d
+    h *= d * c
+
+    aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+    d = 1 + aa * d
+    if abs(d) < tiny:
+      d = tiny
+    c = 1 + aa / c
+    if abs(c) < tiny:
+      c = tiny
+    d = 1 / d
+    delta = d * c
+    h *= delta
+
+    if abs(delta - 1) < _EPS:
+      break
+
+  return h
+
+
+# Return lgamma(a + b) - lgamma(a). For large "a" this uses Stirling's
+# series, which avoids the cancellation between two large values.
+def _lgammaratio(a, b):
+  if a < 100:
+    return lgamma(a + b) - lgamma(a)
+
+  def correction(x):
+    x2 = x * x
+    return (1 / 12 - (1 / 360 - 1 / (1260 * x2)) / x2) / x
+
+  return ((a + b - 0.5) * log1p(b / a) + b * log(a) - b +
+          correction(a + b) - correction(a))
+
+
+# Return the regularized incomplete beta function I_x(a, b). If "y"
+# is given, it is a more precise value of 1 - x.
+def betainc(a, b, x, y=None):
+  if y is None:
+    y = 1 - x
+  if x <= 0:
+    return 0.0
+  if y <= 0:
+    return 1.0
+
+  if a >= b:
+    lbeta = _lgammaratio(a, b) - lgamma(b)
+  else:
+    lbeta = _lgammaratio(b, a) - lgamma(a)
+  # Take logarithms of whichever of x and y is further from 1:
+  lx = log1p(-y) if y < 0.5 else log(x)
+  ly = log1p(-x) if x < 0.5 else log(y)
+  bt = exp(lbeta + a * lx + b * ly)
+
+  # The continued fraction converges rapidly for x below this
+  # point, otherwise use the symmetry relation:
+  if x < (a + 1) / (a + b + 2):
+    return bt * _betacf(a, b, x) / a
+  else:
+    return 1 - bt * _betacf(b, a, y) / b
+
+
+# Return the probability density function of the t-distribution with
+# "df" degrees of freedom at "t".
+def tpdf(t, df):
+  return exp(_lgammaratio(df / 2, 0.5) -
+             (df + 1) / 2 * log1p(t * t / df)) / sqrt(df * pi)
+
+
+# Return the cumulative distribution function of the t-distribution
+# with "df" degrees of freedom at "t".
+def tcdf(t, df):
+  if df == 1:
+    return 0.5 + atan(t) / pi
+  if df > _NORMAL_DF:
+    return normcdf(t)
+
+  tt = t * t
+  tail = 0.5 * betainc(df / 2, 0.5, df / (df + tt), tt / (df + tt))
+  return 1 - tail if t > 0 else tail
+
+
+# Return the quantile of the t-distribution with "df" degrees of
+# freedom for probability "p".
+def tppf(p, df):
+  if p <= 0:
+    return float("-inf")
+  if p >= 1:
+    return float("inf")
+  if p == 0.5:
+    return 0.0
+
+  # Closed forms for one and two degrees of freedom:
+  if df == 1:
+    return tan(pi * (p - 0.5))
+  if df == 2:
+    return (2 * p - 1) / sqrt(2 * p * (1 - p))
+  if df > _NORMAL_DF:
+    return normppf(p)
+
+  # The distribution is symmetric, so solve for the upper tail:
+  if p < 0.5:
+    return -tppf(1 - p, df)
+
+  # Bracket the root, starting from the normal quantile, which is
+  # always an underestimate:
+  lo = normppf(p)
+  hi = 2 * lo
+  while tcdf(hi, df) < p:
+    lo, hi = hi, 2 * hi
+
+  # Newton's method, falling back to bisection if a step leaves the
+  # bracket:
+  t = lo
+  for _ in range(100):
+    f = tcdf(t, df) - p
+    if f < 0:
+      lo = t
+    else:
+      hi = t
+
+    step = f / tpdf(t, df)
+    u = t - step
+    if not lo < u < hi:
+      u = (lo + hi) / 2
+    if abs(u - t) <= 1e-15 * abs(u):
+      return u
+    t = u
+
+  return t
@@ -0,0 +1,353 @@
+# Control of the environment of the timed child process, to reduce the
+# variance of its times.
+#
+# Each setting is applied in the child after it is forked and before it
+# execs the command, so that the harness itself is unaffected:
+#
+#   cpus       Pin the child to a set of CPUs, so that it is not
+#              migrated between them. Workers of parallel runs are
+#              each pinned to a single CPU of the set.
+#   nice       Set the niceness of the child.
+#   ionice     Set the I/O scheduling class of the child, and its
+#              priority within the class, using ioprio_set().
+#   scheduler  Set the CPU scheduling policy of the child, and its
+#              priority for the realtime policies.
+#   aslr       Disable address space layout randomization with
+#              personality(), so that the layout of the child is the
+#              same in every iteration.
+#   env_size   Pad the environment of the child to a fixed size in
+#              bytes. The environment is copied onto the initial stack,
+#              so its size shifts the alignment of the stack.
+#
+# posix_spawn() cannot run code in the child, so with that backend only
+# the environment and the POSIX scheduler policies (other, fifo and rr)
+# can be set.
+#
+# The preflight check reads the CPU frequency scaling settings from
+# /sys, and warns of any which make times depend on the frequency the
+# CPU happens to be running at.
+import glob
+import os
+import platform
+
+from srtime.exceptions import EnvironmentException
+
+
+# The sysfs directory of the CPUs:
+CPU_ROOT = "/sys/devices/system/cpu"
+
+# The I/O scheduling classes, by their ionice(1) names:
+IONICE_CLASSES = {"realtime": 1, "best-effort": 2, "idle": 3}
+
+# The CPU scheduling policies, by their chrt(1) names:
+SCHEDULERS = {"other": os.SCHED_OTHER, "batch": os.SCHED_BATCH,
+              "idle": os.SCHED_IDLE, "fifo": os.SCHED_FIFO,
+              "rr": os.SCHED_RR}
+
+# The policies which posix_spawn() can set:
+POSIX_SCHEDULERS = ["other", "fifo", "rr"]
+
+# The variable added to pad the environment:
+PAD_VARIABLE = "SRTIME_PAD"
+
+# The personality flag which disables address space randomization:
+_ADDR_NO_RANDOMIZE = 0x0040000
+
+# The ioprio_set() arguments to set the priority of this process:
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+
+# The number of the ioprio_set() system call on each architecture:
+_SYS_IOPRIO_SET = {"x86_64": 251, "i386": 289, "i686": 289,
+                   "aarch64": 30, "riscv64": 30, "armv7l": 314,
+                   "ppc64": 273, "ppc64le": 273, "s390x": 282}
+
+
+# Return the sorted list of CPUs of a list such as "0-3,6".
+def parse_cpus(s):
+  cpus = set()
+  for part in s.split(","):
+    first, sep, last = part.partition("-")
+    try:
+      first = int(first)
+      last = int(last) if sep else first
+    except ValueError:
+      raise ValueError("invalid CPU list: '{0}'".format(s))
+    if first < 0 or last < first:
+      raise ValueError("invalid CPU range: '{0}'".format(part))
+    cpus.update(range(first, last + 1))
+  return sorted(cpus)
+
+
+# Return a string of a list of CPUs, with consecutive CPUs as ranges.
+def format_cpus(cpus):
+  ranges = []
+  for cpu in sorted(cpus):
+    if ranges and ranges[-1][1] == cpu - 1:
+      ranges[-1][1] = cpu
+    else:
+      ranges.append([cpu, cpu])
+  return ",".join(str(first) if first == last else
+                  "{0}-{1}".format(first, last) for first, last in ranges)
+
+
+# Return the class and level of an ionice setting such as
+# "best-effort:4". The level defaults to 0, and the idle class has
+# none.
+def parse_ionice(s):
+  name, sep, level = s.partition(":")
+  if name not in IONICE_CLASSES:
+    raise ValueError("invalid class: '{0}' (choose from {1})"
+                     .format(name, ", ".join(IONICE_CLASSES)))
+  if name == "idle" and sep:
+    raise ValueError("the idle class has no level")
+  try:
+    level = int(level) if sep else 0
+  except ValueError:
+    raise ValueError("invalid level: '{0}'".format(level))
+  if not 0 <= level <= 7:
+    raise ValueError("level must be within range: 0 <= level <= 7")
+  return name, level
+
+
+# Return the policy and priority of a scheduler setting such as
+# "fifo:10". The priority defaults to the minimum of the policy.
+def parse_scheduler(s):
+  name, sep, priority = s.partition(":")
+  if name not in SCHEDULERS:
+    raise ValueError("invalid policy: '{0}' (choose from {1})"
+                     .format(name, ", ".join(SCHEDULERS)))
+  lo = os.sched_get_priority_min(SCHEDULERS[name])
+  hi = os.sched_get_priority_max(SCHEDULERS[name])
+  try:
+    priority = int(priority) if sep else lo
+  except ValueError:
+    raise ValueError("invalid priority: '{0}'".format(priority))
+  if not lo <= priority <= hi:
+    raise ValueError("priority of {0} must be within range: {1} <= "
+                     "priority <= {2}".format(name, lo, hi))
+  return name, priority
+
+
+# Return the size in bytes that an environment takes on the stack of a
+# new process.
+def env_size(env):
+  return sum(len(os.fsencode(key)) + len(os.fsencode(value)) + 2
+             for key, value in env.items())
+
+
+# Return a copy of an environment padded to "size" bytes.
+def pad_env(env, size):
+  env = dict(env)
+  env.pop(PAD_VARIABLE, None)
+  padding = size - env_size(env) - len(PAD_VARIABLE) - 2
+  if padding < 0:
+    raise EnvironmentException("env-size", "the environment is already "
+                               "{0} bytes".format(env_size(env)))
+  env[PAD_VARIABLE] = "x" * padding
+  return env
+
+
+# Return a list of (name, value) pairs of the CPU frequency scaling
+# settings of a list of CPUs, or of every CPU if None: the scaling
+# governors, and whether turbo boost is enabled. Settings which are not
+# exposed by the kernel are omitted.
+def cpu_frequency(cpus=None, root=CPU_ROOT):
+  if cpus is None:
+    paths = glob.glob(os.path.join(root, "cpu[0-9]*", "cpufreq",
+                                   "scaling_governor"))
+  else:
+    paths = [os.path.join(root, "cpu{0}".format(cpu), "cpufreq",
+                          "scaling_governor") for cpu in cpus]
+  governors = set(filter(None, map(_read, paths)))
+
+  settings = []
+  if governors:
+    settings.append(("governor", ",".join(sorted(governors))))
+  # intel_pstate reports whether turbo is disabled, and acpi-cpufreq
+  # whether boost is enabled:
+  no_turbo = _read(os.path.join(root, "intel_pstate", "no_turbo"))
+  boost = _read(os.path.join(root, "cpufreq", "boost"))
+  if no_turbo is not None:
+    settings.append(("turbo", "off" if no_turbo == "1" else "on"))
+  elif boost is not None:
+    settings.append(("turbo", "on" if boost == "1" else "off"))
+  return settings
+
+
+# Return a list of warnings about CPU frequency scaling settings which
+# add variance to times, given the settings from cpu_frequency().
+def preflight(settings):
+  warnings = []
+  settings = dict(settings)
+  if settings.get("governor", "performance") != "performance":
+    warnings.append("The CPU frequency governor is '{0}', not "
+                    "'performance', so times depend on the frequency "
+                    "scaling.".format(settings["governor"]))
+  if settings.get("turbo") == "on":
+    warnings.append("Turbo boost is enabled, so times depend on the "
+                    "temperature and load of the CPU.")
+  return warnings
+
+
+# Return the stripped contents of a file, or None if it cannot be read.
+def _read(path):
+  try:
+    with open(path) as f:
+      return f.read().strip()
+  except OSError:
+    return None
+
+
+# Return a function of the C library which returns -1 and sets errno
+# on failure, wrapped to raise an OSError on failure. The library is
+# loaded here, so that calling the function in the child process only
+# makes the call.
+def _libc_function(name):
+  import ctypes
+
+  fn = getattr(ctypes.CDLL(None, use_errno=True), name)
+  get_errno = ctypes.get_errno
+
+  def call(*args):
+    result = fn(*args)
+    if result == -1:
+      errno = get_errno()
+      raise OSError(errno, os.strerror(errno))
+    return result
+  return call
+
+
+class Environment:
+  # "cpus" is a list of CPUs, "ionice" a (class, level) pair and
+  # "scheduler" a (policy, priority) pair, as returned by the parse
+  # functions. Settings which are None are left unchanged.
+  def __init__(self, cpus=None, nice=None, ionice=None, scheduler=None,
+               aslr=True, env_size=None):
+    self.cpus = cpus
+    self.nice = nice
+    self.ionice = ionice
+    self.scheduler = scheduler
+    self.aslr = aslr
+    self.env_size = env_size
+
+    if cpus is not None:
+      unavailable = set(cpus) - os.sched_getaffinity(0)
+      if unavailable:
+        raise EnvironmentException("cpus", "CPUs {0} are not available"
+                                   .format(format_cpus(unavailable)))
+    if ionice is not None and platform.machine() not in _SYS_IOPRIO_SET:
+      raise EnvironmentException("ionice", "not supported on {0}"
+                                 .format(platform.machine()))
+
+    # The C library functions which apply the settings, if required:
+    self._syscall, self._personality = None, None
+    if ionice is not None:
+      self._syscall = _libc_function("syscall")
+      self._ioprio_set = _SYS_IOPRIO_SET[platform.machine()]
+    if not aslr:
+      self._personality = _libc_function("personality")
+
+    # The environment of the child, or None to inherit ours:
+    self.env = None
+    if env_size is not None:
+      self.env = pad_env(os.environ, env_size)
+
+  # Return a list of (name, value) pairs of the settings which are
+  # applied.
+  def settings(self):
+    settings = []
+    if self.cpus is not None:
+      settings.append(("cpus", format_cpus(self.cpus)))
+    if self.nice is not None:
+      settings.append(("nice", self.nice))
+    if self.ionice is not None:
+      name, level = self.ionice
+      settings.append(("ionice", name if name == "idle" else
+                       "{0}:{1}".format(name, level)))
+    if self.scheduler is not None:
+      settings.append(("scheduler", "{0}:{1}".format(*self.scheduler)))
+    if not self.aslr:
+      settings.append(("aslr", "off"))
+    if self.env_size is not None:
+      settings.append(("env-size", self.env_size))
+    return settings
+
+  # Return the names of the settings which must be applied in the child
+  # process, and so cannot be applied by posix_spawn().
+  def child_settings(self):
+    return [name for name, value in self.settings()
+            if name != "env-size" and not
+            (name == "scheduler" and self.scheduler[0] in POSIX_SCHEDULERS)]
+
+  # Return the scheduler argument of os.posix_spawn(), or None.
+  def posix_spawn_scheduler(self):
+    if self.scheduler is None:
+      return None
+    policy, priority = self.scheduler
+    return SCHEDULERS[policy], os.sched_param(priority)
+
+  # Apply the settings to this process. This is called in the child
+  # process before it execs the command, and raises an
+  # EnvironmentException if a setting cannot be applied.
+  def apply(self):
+    for name, fn in [("cpus", self._apply_cpus),
+                     ("nice", self._apply_nice),
+                     ("ionice", self._apply_ionice),
+                     ("scheduler", self._apply_scheduler),
+                     ("aslr", self._apply_aslr)]:
+      try:
+        fn()
+      except OSError as err:
+        raise EnvironmentException(name, err.strerror)
+
+  # Pin to the CPU set, unless already pinned within it, as the workers
+  # of parallel runs are.
+  def _apply_cpus(self):
+    if (self.cpus is not None and
+        not os.sched_getaffinity(0) <= set(self.cpus)):
+      os.sched_setaffinity(0, self.cpus)
+
+  def _apply_nice(self):
+    if self.nice is not None:
+      os.setpriority(os.PRIO_PROCESS, 0, self.nice)
+
+  def _apply_ionice(self):
+    if self.ionice is not None:
+      name, level = self.ionice
+      prio = (IONICE_CLASSES[name] << _IOPRIO_CLASS_SHIFT) | level
+      self._syscall(self._ioprio_set, _IOPRIO_WHO_PROCESS, 0, prio)
+
+  def _apply_scheduler(self):
+    if self.scheduler is not None:
+      os.sched_setscheduler(0, *self.posix_spawn_scheduler())
+
+  def _apply_aslr(self):
+    if not self.aslr:
+      persona = self._personality(0xffffffff)
+      self._personality(persona | _ADDR_NO_RANDOMIZE)
+
+  # Check that the settings can be applied, by applying them in a
+  # forked child process, so that an error is reported before any
+  # iterations are run rather than as a failure of the command.
+  def check(self):
+    if not self.child_settings() and self.scheduler is None:
+      return
+
+    r, w = os.pipe()
+    pid = os.fork()
+    if not pid:
+      try:
+        os.close(r)
+        self.apply()
+      except EnvironmentException as err:
+        os.write(w, "{0}\0{1}".format(err._setting, err._msg).encode())
+      finally:
+        os._exit(0)
+
+    os.close(w)
+    with os.fdopen(r, "rb") as pipe:
+      error = pipe.read().decode()
+    os.waitpid(pid, 0)
+    if error:
+      raise EnvironmentException(*error.split("\0", 1))
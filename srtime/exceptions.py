@@ -24,6 +24,22 @@ class ProcessException(Exception):
             .format(proc=self._procname, errcode=self._errcode))
 
 
+# Exception thrown if a process does not exit within a timeout. If
+# "count" is given, it is the number of times the process timed out.
+class TimeoutException(Exception):
+  def __init__(self, procname, timeout, count=None):
+    self._procname = procname
+    self._timeout = timeout
+    self._count = count
+
+  def __str__(self):
+    s = ("Process '{proc}' timed out after {timeout} seconds"
+         .format(proc=self._procname, timeout=self._timeout))
+    if self._count is not None:
+      s += " {count} times".format(count=self._count)
+    return s
+
+
 # Exception thrown if the output of a process cannot be filtered.
 class FilterInputException(Exception):
   def __init__(self, errline):
@@ -36,3 +52,57 @@ class FilterInputException(Exception):
 
 # Exception thrown by an error parsing arguments.
 class ArgumentParserException(Exception): pass
+
+
+# Exception thrown if a sample store cannot be read or written.
+class StoreException(Exception):
+  def __init__(self, path, msg):
+    self._path = path
+    self._msg = msg
+
+  def __str__(self):
+    return ("Invalid sample store '{path}': {msg}"
+            .format(path=self._path, msg=self._msg))
+
+
+# Exception thrown if the page cache cannot be controlled.
+class CacheException(Exception):
+  def __init__(self, msg):
+    self._msg = msg
+
+  def __str__(self):
+    return "Unable to control the page cache: {msg}".format(msg=self._msg)
+
+
+# Exception thrown if a named baseline cannot be read or written.
+class BaselineException(Exception):
+  def __init__(self, name, msg):
+    self._name = name
+    self._msg = msg
+
+  def __str__(self):
+    return ("Baseline '{name}': {msg}"
+            .format(name=self._name, msg=self._msg))
+
+
+# Exception thrown if a setting of the environment of the child process
+# cannot be applied.
+class EnvironmentException(Exception):
+  def __init__(self, setting, msg):
+    self._setting = setting
+    self._msg = msg
+
+  def __str__(self):
+    return ("Unable to set {setting} of the child process: {msg}"
+            .format(setting=self._setting, msg=self._msg))
+
+
+# Exception thrown if a suite of benchmarks cannot be loaded.
+class SuiteException(Exception):
+  def __init__(self, path, msg):
+    self._path = path
+    self._msg = msg
+
+  def __str__(self):
+    return ("Invalid suite '{path}': {msg}"
+            .format(path=self._path, msg=self._msg))
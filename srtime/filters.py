@@ -0,0 +1,89 @@
+# Filters which extract named metrics from the output of a process.
+#
+# A filter is given the complete output of an iteration as bytes, and
+# returns a dict mapping each of its metrics to the list of values
+# found. Output which does not match is ignored, so metrics can be
+# mixed in with logging. Patterns are compiled once, and matched
+# against the raw bytes, so the output is never decoded or split into
+# lines in Python.
+import re
+
+from srtime.exceptions import FilterInputException
+from srtime.process import METRICS
+
+
+# A decimal number, optionally in scientific notation:
+_NUMBER = rb"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+
+# The characters which separate key=value pairs:
+_SEPARATORS = rb"\s,;"
+
+
+# Raise a ValueError if "name" cannot be used as the name of a metric.
+def _check_metric(name):
+  if name in METRICS:
+    raise ValueError("metric '{0}' is reserved".format(name))
+  if not re.match(r"^[A-Za-z_][A-Za-z0-9_.-]*$", name):
+    raise ValueError("invalid metric name '{0}'".format(name))
+
+
+# Return a list of floats from a list of matched byte strings.
+def _floats(values):
+  try:
+    return list(map(float, values))
+  except ValueError:
+    for value in values:
+      try:
+        float(value)
+      except ValueError:
+        raise FilterInputException(value.decode("raw_unicode_escape"))
+
+
+# Extract a metric for each named group of a regular expression. Each
+# match may set any of the groups, and groups which do not take part
+# in a match are ignored.
+class RegexFilter:
+  def __init__(self, pattern):
+    self._regex = re.compile(pattern.encode(), re.MULTILINE)
+    groupindex = self._regex.groupindex
+    if not groupindex:
+      raise ValueError("pattern has no named groups")
+
+    self.metrics = sorted(groupindex, key=groupindex.get)
+    for name in self.metrics:
+      _check_metric(name)
+
+  def extract(self, output):
+    matches = self._regex.findall(output)
+    if self._regex.groups == 1:
+      return {self.metrics[0]: _floats(matches)}
+
+    samples = {}
+    for name in self.metrics:
+      i = self._regex.groupindex[name] - 1
+      samples[name] = _floats([m[i] for m in matches if m[i]])
+    return samples
+
+
+# Extract the numeric values of a list of keys from key=value pairs,
+# e.g. "phase=parse ms=12.3 bytes=40960". Each key is found by its own
+# pattern, so a pair may appear anywhere in a line.
+class KeyValueFilter:
+  def __init__(self, keys):
+    self.metrics = keys
+    for key in keys:
+      _check_metric(key)
+
+    # Each pattern starts with the literal key, which the regex engine
+    # can search for quickly, and then checks the key is not the end
+    # of a longer word:
+    self._regexes = []
+    for key in keys:
+      key = re.escape(key.encode())
+      self._regexes.append(re.compile(
+          key + rb"(?<![^" + _SEPARATORS + rb"]" + key + rb")=(" +
+          _NUMBER + rb")(?![^" + _SEPARATORS + rb"])"))
+
+  def extract(self, output):
+    return dict((key, _floats(regex.findall(output)))
+                for key, regex in zip(self.metrics, self._regexes))
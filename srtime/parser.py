@@ -1,11 +1,31 @@
 import argparse
+import itertools
+import re
 
-from srtime.exceptions import ArgumentParserException
+from srtime.cache import CACHE_MODES, CacheControl
+from srtime.environment import (IONICE_CLASSES, SCHEDULERS, Environment,
+                                parse_cpus, parse_ionice, parse_scheduler)
+from srtime.exceptions import (ArgumentParserException, CacheException,
+                               EnvironmentException)
+from srtime.filters import KeyValueFilter, RegexFilter
+from srtime.process import METRICS
+from srtime.spawn import BACKENDS
+from srtime.stats import (ATTRIBUTES, BOOTSTRAP_METHODS, CI_METHODS,
+                          OUTLIER_METHODS, OUTLIER_MODES, PERCENTILES)
 
 
 __version_info__ = ('0', '0', '1')
 __version__ = '.'.join(__version_info__)
 
+# The file formats which graphs may be rendered to. This is the same as
+# srtime.plot.FORMATS, which is not imported since it imports numpy:
+GRAPH_FORMATS = ["png", "svg", "pdf"]
+
+# The names which may not be used as sweep parameters, since they are
+# columns of the results table:
+RESERVED = (["name", "metric"] + ATTRIBUTES +
+            [name for name, _ in PERCENTILES])
+
 
 class ArgumentParser(argparse.ArgumentParser):
   def __init__(self):
@@ -16,7 +36,7 @@ class ArgumentParser(argparse.ArgumentParser):
     )
 
     # Define command line arguments:
-    self.add_argument("args", nargs="+",
+    self.add_argument("args", nargs="*",
                       help="the command to execute")
     self.add_argument("--version", action="version",
                       version=("%(prog)s version {version}"
@@ -24,13 +44,75 @@ class ArgumentParser(argparse.ArgumentParser):
     self.add_argument("-v", "--verbose", action="store_true",
                       dest="verbose", default=False,
                       help="run verbosely")
+    self.add_argument("-C", "--compare", action="store_true",
+                      dest="compare", default=False,
+                      help=("compare multiple commands, each given as a "
+                            "single argument. Iterations of the commands "
+                            "are interleaved in a random order"))
+    self.add_argument("--sweep", action="append",
+                      dest="sweep", default=None, metavar="<k=v,...>",
+                      help=("run the command for each of a comma separated "
+                            "list of values of a parameter, which replace "
+                            "'{k}' in the command. When given more than "
+                            "once, every combination of values is run. "
+                            "Iterations of the points are interleaved in a "
+                            "random order"))
+    self.add_argument("--suite", action="store",
+                      dest="suite", default=None, metavar="<file>",
+                      help=("run the benchmarks of a TOML file, sharing "
+                            "the target time between them. Each iteration "
+                            "is spent on the benchmark whose confidence "
+                            "interval it narrows the most per second. "
+                            "Other options are the defaults of every "
+                            "benchmark"))
+    self.add_argument("--python", action="store_true",
+                      dest="python", default=False,
+                      help=("time a Python callable in this process, "
+                            "given as 'package.module:func', instead of a "
+                            "command. The module is imported once, and "
+                            "each sample calls the function in a loop "
+                            "calibrated as by timeit, reporting the time "
+                            "per call"))
+    self.add_argument("--setup", action="store",
+                      dest="setup", default="pass", metavar="<stmt>",
+                      help=("execute a statement in the namespace of the "
+                            "callable's module once, after importing it"))
+    self.add_argument("--gc", action="store_true",
+                      dest="gc", default=False,
+                      help=("keep the garbage collector enabled while "
+                            "timing a Python callable"))
+    self.add_argument("--isolate", action="store_true",
+                      dest="isolate", default=False,
+                      help=("time each sample of a Python callable in a "
+                            "forked child process"))
     self.add_argument("-i", "--filter", action="store_true",
                       dest="filter", default=False,
                       help="filter execution times from process output")
+    self.add_argument("--filter-regex", action="store",
+                      dest="filter_regex", default=None, metavar="<re>",
+                      help=("extract a metric for each named group of a "
+                            "regular expression from the process output, "
+                            "e.g. 'ms=(?P<ms>[0-9.]+)'. Output which does "
+                            "not match is ignored"))
+    self.add_argument("--filter-kv", action="store",
+                      dest="filter_kv", default=None, metavar="<keys>",
+                      help=("extract a metric for each of a comma "
+                            "separated list of keys from key=value pairs "
+                            "in the process output"))
     self.add_argument("-f", "--format", action="store",
                       dest="fmt", default="min", metavar="<f>",
                       help=("set the output format. "
                             "Valid options are: min,txt,csv,tsv"))
+    self.add_argument("-M", "--metrics", action="store",
+                      dest="metrics", default=None, metavar="<m>",
+                      help=("set a comma separated list of the metrics "
+                            "to report, or 'all'. Valid metrics are: "
+                            "{0}, and any filtered metrics. Defaults to "
+                            "time, or the filtered metrics. maxrss is at "
+                            "least the memory of srtime itself, which "
+                            "the command replaces, and with pty it is "
+                            "the peak of every command so far"
+                            .format(",".join(METRICS))))
     self.add_argument("-m", "--min-iterations", action="store", type=int,
                       dest="min_iterations", default=5, metavar="<n>",
                       help=("set the minimum number of iterations "
@@ -39,6 +121,22 @@ class ArgumentParser(argparse.ArgumentParser):
                       dest="target_time", default=10, metavar="<t>",
                       help=("set the target duration of all iterations "
                             "in seconds"))
+    self.add_argument("-P", "--target-precision", action="store",
+                      type=float, dest="target_precision", default=None,
+                      metavar="<p>",
+                      help=("stop once the half-width of the confidence "
+                            "interval is within this fraction of the "
+                            "mean, e.g. 0.01 for 1%%. The target time "
+                            "becomes an upper bound"))
+    self.add_argument("-w", "--warmup", action="store",
+                      dest="warmup", default="0", metavar="<n>",
+                      help=("set the number of warmup iterations to "
+                            "discard, or 'auto' to detect when the "
+                            "results reach a steady state"))
+    self.add_argument("--warmup-window", action="store", type=int,
+                      dest="warmup_window", default=10, metavar="<n>",
+                      help=("set the number of iterations in each of the "
+                            "windows compared to detect a steady state"))
     self.add_argument("-N", "--threshold", action="store", type=int,
                       dest="threshold", default=30, metavar="<n>",
                       help=("set the threshold number of iterations to "
@@ -52,14 +150,173 @@ class ArgumentParser(argparse.ArgumentParser):
                       dest="confidence", default=0.95, metavar="<c>",
                       help=("set the confidence value for calculating "
                             "confidence intervals, 0 < c < 1"))
-    self.add_argument("-g", "--graph", action="store_true",
-                      dest="graph", default=False,
-                      help="display a graph of results")
+    self.add_argument("--ci-method", action="store",
+                      dest="ci_method", default="parametric",
+                      choices=CI_METHODS,
+                      help=("set how confidence intervals are calculated. "
+                            "parametric assumes the mean is normally "
+                            "distributed, bootstrap resamples the results, "
+                            "and also gives an interval for the median"))
+    self.add_argument("--bootstrap-method", action="store",
+                      dest="bootstrap_method", default="bca",
+                      choices=BOOTSTRAP_METHODS,
+                      help=("set the bootstrap confidence interval method. "
+                            "bca corrects the percentile interval for bias "
+                            "and skewness"))
+    self.add_argument("--resamples", action="store", type=int,
+                      dest="resamples", default=10000, metavar="<n>",
+                      help="set the number of bootstrap resamples")
+    self.add_argument("--sketch", action="store_true",
+                      dest="sketch", default=False,
+                      help=("summarise results in bounded memory, for "
+                            "very long runs. The mean and variance are "
+                            "exact, percentiles are estimated by a KLL "
+                            "quantile sketch, and a reservoir sample of "
+                            "the results is kept for graphs and rank "
+                            "tests"))
+    self.add_argument("--sketch-k", action="store", type=int,
+                      dest="sketch_k", default=200, metavar="<k>",
+                      help=("the size of the quantile sketch. The rank "
+                            "error of a percentile is about 1.7 / k"))
+    self.add_argument("--reservoir", action="store", type=int,
+                      dest="reservoir", default=10000, metavar="<n>",
+                      help="the size of the reservoir sample in sketch mode")
+    self.add_argument("--outliers", action="store",
+                      dest="outliers", default="keep", choices=OUTLIER_MODES,
+                      help=("set how outliers are handled. flag reports "
+                            "them and the statistics without them, and "
+                            "reject excludes them from the statistics and "
+                            "the stopping criteria"))
+    self.add_argument("--outlier-method", action="store",
+                      dest="outlier_method", default="tukey",
+                      choices=OUTLIER_METHODS,
+                      help=("set how outliers are classified. tukey uses "
+                            "fences at 1.5 and 3 interquartile ranges "
+                            "beyond the quartiles, and mad at 3 and 5 "
+                            "scaled median absolute deviations from the "
+                            "median"))
+    self.add_argument("--iteration-timeout", action="store", type=float,
+                      dest="iteration_timeout", default=None,
+                      metavar="<t>",
+                      help=("kill an iteration's process group if it runs "
+                            "for longer than this many seconds. Its result "
+                            "is recorded as a timeout"))
+    self.add_argument("--max-timeouts", action="store", type=int,
+                      dest="max_timeouts", default=None, metavar="<k>",
+                      help="abort after this many iterations time out")
+    self.add_argument("-o", "--output", action="store",
+                      dest="output", default=None, metavar="<file>",
+                      help=("append every sample to a binary sample "
+                            "store as it is recorded"))
+    self.add_argument("--resume", action="store_true",
+                      dest="resume", default=False,
+                      help=("load the samples of an existing output file "
+                            "and continue sampling towards the same "
+                            "stopping criteria"))
+    self.add_argument("--baseline", action="store",
+                      dest="baseline", default=None, metavar="<name>",
+                      help=("the name of a baseline to --save the results "
+                            "as, or to --check the results against"))
+    self.add_argument("--save", action="store_true",
+                      dest="save", default=False,
+                      help="save the results as the baseline")
+    self.add_argument("--check", action="store_true",
+                      dest="check", default=False,
+                      help=("check the results against the baseline. The "
+                            "exit status is 0 if unchanged, 3 if "
+                            "regressed, 4 if improved, and 5 if "
+                            "inconclusive"))
+    self.add_argument("--baseline-dir", action="store",
+                      dest="baseline_dir", default=".srtime",
+                      metavar="<dir>",
+                      help="the directory to store baselines in")
+    self.add_argument("--effect-size", action="store", type=float,
+                      dest="effect_size", default=0.05, metavar="<e>",
+                      help=("the smallest change in the mean, as a "
+                            "fraction of the baseline, which is a "
+                            "regression or improvement"))
+    self.add_argument("--stream", action="store",
+                      dest="stream", default=None, metavar="<file>",
+                      help=("write a JSON object per iteration to a file, "
+                            "or - for stdout, with the sample, the running "
+                            "mean and confidence interval, the elapsed "
+                            "time and the estimated time remaining"))
+    self.add_argument("--stream-interval", action="store", type=float,
+                      dest="stream_interval", default=1, metavar="<t>",
+                      help=("flush the stream at most once every this "
+                            "many seconds"))
+    self.add_argument("-g", "--graph", action="store", nargs="?",
+                      dest="graph", default=False, const=True,
+                      metavar="<file>",
+                      help=("display a graph of results, or render it to "
+                            "a png, svg or pdf file without a display"))
+    self.add_argument("-j", "--jobs", action="store", type=int,
+                      dest="jobs", default=1, metavar="<n>",
+                      help=("run this many iterations at the same time, "
+                            "pinning each worker to its own core"))
+    self.add_argument("-s", "--spawn", action="store",
+                      dest="spawn", default="pty", choices=BACKENDS,
+                      help=("set how processes are spawned. pty runs "
+                            "them on a pseudo-terminal, for programs "
+                            "which need a TTY. pipe and posix_spawn "
+                            "have lower overhead"))
+    self.add_argument("--calibrate", action="store_true",
+                      dest="calibrate", default=False,
+                      help=("measure and report the harness overhead by "
+                            "timing a null command"))
+    self.add_argument("--subtract-overhead", action="store_true",
+                      dest="subtract_overhead", default=False,
+                      help=("subtract the measured harness overhead from "
+                            "the reported mean and confidence interval. "
+                            "Implies --calibrate"))
+    self.add_argument("--calibration-time", action="store", type=float,
+                      dest="calibration_time", default=1, metavar="<t>",
+                      help=("set the target duration of the calibration "
+                            "in seconds"))
     self.add_argument("-F", "--flush-cache", action="store_true",
                       dest="flush_caches", default=False,
                       help=("flush system caches before every iteration. "
-                            "Note this requires root privileges, and only "
-                            "supports Unix operating systems"))
+                            "Same as --cache drop"))
+    self.add_argument("--cache", action="store",
+                      dest="cache", default=None, choices=CACHE_MODES,
+                      help=("control the page cache before every "
+                            "iteration. drop writes back dirty pages and "
+                            "drops the whole cache, which requires root, "
+                            "or runs a single helper using sudo. evict "
+                            "evicts only the --cache-path files, and warm "
+                            "reads them into the cache. The time taken is "
+                            "reported separately"))
+    self.add_argument("--cache-path", action="append",
+                      dest="cache_paths", default=None, metavar="<path>",
+                      help=("a file or directory to evict or warm. May be "
+                            "given more than once"))
+    self.add_argument("--cpus", action="store",
+                      dest="cpus", default=None, metavar="<list>",
+                      help=("pin the command to a list of CPUs, such as "
+                            "'2-3,6'. Parallel jobs are each pinned to one "
+                            "of them"))
+    self.add_argument("--nice", action="store", type=int,
+                      dest="nice", default=None, metavar="<n>",
+                      help="run the command with this niceness")
+    self.add_argument("--ionice", action="store",
+                      dest="ionice", default=None, metavar="<class[:level]>",
+                      help=("run the command with this I/O scheduling "
+                            "class, one of: {0}, and level from 0 to 7"
+                            .format(", ".join(IONICE_CLASSES))))
+    self.add_argument("--scheduler", action="store",
+                      dest="scheduler", default=None,
+                      metavar="<policy[:priority]>",
+                      help=("run the command with this CPU scheduling "
+                            "policy, one of: {0}, and priority for fifo "
+                            "and rr".format(", ".join(SCHEDULERS))))
+    self.add_argument("--no-aslr", action="store_false",
+                      dest="aslr", default=True,
+                      help=("disable address space layout randomization "
+                            "of the command"))
+    self.add_argument("--env-size", action="store", type=int,
+                      dest="env_size", default=None, metavar="<bytes>",
+                      help=("pad the environment of the command to this "
+                            "size, which fixes the alignment of its stack"))
 
   # Errors which are caused in the parse_args() method will call
   # self.error(), which by default prints an error message and kills
@@ -69,16 +326,176 @@ class ArgumentParser(argparse.ArgumentParser):
   def error(self, message):
     raise ArgumentParserException(message)
 
+  # Return the list of points of the cartesian product of the values
+  # of a list of "k=v1,v2,..." sweep parameters.
+  def _points(self, sweeps, template):
+    keys, values = [], []
+    for sweep in sweeps:
+      key, sep, vals = sweep.partition("=")
+      if not sep or not key or not vals:
+        self.error("argument --sweep: invalid value: '{0}'".format(sweep))
+      if key in keys:
+        self.error("argument --sweep: parameter '{0}' is repeated"
+                   .format(key))
+      if key in RESERVED:
+        self.error("argument --sweep: parameter '{0}' is the name of a "
+                   "statistic".format(key))
+      if "{" + key + "}" not in template:
+        self.error("argument --sweep: parameter '{0}' is not used by the "
+                   "command".format(key))
+      keys.append(key)
+      values.append(vals.split(","))
+
+    return [dict(zip(keys, point)) for point in itertools.product(*values)]
+
+  # Raise an exception if an argument which has a list of choices was
+  # given another value in the namespace passed to parse_args(), since
+  # those values are not checked by argparse.
+  def check_choices(self, args):
+    for action in self._actions:
+      value = getattr(args, action.dest, None)
+      if action.choices and value is not None and value not in action.choices:
+        self.error("argument {0}: invalid choice: '{1}' (choose from {2})"
+                   .format("/".join(action.option_strings), value,
+                           ", ".join(action.choices)))
+
+  # Return the value of an argument parsed by "fn", or None if it was
+  # not given.
+  def _parse(self, name, fn, value):
+    if value is None:
+      return None
+    try:
+      return fn(value)
+    except ValueError as err:
+      self.error("argument --{0}: {1}".format(name, err))
+
   # We override the base parse_args() method so that we can inject
   # additional data into the returning arguments namespace.
   def parse_args(self, args=None, namespace=None):
     args = super(ArgumentParser, self).parse_args(args, namespace)
 
+    # A suite has its own commands, and results are reported in a
+    # single table:
+    if args.suite:
+      if args.args:
+        self.error("--suite may not be combined with a command")
+      for flag, value in [("-C/--compare", args.compare),
+                          ("--sweep", args.sweep),
+                          ("--baseline", args.baseline),
+                          ("-g/--graph", args.graph),
+                          ("-o/--output", args.output),
+                          ("--stream", args.stream)]:
+        if value:
+          self.error("--suite may not be combined with {0}".format(flag))
+    elif not args.args:
+      self.error("the following arguments are required: args")
+
     # Add a string "command" which has a concatenated version of
     # the args:
     args.command = " ".join(args.args)
 
+    # Add a list of "commands" to run. When comparing, each argument
+    # is a command. When sweeping, each command is the command template
+    # expanded for a point, a dict mapping each parameter to its value:
+    args.points = []
+    if args.compare:
+      args.commands = list(args.args)
+      if args.sweep:
+        self.error("-C/--compare and --sweep may not be combined")
+    elif args.sweep:
+      args.points = self._points(args.sweep, args.command)
+      args.commands = [_expand(args.command, point) for point in args.points]
+    else:
+      args.commands = [args.command]
+
+    # Convert the number of warmup iterations:
+    if args.warmup != "auto":
+      try:
+        args.warmup = int(args.warmup)
+      except ValueError:
+        self.error("argument -w/--warmup: invalid value: '{0}'"
+                   .format(args.warmup))
+
+    # Create the filter which extracts metrics from the output:
+    if sum(map(bool, [args.filter, args.filter_regex, args.filter_kv])) > 1:
+      self.error("only one of -i/--filter, --filter-regex and "
+                 "--filter-kv may be given")
+    if args.python and (args.filter or args.filter_regex or args.filter_kv):
+      self.error("--python may not be combined with a filter")
+    args.extractor = None
+    try:
+      if args.filter_regex:
+        args.extractor = RegexFilter(args.filter_regex)
+      elif args.filter_kv:
+        args.extractor = KeyValueFilter(args.filter_kv.split(","))
+    except (re.error, ValueError) as err:
+      self.error("invalid filter: {0}".format(err))
+    filtered = args.extractor.metrics if args.extractor else []
+
+    # Split the list of metrics:
+    if args.metrics is None:
+      args.metrics = filtered or ["time"]
+    elif args.metrics == "all":
+      args.metrics = list(METRICS) + filtered
+    else:
+      args.metrics = args.metrics.split(",")
+
+    # Baselines are of a single command, and are either saved or
+    # checked:
+    if args.baseline:
+      if args.save == args.check:
+        self.error("--baseline requires one of --save and --check")
+      if len(args.commands) > 1:
+        self.error("--baseline may not be combined with -C/--compare or "
+                   "--sweep")
+    elif args.save or args.check:
+      self.error("--save and --check require --baseline")
+
+    # Check the format of the graph file:
+    if isinstance(args.graph, str):
+      ext = args.graph.rpartition(".")[2].lower()
+      if ext not in GRAPH_FORMATS:
+        self.error("argument -g/--graph: the file must be one of: {0}"
+                   .format(", ".join(GRAPH_FORMATS)))
+
+    # Create the cache control. -F is shorthand for "--cache drop":
+    if args.flush_caches:
+      if args.cache not in [None, "drop"]:
+        self.error("-F/--flush-cache may not be combined with --cache {0}"
+                   .format(args.cache))
+      args.cache = "drop"
+    if args.cache_paths and args.cache in [None, "drop"]:
+      self.error("--cache-path requires --cache evict or --cache warm")
+    args.cache_control = None
+    if args.cache:
+      try:
+        args.cache_control = CacheControl(args.cache, args.cache_paths)
+      except CacheException as err:
+        self.error(str(err))
+
+    # Create the environment of the command, or None if no settings
+    # are applied:
+    try:
+      environment = Environment(
+          cpus=self._parse("cpus", parse_cpus, args.cpus),
+          nice=args.nice,
+          ionice=self._parse("ionice", parse_ionice, args.ionice),
+          scheduler=self._parse("scheduler", parse_scheduler,
+                                args.scheduler),
+          aslr=args.aslr, env_size=args.env_size)
+    except EnvironmentException as err:
+      self.error(str(err))
+    args.environment = environment if environment.settings() else None
+
     # Add a "quiet" option which defaults to off.
     args.quiet = False
 
     return args
+
+
+# Return a command template with each "{k}" replaced by the value of
+# parameter "k" of a point.
+def _expand(template, point):
+  for key, value in point.items():
+    template = template.replace("{" + key + "}", value)
+  return template
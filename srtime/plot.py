@@ -0,0 +1,183 @@
+# Graphs of results, which scale to runs of millions of samples.
+#
+# Samples are never plotted individually. Series are summarised into a
+# fixed number of buckets of consecutive samples, each drawn as the
+# min/max envelope, a percentile band and the mean of the bucket, and
+# distributions are drawn as a histogram with fixed bins and a binned
+# kernel density estimate. Each summary makes one pass over the
+# samples, converting a bucket or chunk at a time to numpy, so the
+# memory used is bounded by the size of the graph rather than the
+# number of samples.
+#
+# If a path is given, the graph is rendered to a file by the Agg
+# backend, without a display. Otherwise it is shown interactively.
+import numpy as np
+
+
+# The number of buckets a series is summarised into, which is about
+# the number of pixels across a graph:
+BUCKETS = 1000
+
+# The number of bins of a histogram:
+BINS = 100
+
+# The percentiles of the band drawn for each bucket:
+BAND = (10, 90)
+
+# The number of samples converted to numpy at once when histogramming:
+_CHUNK_SIZE = 1 << 16
+
+# The file formats which may be rendered, as in srtime.parser:
+FORMATS = ["png", "svg", "pdf"]
+
+
+# A summary of a series of samples, with one value per bucket of
+# consecutive samples: the index of the middle of the bucket, the min,
+# max and mean, and the lower and upper percentiles of the band.
+class Decimated:
+  def __init__(self, l, buckets=BUCKETS):
+    n = len(l)
+    edges = np.linspace(0, n, min(n, buckets) + 1).astype(int)
+    size = len(edges) - 1
+
+    self.x = (edges[:-1] + edges[1:] - 1) / 2 + 1
+    self.min, self.max, self.mean = (np.empty(size), np.empty(size),
+                                     np.empty(size))
+    self.lower, self.upper = np.empty(size), np.empty(size)
+    for i in range(size):
+      bucket = np.asarray(l[edges[i]:edges[i + 1]], dtype=float)
+      self.min[i], self.max[i] = bucket.min(), bucket.max()
+      self.mean[i] = bucket.mean()
+      self.lower[i], self.upper[i] = np.percentile(bucket, BAND)
+
+
+# Return the counts of a histogram of a list, with "bins" bins between
+# "lo" and "hi", and the bin edges.
+def histogram(l, lo, hi, bins=BINS):
+  if lo == hi:
+    lo, hi = lo - 0.5, hi + 0.5
+  edges = np.linspace(lo, hi, bins + 1)
+  counts = np.zeros(bins, dtype=np.int64)
+  for i in range(0, len(l), _CHUNK_SIZE):
+    chunk = np.asarray(l[i:i + _CHUNK_SIZE], dtype=float)
+    counts += np.histogram(chunk, bins=edges)[0]
+  return counts, edges
+
+
+# Return a kernel density estimate at the centre of each bin of a
+# histogram. This is a binned estimate: the counts are convolved with a
+# Gaussian kernel, whose bandwidth is given by Silverman's rule from
+# the standard deviation and number of samples, so the cost depends on
+# the number of bins rather than the number of samples.
+def kde(counts, edges, stdev, n):
+  width = edges[1] - edges[0]
+  density = counts / (n * width)
+  bandwidth = 1.06 * stdev * n ** -0.2
+  sigma = bandwidth / width
+  if sigma < 0.5:
+    return density
+
+  half = min(int(4 * sigma), (len(counts) - 1) // 2)
+  offsets = np.arange(-half, half + 1)
+  kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+  return np.convolve(density, kernel / kernel.sum(), mode="same")
+
+
+# Return the mean of the samples of each iteration, given the number of
+# samples of each iteration.
+def iteration_means(l, counts):
+  means = []
+  i = 0
+  for count in counts:
+    if count:
+      means.append(sum(l[i:i + count]) / count)
+    i += count
+  return means
+
+
+# Draw a decimated series on an axes.
+def _draw_series(ax, decimated, label, color):
+  ax.fill_between(decimated.x, decimated.min, decimated.max, color=color,
+                  alpha=0.15, linewidth=0)
+  ax.fill_between(decimated.x, decimated.lower, decimated.upper,
+                  color=color, alpha=0.35, linewidth=0)
+  ax.plot(decimated.x, decimated.mean, color=color, linewidth=1,
+          label=label)
+
+
+# Plot a graph of a list of series, each a (label, results, counts,
+# accumulator) tuple, where "counts" is the number of results of each
+# iteration, or None if unknown, and "accumulator" summarises the
+# results. If "ordered" is false, the results are an unordered sample
+# of them, such as a reservoir, so only their distribution is drawn. If
+# "path" is given, render the graph to it, else show it.
+def plot(series, path=None, ordered=True):
+  # Only select a backend with a display when showing the graph:
+  if path:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 8))
+    FigureCanvasAgg(fig)
+  else:
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(10, 8))
+
+  series = [s for s in series if len(s[1])]
+  if not series:
+    raise ValueError("No results to graph")
+
+  # A panel of the mean of each iteration is only drawn if iterations
+  # have more than one result, e.g. in filter mode, and their counts
+  # are known:
+  traces = any(counts is not None and len(results) != len(counts)
+               for _, results, counts, _ in series)
+  # The panel of the results in order is only drawn if they are
+  # ordered:
+  rows = int(ordered) + 1 + int(traces)
+  samples = fig.add_subplot(rows, 1, 1) if ordered else None
+  distribution = fig.add_subplot(rows, 1, int(ordered) + 1)
+  trace = fig.add_subplot(rows, 1, rows) if traces else None
+
+  lo = min(acc.min for _, _, _, acc in series)
+  hi = max(acc.max for _, _, _, acc in series)
+
+  for i, (label, results, counts, acc) in enumerate(series):
+    color = "C{0}".format(i % 10)
+    if samples:
+      _draw_series(samples, Decimated(results), label, color)
+
+    bins, edges = histogram(results, lo, hi)
+    centres = (edges[:-1] + edges[1:]) / 2
+    width = edges[1] - edges[0]
+    distribution.bar(centres, bins / (acc.n * width), width=width,
+                     color=color, alpha=0.35)
+    distribution.plot(centres, kde(bins, edges, acc.stdev(), acc.n),
+                      color=color, linewidth=1, label=label)
+
+    if trace and counts is not None:
+      _draw_series(trace, Decimated(iteration_means(results, counts)),
+                   label, color)
+
+  if samples:
+    samples.set_xlabel("Sample")
+    samples.set_ylabel("Time (s)")
+    samples.set_xlim(left=1)
+  distribution.set_xlabel("Time (s)")
+  distribution.set_ylabel("Density")
+  if trace:
+    trace.set_xlabel("Iteration")
+    trace.set_ylabel("Mean time (s)")
+    trace.set_xlim(left=1)
+
+  if len(series) > 1:
+    (samples or distribution).legend()
+  else:
+    fig.suptitle(series[0][0], fontsize=16)
+  fig.tight_layout()
+
+  if path:
+    fig.savefig(path)
+  else:
+    plt.show()
@@ -1,74 +1,99 @@
 import logging as log
-import os
-from time import time
+from time import perf_counter_ns
 
-import pexpect
-from srtime.exceptions import FilterInputException, ProcessException
+from srtime.exceptions import (FilterInputException, ProcessException,
+                               TimeoutException)
+from srtime.spawn import USAGE, spawn
 
 
-# Flush system caches on a Linux operating system. Note that this
-# requires root privileges, which may result in a password prompt for
-# users which have not removed the prompts in their sudoers file.
-def flush_system_caches():
-  log.info("Flushing system caches")
-  os.system('sudo sync && '
-            'echo "echo 3 > /proc/sys/vm/drop_caches" | sudo sh')
+# The metrics which are recorded for each iteration. "time" is the
+# primary metric, which is either the wall time of the process in
+# seconds, or the times filtered from its output. The remainder are
+# the resource usage of the process: user and system CPU time in
+# seconds, max resident set size in kilobytes, minor and major page
+# faults, and voluntary and involuntary context switches.
+METRICS = ["time"] + [name for name, _ in USAGE]
 
 
 class Process:
+  # Whether the output of the process is passed to output_hook(), and
+  # whether it is passed once as bytes rather than line by line:
+  needs_output = False
+  raw_output = False
+
   def __init__(self, options):
     self._options = options
     # Create a list to store times in:
     self._times = []
+    # Create a dict to store the resource usage in:
+    self._usage = {}
+    # Create a dict to store the filtered metrics in:
+    self._samples = {}
+    # Whether the process was killed for exceeding the timeout:
+    self.timed_out = False
+    # The time taken to prepare the page cache, if it is controlled:
+    self.cache_time = None
+
+  # Prepare the page cache for the iteration, if it is controlled.
+  def prepare_cache(self):
+    if self._options.cache_control:
+      self.cache_time = self._options.cache_control.prepare()
 
   def run(self):
     options = self._options
 
-    # Flush the system caches prior to executing the command:
-    if options.flush_caches:
-      flush_system_caches()
+    # Prepare the page cache prior to executing the command:
+    self.prepare_cache()
 
     # Pre-execution hook:
     self.pre_exec_hook()
 
-    # Spawn the process:
-    process = pexpect.spawn(options.command, timeout=None)
-
-    # Buffer the output line by line:
-    for buf in process:
-      # Decode the buffered output into a string.
-      line = buf.decode('raw_unicode_escape').rstrip()
-      # Print the line to stdout if not "quiet".
-      if not options.quiet:
-        print(line)
-      # Process line.
-      self.output_hook(line)
-
-    # Wait until the process terminates:
-    process.close()
-    # Post-execution hook:
-    self.post_exec_hook()
+    # Spawn the process and wait until it terminates. The
+    # post-execution hook is called as soon as it exits, before its
+    # output is passed to the output hook, which is only done if this
+    # process needs it. If the process times out, it has no results:
+    hook = self.output_hook if self.needs_output else None
+    try:
+      exitstatus, self._usage = spawn(options.command,
+                                      backend=options.spawn, hook=hook,
+                                      quiet=options.quiet,
+                                      raw=self.raw_output,
+                                      timeout=options.iteration_timeout,
+                                      environment=options.environment,
+                                      exit_hook=self.post_exec_hook)
+    except TimeoutException as err:
+      log.warning(str(err))
+      self.timed_out = True
+      return
 
     # Throw an exception if the process exited with non-zero
     # status:
-    if process.exitstatus:
-      raise ProcessException(options.command, process.exitstatus)
+    if exitstatus:
+      raise ProcessException(options.command, exitstatus)
 
   def times(self):
     return self._times
 
+  # Return a dict of the resource usage of the process.
+  def usage(self):
+    return self._usage
+
+  # Return a dict mapping each filtered metric to its list of values.
+  def samples(self):
+    return self._samples
+
   # Pre-execution hook, called immediately before the process is
   # spawned.
   def pre_exec_hook(self):
     pass
 
   # Post-execution hook, called immediately after the process
-  # terminates.
+  # terminates, before its output is processed.
   def post_exec_hook(self):
     pass
 
   # Output hook, called for-each line of output buffered from the
-  # process.
+  # process, or once with the output as bytes if "raw_output" is set.
   def output_hook(self, line):
     pass
 
@@ -76,23 +101,51 @@ class Process:
 # A timed process uses a timer to derive the amount of time taken to
 # execute the process.
 class TimedProcess(Process):
-  # Record the starting time.
+  # Record the starting time. This uses a monotonic clock, so that
+  # measurements are unaffected by adjustments to the system clock.
   def pre_exec_hook(self):
-    self._start = time()
+    self._start = perf_counter_ns()
 
-  # Calculate the elapsed time and record it.
+  # Calculate the elapsed time in seconds and record it.
   def post_exec_hook(self):
-    end = time()
-    elapsed = end - self._start
+    end = perf_counter_ns()
+    elapsed = (end - self._start) / 1e9
     self._times.append(elapsed)
 
 
 # A filter process is one which derives its execution times from the
 # output of the process.
 class FilterProcess(Process):
+  needs_output = True
+
   # Record the output as a result.
   def output_hook(self, line):
     try:
       self._times.append(float(line))
     except ValueError:
       raise FilterInputException(line)
+
+
+# An extract process is a timed process which also extracts named
+# metrics from its output using the filter in "options.extractor".
+class ExtractProcess(TimedProcess):
+  needs_output = True
+  raw_output = True
+
+  def output_hook(self, output):
+    self._samples = self._options.extractor.extract(output)
+
+
+# A Python process times a callable in this process, rather than
+# spawning a command. "target" is a srtime.pycall.Target, which is
+# imported once and shared by each iteration.
+class PythonProcess(Process):
+  def __init__(self, options, target):
+    super().__init__(options)
+    self._target = target
+
+  def run(self):
+    self.prepare_cache()
+
+    elapsed, self._usage = self._target.sample()
+    self._times.append(elapsed)
@@ -0,0 +1,120 @@
+# In-process benchmarking of Python callables.
+#
+# A target is a callable named by "package.module:func", which is
+# imported once, and then timed without paying interpreter startup and
+# import costs on every iteration. Like timeit, each sample calls the
+# target in an inner loop, whose length is calibrated so that a sample
+# is long enough to measure precisely, and reports the time per call.
+# The garbage collector is disabled while timing, unless "gc" is set.
+#
+# If "isolate" is set, each sample (and the calibration) runs in a
+# forked child process, so that state cannot leak from one sample into
+# the next. The resource usage of a sample is then that of its child,
+# else it is the change in the resource usage of this process.
+import importlib
+import os
+import resource
+import struct
+import sys
+import timeit
+import traceback
+from time import perf_counter
+
+from srtime.exceptions import InvalidParameterException, ProcessException
+from srtime.spawn import _usage
+
+
+# The format of a result passed from a forked child:
+_RESULT = struct.Struct("<d")
+
+
+# Import and return the callable named by "spec". The name within
+# the module may be dotted, e.g. "module:Class.method".
+def load(spec):
+  module, sep, name = spec.partition(":")
+  if not sep or not module or not name:
+    raise InvalidParameterException("python", spec,
+                                    msg="Expected 'module:function'")
+
+  # Allow modules in the working directory to be imported, as the
+  # timeit command line interface does:
+  if os.curdir not in sys.path:
+    sys.path.insert(0, os.curdir)
+
+  try:
+    target = importlib.import_module(module)
+    for attr in name.split("."):
+      target = getattr(target, attr)
+  except (ImportError, AttributeError) as err:
+    raise InvalidParameterException("python", spec, msg=str(err))
+  if not callable(target):
+    raise InvalidParameterException("python", spec,
+                                    msg="'{0}' is not callable".format(name))
+  return target
+
+
+# Run "fn" in a forked child process, and return the float it returns,
+# and the resource usage of the child. "name" is used to report a
+# failure of the child.
+def _in_child(fn, name):
+  r, w = os.pipe()
+  pid = os.fork()
+  if not pid:
+    code = 0
+    try:
+      os.close(r)
+      os.write(w, _RESULT.pack(fn()))
+    except BaseException:
+      traceback.print_exc()
+      sys.stderr.flush()
+      code = 1
+    finally:
+      os._exit(code)
+
+  os.close(w)
+  with os.fdopen(r, "rb") as pipe:
+    result = pipe.read()
+  _, status, rusage = os.wait4(pid, 0)
+  code = os.waitstatus_to_exitcode(status)
+  if code:
+    raise ProcessException(name, code)
+  return _RESULT.unpack(result)[0], _usage(rusage)
+
+
+class Target:
+  # "spec" names the callable, and "setup" is a statement which is
+  # executed once in the namespace of its module, after importing it.
+  def __init__(self, spec, setup="pass", gc=False, isolate=False):
+    self.spec = spec
+    self.isolate = isolate
+    self.func = load(spec)
+
+    module = sys.modules[spec.partition(":")[0]]
+    exec(setup, vars(module))
+
+    self._timer = timeit.Timer(self.func, timer=perf_counter,
+                               setup="import gc; gc.enable()" if gc else "")
+    # The number of calls per sample, once calibrated:
+    self.number = None
+
+  # Return the number of calls per sample, such that a sample takes at
+  # least 0.2 seconds.
+  def _autorange(self):
+    return float(self._timer.autorange()[0])
+
+  # Return the time per call of a sample in seconds, and the resource
+  # usage of the sample.
+  def sample(self):
+    if self.isolate:
+      if self.number is None:
+        self.number = int(_in_child(self._autorange, self.spec)[0])
+      return _in_child(self._time, self.spec)
+
+    if self.number is None:
+      self.number = int(self._autorange())
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    elapsed = self._time()
+    return elapsed, _usage(resource.getrusage(resource.RUSAGE_SELF), before)
+
+  def _time(self):
+    return self._timer.timeit(self.number) / self.number
@@ -0,0 +1,337 @@
+# Spawn backends. Each backend executes a command to completion and
+# returns its exit code and resource usage. If an output hook is
+# given, it is called for-each line of output from the process, or if
+# "raw" is true, it is called once with the complete output as bytes.
+# If an exit hook is given, it is called as soon as the process has
+# exited, before any buffered output is printed or passed to the
+# output hook, so that their cost is not included in timings.
+#
+# The backends trade generality for overhead:
+#
+#   pty          Runs the command on a pseudo-terminal using pexpect,
+#                reading and decoding its output line by line. Use
+#                this for programs which require a TTY.
+#   pipe         Forks and execs the command. If the output is not
+#                needed, the child writes straight to our stdout (or
+#                /dev/null when quiet). Otherwise it is read through a
+#                pipe in bulk and split into lines once the process
+#                has exited.
+#   posix_spawn  As pipe, but uses posix_spawn() rather than fork(),
+#                which avoids copying the page tables of the parent.
+#
+# If a timeout is given, the command runs in its own process group,
+# which is sent SIGTERM when the timeout expires, and SIGKILL if it has
+# not exited after a grace period.
+#
+# If an environment is given (a srtime.environment.Environment), its
+# settings are applied in the child before it execs the command, and
+# the child is given its environment variables. posix_spawn can only
+# apply its scheduler policy.
+#
+# The pipe and posix_spawn backends reap the child with wait4(), which
+# returns the resource usage of that child alone. The pty backend
+# instead measures the change in the resource usage of all children,
+# so when iterations run in parallel its usage figures are shared
+# between the concurrent processes, and "maxrss" is the high-water mark
+# of all children so far.
+#
+# With every backend, "maxrss" includes the memory of the child before
+# it execs the command: a copy of srtime after fork(), or srtime itself
+# with posix_spawn, which shares its memory. So it is at least the
+# memory of srtime.
+import os
+import resource
+import select
+import shlex
+import signal
+import sys
+from time import monotonic, sleep
+
+from srtime.exceptions import EnvironmentException, TimeoutException
+
+
+BACKENDS = ["pty", "pipe", "posix_spawn"]
+
+# The number of bytes to read from a pipe at a time:
+_BUFSIZE = 65536
+
+# The number of seconds a timed out process group is given to exit
+# after SIGTERM, before it is sent SIGKILL:
+KILL_GRACE = 1
+
+# The interval in seconds at which to poll for a process to exit, where
+# it cannot be waited for with a timeout:
+_POLL_INTERVAL = 0.01
+
+
+# The resource usage fields which are reported, in order:
+USAGE = [("utime", "ru_utime"),
+         ("stime", "ru_stime"),
+         ("maxrss", "ru_maxrss"),
+         ("minflt", "ru_minflt"),
+         ("majflt", "ru_majflt"),
+         ("nvcsw", "ru_nvcsw"),
+         ("nivcsw", "ru_nivcsw")]
+
+
+# Return a dict of resource usage from a struct_rusage. If "before" is
+# given, return the difference between the two.
+def _usage(rusage, before=None):
+  usage = {}
+  for name, field in USAGE:
+    value = getattr(rusage, field)
+    if before is not None and name != "maxrss":
+      value -= getattr(before, field)
+    usage[name] = value
+  return usage
+
+
+# Run "command" on a pseudo-terminal.
+def _spawn_pty(command, hook, quiet, raw, timeout, environment,
+               exit_hook):
+  import pexpect
+
+  before = resource.getrusage(resource.RUSAGE_CHILDREN)
+  deadline = None if timeout is None else monotonic() + timeout
+
+  # Spawn the process. It is the leader of a new session, and so of
+  # its own process group:
+  if environment:
+    process = pexpect.spawn(command, timeout=None, env=environment.env,
+                            preexec_fn=environment.apply)
+  else:
+    process = pexpect.spawn(command, timeout=None)
+
+  # Buffer the output line by line:
+  bufs = []
+  while True:
+    if deadline is not None:
+      process.timeout = max(deadline - monotonic(), 0)
+    try:
+      buf = process.readline()
+    except pexpect.TIMEOUT:
+      _kill_pty(process)
+      raise TimeoutException(command, timeout)
+    if not buf:
+      break
+
+    if raw:
+      bufs.append(buf)
+    # Decode the buffered output into a string.
+    line = buf.decode('raw_unicode_escape').rstrip()
+    # Print the line to stdout if not "quiet".
+    if not quiet:
+      print(line)
+    # Process line.
+    if hook and not raw:
+      hook(line)
+
+  # Wait until the process terminates:
+  if deadline is not None and not _wait_pty(process, deadline):
+    _kill_pty(process)
+    raise TimeoutException(command, timeout)
+  # Reap the process and stop the clock before closing the pty, since
+  # close() sleeps to let the kernel update the status of the process,
+  # which has already been reaped:
+  process.wait()
+  if exit_hook:
+    exit_hook()
+  process.delayafterclose = 0
+  process.close()
+  if hook and raw:
+    hook(b"".join(bufs))
+  usage = _usage(resource.getrusage(resource.RUSAGE_CHILDREN), before)
+  return process.exitstatus, usage
+
+
+# Wait until a pexpect process terminates or the deadline passes, and
+# return whether it terminated.
+def _wait_pty(process, deadline):
+  while process.isalive():
+    if monotonic() >= deadline:
+      return False
+    sleep(_POLL_INTERVAL)
+  return True
+
+
+# Kill the process group of a pexpect process.
+def _kill_pty(process):
+  _signal_group(process.pid, signal.SIGTERM)
+  if not _wait_pty(process, monotonic() + KILL_GRACE):
+    _signal_group(process.pid, signal.SIGKILL)
+  process.close(force=True)
+
+
+# Fork and exec "argv", with "fd" as its stdout. If "group" is true,
+# the child is the leader of a new process group.
+def _fork_exec(argv, fd, group=False, environment=None):
+  pid = os.fork()
+  if not pid:
+    try:
+      if group:
+        os.setpgid(0, 0)
+      if fd is not None:
+        os.dup2(fd, 1)
+      if environment:
+        environment.apply()
+      if environment and environment.env is not None:
+        os.execvpe(argv[0], argv, environment.env)
+      else:
+        os.execvp(argv[0], argv)
+    except OSError as err:
+      os.write(2, "{0}: {1}\n".format(argv[0], err.strerror).encode())
+    except EnvironmentException as err:
+      os.write(2, "{0}\n".format(err).encode())
+    finally:
+      os._exit(127)
+  return pid
+
+
+# Spawn "argv" with "fd" as its stdout. If "group" is true, the child
+# is the leader of a new process group.
+def _posix_spawn(argv, fd, group=False, environment=None):
+  file_actions = []
+  if fd is not None:
+    file_actions.append((os.POSIX_SPAWN_DUP2, fd, 1))
+  kwargs = {"setpgroup": 0} if group else {}
+  env = os.environ
+  if environment:
+    if environment.child_settings():
+      raise ValueError("posix_spawn cannot apply {0}"
+                       .format(", ".join(environment.child_settings())))
+    if environment.scheduler is not None:
+      kwargs["scheduler"] = environment.posix_spawn_scheduler()
+    if environment.env is not None:
+      env = environment.env
+  return os.posix_spawnp(argv[0], argv, env, file_actions=file_actions,
+                         **kwargs)
+
+
+# Send a signal to a process group, ignoring a group which has already
+# exited.
+def _signal_group(pgid, sig):
+  try:
+    os.killpg(pgid, sig)
+  except ProcessLookupError:
+    pass
+
+
+# Wait until the child "pid" terminates or the deadline passes. Return
+# the result of wait4(), or None on timeout. On Linux this waits on a
+# pidfd, else it polls.
+def _wait(pid, deadline):
+  if deadline is None:
+    return os.wait4(pid, 0)
+
+  if hasattr(os, "pidfd_open"):
+    pidfd = os.pidfd_open(pid)
+    try:
+      poll = select.poll()
+      poll.register(pidfd, select.POLLIN)
+      if not poll.poll(max(deadline - monotonic(), 0) * 1000):
+        return None
+    finally:
+      os.close(pidfd)
+    return os.wait4(pid, 0)
+
+  while True:
+    result = os.wait4(pid, os.WNOHANG)
+    if result[0]:
+      return result
+    if monotonic() >= deadline:
+      return None
+    sleep(_POLL_INTERVAL)
+
+
+# Kill the process group led by "pid": ask it to terminate, and force
+# it if it has not exited within the grace period. Returns once the
+# child has been reaped.
+def _kill(pid):
+  _signal_group(pid, signal.SIGTERM)
+  result = _wait(pid, monotonic() + KILL_GRACE)
+  # Kill any stragglers, as well as the child if it is still running:
+  _signal_group(pid, signal.SIGKILL)
+  if result is None:
+    os.wait4(pid, 0)
+
+
+# Run "command" using a spawn function "spawnfn" which returns the
+# pid of the child process.
+def _spawn_direct(spawnfn, command, hook, quiet, raw, timeout, environment,
+                  exit_hook):
+  argv = shlex.split(command)
+  deadline = None if timeout is None else monotonic() + timeout
+  # The command runs in its own process group, so that it can be
+  # killed along with its children:
+  group = timeout is not None
+
+  if hook:
+    # Read the output through a pipe:
+    r, w = os.pipe()
+    try:
+      pid = spawnfn(argv, w, group, environment)
+    finally:
+      os.close(w)
+
+    chunks = []
+    with os.fdopen(r, "rb", buffering=0) as pipe:
+      while True:
+        if deadline is not None:
+          ready, _, _ = select.select([r], [], [],
+                                      max(deadline - monotonic(), 0))
+          if not ready:
+            _kill(pid)
+            raise TimeoutException(command, timeout)
+        chunk = pipe.read(_BUFSIZE)
+        if not chunk:
+          break
+        chunks.append(chunk)
+  elif quiet:
+    # Discard the output:
+    with open(os.devnull, "wb") as devnull:
+      pid = spawnfn(argv, devnull.fileno(), group, environment)
+  else:
+    # Inherit our stdout:
+    pid = spawnfn(argv, None, group, environment)
+
+  # Wait until the process terminates:
+  result = _wait(pid, deadline)
+  if result is None:
+    _kill(pid)
+    raise TimeoutException(command, timeout)
+  _, status, rusage = result
+  if exit_hook:
+    exit_hook()
+
+  if hook:
+    output = b"".join(chunks)
+    if not quiet:
+      sys.stdout.flush()
+      sys.stdout.buffer.write(output)
+      sys.stdout.flush()
+    if raw:
+      hook(output)
+    else:
+      for line in output.decode('raw_unicode_escape').splitlines():
+        hook(line.rstrip())
+
+  return os.waitstatus_to_exitcode(status), _usage(rusage)
+
+
+# Execute "command" using the given backend and return its exit code
+# and a dict of resource usage. If "timeout" is given and the command
+# takes longer, its process group is killed and a TimeoutException is
+# raised.
+def spawn(command, backend="pty", hook=None, quiet=False, raw=False,
+          timeout=None, environment=None, exit_hook=None):
+  if backend == "pty":
+    return _spawn_pty(command, hook, quiet, raw, timeout, environment,
+                      exit_hook)
+  elif backend == "pipe":
+    return _spawn_direct(_fork_exec, command, hook, quiet, raw, timeout,
+                         environment, exit_hook)
+  elif backend == "posix_spawn":
+    return _spawn_direct(_posix_spawn, command, hook, quiet, raw, timeout,
+                         environment, exit_hook)
+  else:
+    raise ValueError("Unknown spawn backend '{0}'".format(backend))
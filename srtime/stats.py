@@ -1,9 +1,50 @@
-from math import sqrt
+import builtins
+import csv
+import io
+import random
+from bisect import bisect_left
+from collections import deque
+from math import ceil, exp, floor, log, sqrt
 
-import scipy.stats
+from srtime.distributions import normcdf, normppf, tcdf, tppf
 from srtime.exceptions import InvalidParameterException
 
 
+# The names of the attributes which every Stats has:
+ATTRIBUTES = ["mean", "c1", "c2", "confidence", "threshold", "min", "max",
+              "range", "variance", "n"]
+
+# The percentiles which are reported, as (name, fraction) pairs:
+PERCENTILES = [("median", 0.5),
+               ("p90", 0.9),
+               ("p99", 0.99),
+               ("p999", 0.999)]
+
+# The valid confidence interval and bootstrap methods:
+CI_METHODS = ["parametric", "bootstrap"]
+BOOTSTRAP_METHODS = ["percentile", "bca"]
+
+# The valid outlier handling modes and classification methods:
+OUTLIER_MODES = ["keep", "flag", "reject"]
+OUTLIER_METHODS = ["tukey", "mad"]
+
+# The multiples of the spread beyond which samples are mild and severe
+# outliers. For Tukey's fences the spread is the interquartile range,
+# and for MAD it is the median absolute deviation scaled to estimate
+# the standard deviation of a normal distribution:
+_TUKEY_FENCES = (1.5, 3)
+_MAD_FENCES = (3, 5)
+_MAD_SCALE = 1.4826
+
+# The number of samples before outliers are classified incrementally:
+_OUTLIER_MIN_SAMPLES = 5
+
+# The maximum number of samples drawn in a single batch of bootstrap
+# resamples, which bounds the memory used to 8 bytes per sample for the
+# indices and the same for the values:
+_BOOTSTRAP_BATCH = 1 << 22
+
+
 # Return the mean value of a list
 def mean(l):
   if len(l):
@@ -23,10 +64,9 @@ def range(l):
 # Return the variance of a list
 def variance(l):
   if len(l) > 1:
-    differences = []
-    for n in l:
-      differences.append((n - mean(l)) ** 2)
-    return sum(differences) / (len(differences) - 1)
+    # Compute the mean once, rather than once per element:
+    m = mean(l)
+    return sum((n - m) ** 2 for n in l) / (len(l) - 1)
   else:
     return 0
 
@@ -36,77 +76,1108 @@ def stdev(l):
   return sqrt(variance(l))
 
 
+# Return the confidence interval for a mean "m" with standard error
+# "scale" and "df" degrees of freedom, for a given confidence "c". If
+# "normal" is true, use a normal (Gaussian) distribution, else use a
+# t-distribution.
+def _interval(m, scale, df, normal, c=0.95):
+  if not scale:
+    # All of the samples are identical:
+    return m, m
+
+  # The quantile of the upper bound:
+  p = (1 + c) / 2
+  if normal:
+    width = normppf(p) * scale
+  else:
+    width = tppf(p, df) * scale
+  return m - width, m + width
+
+
+# Return the confidence interval for a mean "m" with standard
+# deviation "s" derived from "count" samples, for a given confidence
+# "c" and Gaussian threshold "n".
+def interval(m, s, count, c=0.95, n=30):
+  if count > 1:
+    # For large values of n, use a normal (Gaussian) distribution,
+    # and for small values of n, use a t-distribution:
+    return _interval(m, s / sqrt(count), count - 1, count >= n, c)
+  else:
+    return 0, 0
+
+
+# Return the standard error of the difference between the means of
+# two Accumulators "a" and "b", and its degrees of freedom using
+# Welch's approximation.
+def _welch(a, b):
+  va, vb = a.variance() / a.n, b.variance() / b.n
+  scale = sqrt(va + vb)
+  if not scale:
+    return scale, 0
+  df = (va + vb) ** 2 / (va ** 2 / (a.n - 1) + vb ** 2 / (b.n - 1))
+  return scale, df
+
+
+# Return the confidence interval for the difference between the
+# means of two Accumulators "a" and "b".
+def diffinterval(a, b, c=0.95, n=30):
+  if a.n < 2 or b.n < 2:
+    return 0, 0
+
+  scale, df = _welch(a, b)
+  return _interval(a.mean - b.mean, scale, df, min(a.n, b.n) >= n, c)
+
+
+# Return the ratio of the means of two Accumulators "a" and "b", and
+# its confidence interval, using the delta method. If the ratio is
+# undefined, return None for each.
+def ratiointerval(a, b, c=0.95, n=30):
+  if a.n < 2 or b.n < 2 or not a.mean or not b.mean:
+    return None, None, None
+
+  r = a.mean / b.mean
+  va = a.variance() / a.n / a.mean ** 2
+  vb = b.variance() / b.n / b.mean ** 2
+  scale = abs(r) * sqrt(va + vb)
+  _, df = _welch(a, b)
+  c1, c2 = _interval(r, scale, df, min(a.n, b.n) >= n, c)
+  return r, c1, c2
+
+
+# Return the p-value of Welch's t-test of whether two Accumulators "a"
+# and "b" have the same mean. If there are too few samples, return
+# None.
+def welch(a, b):
+  if a.n < 2 or b.n < 2:
+    return None
+
+  scale, df = _welch(a, b)
+  if not scale:
+    return 1.0 if a.mean == b.mean else 0.0
+  t = (a.mean - b.mean) / scale
+  return 2 * tcdf(-abs(t), df)
+
+
+# Return the p-value of a Mann-Whitney U test of whether the samples
+# in lists "a" and "b" come from the same distribution. If either list
+# is empty, return None.
+def ranktest(a, b):
+  if not len(a) or not len(b):
+    return None
+
+  import scipy.stats
+  return scipy.stats.mannwhitneyu(a, b, alternative="two-sided").pvalue
+
+
 # Return the confidence interval of a list for a given confidence
 def confinterval(l, c=0.95, n=30):
-  if len(l) > 1:
-    scale = stdev(l) / sqrt(len(l))
+  return interval(mean(l), stdev(l), len(l), c, n)
+
+
+# Return the p-value of a Kruskal-Wallis H-test of whether the samples
+# in a list of groups come from the same distribution. If there are
+# fewer than two groups, or all samples are identical, return None.
+def grouptest(groups):
+  groups = [g for g in groups if len(g)]
+  if len(groups) < 2:
+    return None
+
+  import scipy.stats
+  try:
+    return scipy.stats.kruskal(*groups).pvalue
+  except ValueError:
+    return None
 
-    if len(l) >= n:
-      # For large values of n, use a normal (Gaussian) distribution:
-      c1, c2 = scipy.stats.norm.interval(c, loc=mean(l), scale=scale)
-    else:
-      # For small values of n, use a t-distribution:
-      c1, c2 = scipy.stats.t.interval(c, len(l) - 1, loc=mean(l), scale=scale)
 
-    return c1, c2
+# Return the "q"th quantile, 0 <= q <= 1, of a sorted list, linearly
+# interpolating between adjacent samples.
+def _quantile(s, q):
+  pos = q * (len(s) - 1)
+  i = int(pos)
+  if i + 1 >= len(s) or i == pos or s[i] == s[i + 1]:
+    return s[i]
+  return s[i] + (s[i + 1] - s[i]) * (pos - i)
+
+
+# Return a list of the quantiles of a list for each of "qs". The list
+# is sorted once for all quantiles.
+def percentiles(l, qs):
+  if not len(l):
+    return [0] * len(qs)
+  s = sorted(l)
+  return [_quantile(s, q) for q in qs]
+
+
+# Return the median of a list
+def median(l):
+  return percentiles(l, [0.5])[0]
+
+
+# Return the mild and severe outlier fences, each a (low, high) pair,
+# for a given method. For "tukey", "a" and "b" are the lower and upper
+# quartiles, and for "mad", they are the median and the median
+# absolute deviation.
+def _fences(method, a, b):
+  if method == "tukey":
+    iqr = b - a
+    return [(a - k * iqr, b + k * iqr) for k in _TUKEY_FENCES]
   else:
-    return 0, 0
+    spread = _MAD_SCALE * b
+    return [(a - k * spread, a + k * spread) for k in _MAD_FENCES]
+
+
+# Return the mild and severe outlier fences of a list.
+def fences(l, method="tukey"):
+  if method == "tukey":
+    return _fences(method, *percentiles(l, [0.25, 0.75]))
+  else:
+    m = median(l)
+    return _fences(method, m, median([abs(x - m) for x in l]))
+
+
+# Classify a sample against a pair of fences. Return 0 if it is not an
+# outlier, 1 if it is a mild outlier, or 2 if it is a severe outlier.
+def classify(x, fences):
+  (mild_lo, mild_hi), (severe_lo, severe_hi) = fences
+  if x < severe_lo or x > severe_hi:
+    return 2
+  elif x < mild_lo or x > mild_hi:
+    return 1
+  else:
+    return 0
+
+
+# Return the leave-one-out values of a statistic for a numpy array
+# "x", in O(n) for the mean and O(n log n) for the median.
+def _jackknife(x, statistic):
+  import numpy as np
+
+  n = len(x)
+  if statistic == "mean":
+    return (x.sum() - x) / (n - 1)
+
+  # Leaving out the sample of rank r shifts every later sample down
+  # by one, so the median of the rest is read from the sorted array:
+  order = np.argsort(x, kind="stable")
+  s = x[order]
+  ranks = np.empty(n, dtype=np.intp)
+  ranks[order] = np.arange(n)
+
+  def rest(j):
+    return s[j + (j >= ranks)]
+
+  m = n - 1
+  if m % 2:
+    return rest(m // 2)
+  return (rest(m // 2 - 1) + rest(m // 2)) / 2
+
+
+# Return the bootstrap confidence interval of a statistic, "mean" or
+# "median", of a list, for a given confidence "c". The "method" is
+# either "percentile" or "bca" (bias-corrected and accelerated).
+# Resamples of the mean are drawn in batches of a 2D array of indices,
+# so each batch is reduced by a single vectorised call, which costs
+# O(n) per resample. The median of a resample is an order statistic of
+# its indices into the sorted list, and the k-th smallest of n uniform
+# draws is Beta(k, n + 1 - k) distributed, so it is drawn directly in
+# O(1) per resample. "rng" is an optional numpy Generator.
+def bootstrap(l, statistic="mean", c=0.95, method="bca", resamples=10000,
+              rng=None):
+  import numpy as np
+
+  x = np.asarray(l, dtype=float)
+  n = len(x)
+  if n < 2:
+    value = float(x[0]) if n else 0
+    return value, value
+
+  if rng is None:
+    rng = np.random.default_rng()
+  reduce = np.mean if statistic == "mean" else np.median
+
+  if statistic == "median":
+    s = np.sort(x)
+    k = (n + 1) // 2
+    u = rng.beta(k, n + 1 - k, size=resamples)
+    estimates = s[np.minimum((u * n).astype(np.intp), n - 1)]
+    if not n % 2:
+      # The median is the mean of the k-th and the next order
+      # statistic, which is the least of the n - k draws above the k-th:
+      u += (1 - u) * rng.beta(1, n - k, size=resamples)
+      estimates = (estimates +
+                   s[np.minimum((u * n).astype(np.intp), n - 1)]) / 2
+  else:
+    estimates = np.empty(resamples)
+    batch = max(1, min(resamples, _BOOTSTRAP_BATCH // n))
+    for start in builtins.range(0, resamples, batch):
+      k = min(batch, resamples - start)
+      indices = rng.integers(0, n, size=(k, n))
+      estimates[start:start + k] = reduce(x[indices], axis=1)
+
+  alpha = (1 - c) / 2
+  levels = [alpha, 1 - alpha]
+
+  if method == "bca":
+    theta = float(reduce(x))
+    below = np.count_nonzero(estimates < theta) / resamples
+    # The bias correction is undefined if every resample falls on one
+    # side of the estimate, e.g. all samples are identical, so fall
+    # back to the percentile interval:
+    if 0 < below < 1:
+      z0 = normppf(below)
+      jack = _jackknife(x, statistic)
+      d = jack.mean() - jack
+      denominator = 6 * float((d ** 2).sum()) ** 1.5
+      a = float((d ** 3).sum()) / denominator if denominator else 0
+      levels = []
+      for level in (alpha, 1 - alpha):
+        z = z0 + normppf(level)
+        levels.append(normcdf(z0 + z / (1 - a * z)))
+
+  c1, c2 = np.quantile(estimates, levels)
+  return float(c1), float(c2)
+
+
+# A streaming accumulator of summary statistics. Samples are added one
+# at a time using push(), which updates the running count, mean, sum
+# of squared differences, min and max in O(1) using Welford's
+# algorithm. Two accumulators can be combined using merge(), so that
+# partial results may be gathered independently.
+class Accumulator:
+  def __init__(self, l=None):
+    self.n = 0
+    self.mean = 0
+    self.m2 = 0
+    self.min = None
+    self.max = None
+
+    if l is not None:
+      self.extend(l)
+
+  # Add a single sample.
+  def push(self, x):
+    self.n += 1
+    delta = x - self.mean
+    self.mean += delta / self.n
+    self.m2 += delta * (x - self.mean)
+
+    if self.min is None or x < self.min:
+      self.min = x
+    if self.max is None or x > self.max:
+      self.max = x
+
+  # Add a list or numpy array of samples. The samples are summarised
+  # in two passes and then merged, which gives the same results as
+  # the module-level helpers.
+  def extend(self, l):
+    if not len(l):
+      return
+
+    batch = Accumulator()
+    batch.n = len(l)
+    if hasattr(l, "dtype"):
+      # Vectorised summary of a numpy array:
+      batch.mean = float(l.mean())
+      batch.m2 = float(((l - batch.mean) ** 2).sum())
+      batch.min = float(l.min())
+      batch.max = float(l.max())
+    else:
+      batch.mean = mean(l)
+      batch.m2 = sum((x - batch.mean) ** 2 for x in l)
+      batch.min = min(l)
+      batch.max = max(l)
+
+    self.merge(batch)
+
+  # Combine the samples of another accumulator into this one, using
+  # Chan et al.'s parallel update.
+  def merge(self, other):
+    if not other.n:
+      return self
+    if not self.n:
+      self.n, self.mean, self.m2 = other.n, other.mean, other.m2
+      self.min, self.max = other.min, other.max
+      return self
+
+    n = self.n + other.n
+    delta = other.mean - self.mean
+    self.mean += delta * other.n / n
+    self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+    self.n = n
+    self.min = min(self.min, other.min)
+    self.max = max(self.max, other.max)
+    return self
+
+  def range(self):
+    if self.n:
+      return self.max - self.min
+    else:
+      return 0
+
+  def variance(self):
+    if self.n > 1:
+      return self.m2 / (self.n - 1)
+    else:
+      return 0
+
+  def stdev(self):
+    return sqrt(self.variance())
+
+  def confinterval(self, c=0.95, n=30):
+    return interval(self.mean, self.stdev(), self.n, c, n)
+
+  # Return the half-width of the confidence interval as a fraction of
+  # the mean. If the precision cannot be determined, e.g. there are
+  # fewer than two samples, return None.
+  def precision(self, c=0.95, n=30):
+    if self.n < 2 or not self.mean:
+      return None
+    c1, c2 = self.confinterval(c, n)
+    return (c2 - c1) / 2 / abs(self.mean)
+
+
+# An incremental detector of the end of warmup. Samples are added one
+# at a time using push(). The detector keeps two adjacent windows of
+# the most recent samples, and once their means are not significantly
+# different at the given confidence, the series is considered to have
+# reached a steady state. The number of samples before the older
+# window are the warmup. Each push() is O(1).
+class SteadyState:
+  def __init__(self, window=10, confidence=0.95):
+    self.window = window
+    self.z = normppf((1 + confidence) / 2)
+    self.n = 0
+    self.steady = False
+    self.warmup = None
+
+    # The samples of the older and newer windows, and their sums and
+    # sums of squares:
+    self._older, self._newer = deque(), deque()
+    self._sums = [0, 0]
+    self._sqsums = [0, 0]
+
+  def push(self, x):
+    if self.steady:
+      return
+    self.n += 1
+
+    self._newer.append(x)
+    self._sums[1] += x
+    self._sqsums[1] += x * x
+
+    # Slide the windows:
+    if len(self._newer) > self.window:
+      y = self._newer.popleft()
+      self._sums[1] -= y
+      self._sqsums[1] -= y * y
+      self._older.append(y)
+      self._sums[0] += y
+      self._sqsums[0] += y * y
+    if len(self._older) > self.window:
+      y = self._older.popleft()
+      self._sums[0] -= y
+      self._sqsums[0] -= y * y
+
+    if len(self._older) < self.window:
+      return
+
+    # Compare the means of the windows. The variance of the newer
+    # window is used as the noise level of both, since the variance
+    # of the older window is inflated by any warmup trend within it:
+    w = self.window
+    means = [total / w for total in self._sums]
+    variance = max(self._sqsums[1] - w * means[1] ** 2, 0) / (w - 1)
+    if abs(means[0] - means[1]) <= self.z * sqrt(2 * variance / w):
+      self.steady = True
+      self.warmup = self.n - 2 * w
+
+
+# A streaming estimate of the "p"th quantile, 0 < p < 1, using the P²
+# algorithm of Jain and Chlamtac. Rather than storing the samples, it
+# keeps five markers whose heights approximate the minimum, the p/2,
+# p and (1 + p)/2 quantiles, and the maximum, adjusting them with a
+# piecewise parabolic fit as samples arrive. Each push() is O(1).
+class P2Quantile:
+  def __init__(self, p):
+    self.p = p
+    self.n = 0
+    # The marker heights, their positions, and desired positions:
+    self._heights = []
+    self._positions = [1, 2, 3, 4, 5]
+    self._desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+    self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+  def push(self, x):
+    self.n += 1
+    q = self._heights
+    if self.n <= 5:
+      q.append(x)
+      q.sort()
+      return
+
+    # Find the cell containing x, extending the extremes if needed:
+    if x < q[0]:
+      q[0] = x
+      k = 0
+    elif x >= q[4]:
+      q[4] = x
+      k = 3
+    else:
+      k = 0
+      while x >= q[k + 1]:
+        k += 1
+
+    positions = self._positions
+    for i in builtins.range(k + 1, 5):
+      positions[i] += 1
+    for i in builtins.range(5):
+      self._desired[i] += self._increments[i]
+
+    # Move the middle markers towards their desired positions:
+    for i in builtins.range(1, 4):
+      d = self._desired[i] - positions[i]
+      if ((d >= 1 and positions[i + 1] - positions[i] > 1) or
+          (d <= -1 and positions[i - 1] - positions[i] < -1)):
+        d = 1 if d > 0 else -1
+        height = self._parabolic(i, d)
+        if not q[i - 1] < height < q[i + 1]:
+          height = q[i] + d * (q[i + d] - q[i]) / (positions[i + d] -
+                                                   positions[i])
+        q[i] = height
+        positions[i] += d
+
+  def _parabolic(self, i, d):
+    q, n = self._heights, self._positions
+    return q[i] + d / (n[i + 1] - n[i - 1]) * (
+        (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+        (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+  # Return the estimate of the quantile. Up to five samples, it is
+  # exact.
+  def value(self):
+    if not self.n:
+      return None
+    if self.n <= 5:
+      return _quantile(self._heights, self.p)
+    return self._heights[2]
+
+
+# An incremental outlier classifier. Samples are added one at a time
+# using push(), which classifies each sample against the fences of the
+# samples before it, as classify() does, and updates streaming
+# estimates of the quartiles (for "tukey") or the median and median
+# absolute deviation (for "mad") in O(1). "robust" is an Accumulator
+# of the samples which were not outliers when they arrived, and
+# "mild" and "severe" count the outliers.
+class OutlierDetector:
+  def __init__(self, method="tukey"):
+    self.method = method
+    self.robust = Accumulator()
+    self.mild, self.severe = 0, 0
+    if method == "tukey":
+      self._estimators = [P2Quantile(0.25), P2Quantile(0.75)]
+    else:
+      self._estimators = [P2Quantile(0.5), P2Quantile(0.5)]
+    # The samples before the estimates are seeded:
+    self._initial = []
+
+  # Return the current mild and severe fences, or None if the
+  # estimates are not yet seeded.
+  def fences(self):
+    if self._initial is not None:
+      return None
+    a, b = self._estimators
+    return _fences(self.method, a.value(), b.value())
+
+  # Add and classify a sample, returning its class. The first few
+  # samples are not classified, and are used to seed the estimates so
+  # that the median absolute deviation is measured from a settled
+  # median.
+  def push(self, x):
+    if self._initial is not None:
+      self._initial.append(x)
+      self.robust.push(x)
+      if len(self._initial) == _OUTLIER_MIN_SAMPLES:
+        m = median(self._initial)
+        for y in self._initial:
+          self._add(y, m)
+        self._initial = None
+      return 0
+
+    cls = classify(x, self.fences())
+    if cls == 0:
+      self.robust.push(x)
+    elif cls == 1:
+      self.mild += 1
+    else:
+      self.severe += 1
+    self._add(x, self._estimators[0].value())
+    return cls
+
+  # Update the estimates with a sample, where "m" is the current
+  # estimate of the median.
+  def _add(self, x, m):
+    a, b = self._estimators
+    a.push(x)
+    if self.method == "tukey":
+      b.push(x)
+    else:
+      b.push(abs(x - m))
+
+
+# Return the fractions of the ranks which bound the confidence interval
+# of the "q"th quantile of "n" samples. The rank of the quantile is
+# binomially distributed, which is approximated as normal.
+def rankinterval(n, q, c=0.95):
+  z = normppf(1 - (1 - c) / 2)
+  spread = z * sqrt(n * q * (1 - q))
+  return max(q - spread / n, 0), min(q + spread / n, 1)
+
+
+# A mergeable quantile sketch, using the KLL algorithm of Karnin, Lang
+# and Liberty. Samples are added using push() or extend(), and kept in
+# a hierarchy of compactors. When the sketch is full, a compactor is
+# sorted and every other sample, from a random offset, is promoted to
+# the next level, where each sample has twice the weight. The memory
+# used is O(k) however many samples are added, and the rank error of a
+# quantile is about 1.7 / k.
+class KLL:
+  def __init__(self, k=200, rng=None):
+    self.k = k
+    self.n = 0
+    self.min = None
+    self.max = None
+    self._rng = rng or random.Random()
+    self._levels = [[]]
+    self._size = 0
+    self._max_size = self._capacity(0)
+    # The sorted (sample, cumulative weight) lists, until the next push:
+    self._sorted = None
+
+  # Return the capacity of a level. Lower levels have geometrically
+  # smaller capacities, down to a minimum of 2, except the lowest level,
+  # which buffers k samples so that compactions are amortised over many
+  # samples. This only improves the accuracy.
+  def _capacity(self, level):
+    if not level:
+      return self.k
+    depth = len(self._levels) - level - 1
+    return max(int(ceil(self.k * (2 / 3) ** depth)), 2)
+
+  def push(self, x):
+    self._levels[0].append(x)
+    self._size += 1
+    self.n += 1
+    if self.min is None or x < self.min:
+      self.min = x
+    if self.max is None or x > self.max:
+      self.max = x
+    if self._size >= self._max_size:
+      self._compress()
+    self._sorted = None
+
+  # Add a list of samples.
+  def extend(self, l):
+    i = 0
+    while i < len(l):
+      chunk = l[i:i + self._max_size - self._size]
+      i += len(chunk)
+      self._levels[0].extend(chunk)
+      self._size += len(chunk)
+      self.n += len(chunk)
+      lo, hi = min(chunk), max(chunk)
+      if self.min is None or lo < self.min:
+        self.min = lo
+      if self.max is None or hi > self.max:
+        self.max = hi
+      if self._size >= self._max_size:
+        self._compress()
+    self._sorted = None
+
+  # Combine the samples of another sketch into this one.
+  def merge(self, other):
+    while len(self._levels) < len(other._levels):
+      self._levels.append([])
+    for level, samples in zip(self._levels, other._levels):
+      level.extend(samples)
+    self.n += other.n
+    for x in [other.min, other.max]:
+      if x is not None:
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+    self._size = sum(len(level) for level in self._levels)
+    self._max_size = sum(self._capacity(h)
+                         for h in builtins.range(len(self._levels)))
+    self._compress()
+    self._sorted = None
+    return self
+
+  # Compact the lowest full levels until the sketch is within its size.
+  def _compress(self):
+    for h, level in enumerate(self._levels):
+      if self._size < self._max_size:
+        break
+      if len(level) < self._capacity(h):
+        continue
+      if h + 1 == len(self._levels):
+        self._levels.append([])
+        self._max_size = sum(self._capacity(i)
+                             for i in builtins.range(len(self._levels)))
+      level.sort()
+      # An odd sample out stays at this level:
+      odd = len(level) % 2
+      self._levels[h + 1].extend(level[odd + self._rng.randrange(2)::2])
+      del level[odd:]
+      self._size = sum(len(level) for level in self._levels)
+
+  # Return the "q"th quantile, 0 <= q <= 1, of the samples.
+  def quantile(self, q):
+    if not self.n:
+      raise ValueError("Cannot compute quantiles of an empty sketch")
+    if q <= 0:
+      return self.min
+    if q >= 1:
+      return self.max
+
+    if self._sorted is None:
+      items = sorted((x, 1 << h) for h, level in enumerate(self._levels)
+                     for x in level)
+      weights, total = [], 0
+      for _, weight in items:
+        total += weight
+        weights.append(total)
+      self._sorted = [x for x, _ in items], weights
+
+    samples, weights = self._sorted
+    i = bisect_left(weights, q * weights[-1])
+    return samples[min(i, len(samples) - 1)]
+
+  # Return a list of the quantiles for each of "qs". If "censored" is
+  # given, it is a number of further samples which are longer than any
+  # of the samples, and quantiles which fall among them are infinite.
+  def quantiles(self, qs, censored=0):
+    total = self.n + censored
+    values = []
+    for q in qs:
+      pos = q * (total - 1)
+      if pos > self.n - 1:
+        values.append(float("inf"))
+      else:
+        values.append(self.quantile(pos / (self.n - 1) if self.n > 1
+                                    else 0))
+    return values
+
+  # Return the number of samples kept.
+  def size(self):
+    return self._size
+
+
+# A uniform random sample of a fixed size of a stream of samples, using
+# Li's Algorithm L. Rather than drawing a random number per sample, the
+# number of samples to skip before the next is kept is drawn, so adding
+# a sample is O(1) and usually makes no random draws.
+class Reservoir:
+  def __init__(self, size, rng=None):
+    self.size = size
+    self.n = 0
+    self.samples = []
+    self._rng = rng or random.Random()
+    self._w = 1
+    self._next = None
+
+  def push(self, x):
+    self.n += 1
+    if len(self.samples) < self.size:
+      self.samples.append(x)
+      if len(self.samples) == self.size:
+        self._skip()
+    elif self.n == self._next:
+      self.samples[self._rng.randrange(self.size)] = x
+      self._skip()
+
+  # Add a list of samples, skipping directly to those which are kept.
+  def extend(self, l):
+    i = 0
+    while i < len(l) and len(self.samples) < self.size:
+      self.push(l[i])
+      i += 1
+    if len(self.samples) < self.size or not self.size:
+      self.n += len(l) - i
+      return
+
+    while True:
+      j = i + self._next - self.n - 1
+      if j >= len(l):
+        self.n += len(l) - i
+        return
+      self.n = self._next
+      self.samples[self._rng.randrange(self.size)] = l[j]
+      self._skip()
+      i = j + 1
+
+  # Draw the index of the next sample which is kept.
+  def _skip(self):
+    self._w *= exp(log(1 - self._rng.random()) / self.size)
+    if self._w >= 1:
+      self._next = self.n + 1
+    else:
+      self._next = self.n + int(floor(log(1 - self._rng.random()) /
+                                      log(1 - self._w))) + 1
+
+
+# The valid output formats:
+FORMATS = ["min", "txt", "tsv", "csv"]
 
 
 class Stats:
-  def __init__(self, l, confidence=0.95, threshold=30):
-    cfint = confinterval(l, confidence, threshold)
+  # "l" may be either a list of samples or an Accumulator. If "cores"
+  # is given, it is a dict mapping each core to the samples it
+  # produced, and is used to test whether the per-core distributions
+  # differ. If "overhead" is given, it is an Accumulator of harness
+  # overhead samples which is subtracted from the mean and
+  # confidence interval. If "warmup" is given, it is an Accumulator of
+  # the warmup samples which were excluded from "l". If "name" is
+  # given, it is the name of the metric which the statistics describe.
+  #
+  # If "l" is an Accumulator, "samples" may be given as the list of
+  # its samples, which enables the percentiles. Alternatively, "sketch"
+  # may be given as a KLL sketch of its samples, from which the
+  # percentiles and the confidence interval of the median are
+  # estimated in bounded memory. If "ci_method" is
+  # "bootstrap", the confidence intervals of the mean and median are
+  # found by resampling, using "bootstrap_method" and "resamples".
+  #
+  # If "outliers" is "flag", outliers are classified using
+  # "outlier_method", and counted and summarised separately. If it is
+  # "reject", they are also excluded from the statistics, and the
+  # statistics of all samples are summarised separately.
+  #
+  # If "timeouts" is given, it is the number of iterations which timed
+  # out. Their samples are censored: they are longer than any of the
+  # samples, but by an unknown amount. They are excluded from the mean,
+  # and percentiles which fall among them are infinite. If every
+  # iteration timed out, the mean, its confidence interval and the
+  # other summary statistics are undefined, and None.
+  def __init__(self, l, confidence=0.95, threshold=30, cores=None,
+               overhead=None, warmup=None, name=None, samples=None,
+               ci_method="parametric", bootstrap_method="bca",
+               resamples=10000, outliers="keep", outlier_method="tukey",
+               timeouts=None, sketch=None):
+    if isinstance(l, Accumulator):
+      acc = l
+    else:
+      acc = Accumulator(l)
+      samples = l
+
+    if not acc.n and not timeouts:
+      raise ValueError("Cannot compute statistics of an empty sequence")
+
+    self.name = name
+    self.outliers = outliers
+    if not acc.n:
+      self._attrs = ([(prop, None) for prop in ATTRIBUTES] +
+                     [(prop, float("inf")) for prop, _ in PERCENTILES] +
+                     [("timeouts", timeouts)])
+      self._attrs[ATTRIBUTES.index("confidence")] = ("confidence",
+                                                     confidence)
+      self._attrs[ATTRIBUTES.index("threshold")] = ("threshold", threshold)
+      self._attrs[ATTRIBUTES.index("n")] = ("n", 0)
+      for pair in self._attrs:
+        setattr(self, pair[0], pair[1])
+      return
+
+    if ci_method == "bootstrap" and samples is None:
+      raise ValueError("Bootstrap confidence intervals require samples")
+    # Resampling the results alone would ignore the uncertainty of the
+    # overhead:
+    if ci_method == "bootstrap" and overhead is not None:
+      raise ValueError("Bootstrap confidence intervals cannot subtract "
+                       "the overhead")
+    if outliers != "keep" and samples is None:
+      raise ValueError("Outlier classification requires samples")
+
+    # The overhead is subtracted from every location statistic,
+    # including the min and max, so that they still bound the others:
+    offset = 0 if overhead is None else overhead.mean
+
+    # Return the mean and its confidence interval:
+    def location(acc, samples):
+      if ci_method == "bootstrap":
+        cfint = bootstrap(samples, "mean", confidence, bootstrap_method,
+                          resamples)
+      elif overhead is None:
+        cfint = acc.confinterval(confidence, threshold)
+      else:
+        cfint = diffinterval(acc, overhead, confidence, threshold)
+      return acc.mean - offset, cfint[0], cfint[1]
+
+    # Classify the outliers, and split the samples into those which
+    # are summarised as the main statistics, and the others:
+    if outliers != "keep":
+      bounds = fences(samples, outlier_method)
+      classes = [classify(x, bounds) for x in samples]
+      kept = [x for x, cls in zip(samples, classes) if not cls]
+      if outliers == "reject":
+        other, other_acc, other_samples = "all", acc, samples
+        acc, samples = Accumulator(kept), kept
+      else:
+        other, other_acc, other_samples = "robust", Accumulator(kept), kept
+
+    m, c1, c2 = location(acc, samples)
 
     # Ordered attribute pairs:
-    self._attrs = [("mean", mean(l)),
-                   ("c1", cfint[0]),
-                   ("c2", cfint[1]),
+    self._attrs = [("mean", m),
+                   ("c1", c1),
+                   ("c2", c2),
                    ("confidence", confidence),
                    ("threshold", threshold),
-                   ("min", min(l)),
-                   ("max", max(l)),
-                   ("range", range(l)),
-                   ("variance", variance(l)),
-                   ("n", len(l))]
+                   ("min", acc.min - offset),
+                   ("max", acc.max - offset),
+                   ("range", acc.range()),
+                   ("variance", acc.variance()),
+                   ("n", acc.n)]
+
+    if samples is not None:
+      censored = samples
+      if timeouts:
+        censored = list(samples) + [float("inf")] * timeouts
+      values = percentiles(censored, [q for _, q in PERCENTILES])
+      self._attrs += [(prop, value - offset)
+                      for (prop, _), value in zip(PERCENTILES, values)]
+    elif sketch is not None:
+      censored = timeouts or 0
+      values = sketch.quantiles([q for _, q in PERCENTILES], censored)
+      self._attrs += [(prop, value - offset)
+                      for (prop, _), value in zip(PERCENTILES, values)]
+      c1, c2 = sketch.quantiles(rankinterval(sketch.n + censored, 0.5,
+                                             confidence), censored)
+      self._attrs += [("median_c1", c1 - offset),
+                      ("median_c2", c2 - offset)]
+
+    if ci_method == "bootstrap":
+      c1, c2 = bootstrap(samples, "median", confidence, bootstrap_method,
+                         resamples)
+      self._attrs += [("median_c1", c1), ("median_c2", c2)]
+
+    if outliers != "keep":
+      other_m, other_c1, other_c2 = location(other_acc, other_samples)
+      self._attrs += [("outliers_mild", classes.count(1)),
+                      ("outliers_severe", classes.count(2)),
+                      (other + "_mean", other_m),
+                      (other + "_c1", other_c1),
+                      (other + "_c2", other_c2),
+                      (other + "_variance", other_acc.variance()),
+                      (other + "_n", other_acc.n)]
+
+    if timeouts is not None:
+      self._attrs.append(("timeouts", timeouts))
+
+    if overhead is not None:
+      self._attrs.append(("overhead", overhead.mean))
+
+    if warmup is not None:
+      self._attrs += [("warmup_n", warmup.n),
+                      ("warmup_mean", warmup.mean - offset),
+                      ("warmup_min", warmup.min - offset),
+                      ("warmup_max", warmup.max - offset)]
+
+    if cores is not None:
+      self._attrs.append(("cores_p", grouptest(list(cores.values()))))
 
     # Create class attributes from ordered attribute pairs:
     for pair in self._attrs:
       setattr(self, pair[0], pair[1])
 
+  # Return the ordered (name, value) attribute pairs.
+  def items(self):
+    return list(self._attrs)
+
   # Return a formatted string:
   def format(self, fmt="min", precision=2):
     def rnd(n, precision=precision):
       return round(n, precision)
 
-    def _raise_param_ex(fmt):
-      raise InvalidParameterException("format", fmt,
-                                      msg=("Valid formats are: "
-                                           "min, txt, tsv, csv"))
-
-    if not isinstance(fmt, str):
-      _raise_param_ex(fmt)
-
-    s = ""
+    _check_format(fmt)
 
+    if fmt.lower() == "min" and not self.n:
+      return ("All {n} iterations{of} timed out\n"
+              .format(n=self.timeouts,
+                      of=" of " + self.name if self.name else ""))
     if fmt.lower() == "min":
-      s = ("{c}% confidence values from {n} iterations:\n"
+      s = ("{c}% confidence values{of} from {n} iterations:\n"
            .format(c=int(self.confidence * 100),
+                   of=" of " + self.name if self.name else "",
                    n=self.n))
       s += ("{c1} {mean} {c2}\n"
             .format(c1=rnd(self.c1),
                     mean=rnd(self.mean),
                     c2=rnd(self.c2)))
-    else:
-      for stat in self._attrs:
-        prop = stat[0]
-        val = rnd(stat[1])
-
-        if fmt.lower() == "txt":
-          s += "{0}: {1}\n".format(prop, val)
-        elif fmt.lower() == "tsv":
-          s += "{0}\t{1}\n".format(prop, val)
-        elif fmt.lower() == "csv":
-          s += '"{0}",{1}\n'.format(prop, val)
+      # Report the excluded warmup samples:
+      warmup_n = getattr(self, "warmup_n", None)
+      if warmup_n:
+        s += ("Excluded {n} warmup samples with mean {mean}\n"
+              .format(n=warmup_n, mean=rnd(self.warmup_mean)))
+      # Report the iterations which timed out:
+      timeouts = getattr(self, "timeouts", None)
+      if timeouts:
+        s += ("{n} iterations timed out and are excluded from the mean\n"
+              .format(n=timeouts))
+      # Report the outliers, and the statistics of the other samples:
+      mild = getattr(self, "outliers_mild", 0)
+      severe = getattr(self, "outliers_severe", 0)
+      if mild or severe:
+        if self.outliers == "flag":
+          verb, other, label = "Found", "robust", "Without"
         else:
-          _raise_param_ex(fmt)
-    return s
+          verb, other, label = "Rejected", "all", "With"
+        s += ("{verb} {n} outliers ({mild} mild, {severe} severe). "
+              "{label} outliers: {c1} {mean} {c2}\n"
+              .format(verb=verb, n=mild + severe, mild=mild,
+                      severe=severe, label=label,
+                      c1=rnd(getattr(self, other + "_c1")),
+                      mean=rnd(getattr(self, other + "_mean")),
+                      c2=rnd(getattr(self, other + "_c2"))))
+      # Warn if running in parallel distorts the results:
+      cores_p = getattr(self, "cores_p", None)
+      if cores_p is not None and cores_p < 1 - self.confidence:
+        s += ("Warning: per-core distributions differ (p = {p})\n"
+              .format(p=rnd(cores_p, precision + 2)))
+      return s
+    else:
+      return format_attrs(self._attrs, self.name, fmt, precision)
+
+
+# The comparison of the results of two commands. "a" and "b" are
+# Accumulators of the baseline and the compared command, and "la" and
+# "lb" are the lists of their samples. The speedup is the ratio of the
+# mean of the baseline to the mean of the compared command, so values
+# greater than 1 mean the compared command is faster.
+class Comparison:
+  def __init__(self, a, b, la, lb, confidence=0.95, threshold=30,
+               name=None):
+    if not a.n or not b.n:
+      raise ValueError("Cannot compare statistics of an empty sequence")
+
+    speedup, c1, c2 = ratiointerval(a, b, confidence, threshold)
+
+    self.name = name
+
+    # Ordered attribute pairs:
+    self._attrs = [("speedup", speedup),
+                   ("c1", c1),
+                   ("c2", c2),
+                   ("confidence", confidence),
+                   ("welch_p", welch(a, b)),
+                   ("rank_p", ranktest(la, lb))]
+
+    # Create class attributes from ordered attribute pairs:
+    for pair in self._attrs:
+      setattr(self, pair[0], pair[1])
+
+  # Return whether the difference is significant under both tests.
+  def significant(self):
+    alpha = 1 - self.confidence
+    return (self.welch_p is not None and self.welch_p < alpha and
+            self.rank_p is not None and self.rank_p < alpha)
+
+  # Return a formatted string:
+  def format(self, fmt="min", precision=2):
+    def rnd(n, precision=precision):
+      return None if n is None else round(n, precision)
+
+    _check_format(fmt)
+
+    if fmt.lower() == "min":
+      s = ("{name}{c}% confidence speedup:\n"
+           .format(name=self.name + ": " if self.name else "",
+                   c=int(self.confidence * 100)))
+      s += ("{c1} {speedup} {c2}\n"
+            .format(c1=rnd(self.c1),
+                    speedup=rnd(self.speedup),
+                    c2=rnd(self.c2)))
+      s += ("Welch's t-test p = {welch}, rank test p = {rank}: {sig}\n"
+            .format(welch=rnd(self.welch_p, precision + 2),
+                    rank=rnd(self.rank_p, precision + 2),
+                    sig=("significant" if self.significant() else
+                         "not significant")))
+      return s
+    else:
+      return format_attrs(self._attrs, self.name, fmt, precision)
+
+
+# Raise an exception if "fmt" is not a valid output format.
+def _check_format(fmt):
+  if not isinstance(fmt, str) or fmt.lower() not in FORMATS:
+    raise InvalidParameterException("format", fmt,
+                                    msg=("Valid formats are: "
+                                         "min, txt, tsv, csv"))
+
+
+# Return a formatted table in the tsv or csv format, or with aligned
+# columns in the min or txt format. Each row is a list of ordered
+# attribute pairs, and the columns are the union of their attributes,
+# in order of appearance. Missing values are empty. In the csv format,
+# the header and string cells are quoted, as by _writer().
+def format_table(rows, fmt, precision):
+  columns = []
+  for row in rows:
+    for prop, _ in row:
+      if prop not in columns:
+        columns.append(prop)
+
+  cells = []
+  for row in rows:
+    values = dict(row)
+    line = []
+    for column in columns:
+      val = values.get(column, "")
+      if isinstance(val, (int, float)):
+        val = round(val, precision)
+      elif val is None:
+        val = ""
+      line.append(val)
+    cells.append(line)
+
+  if fmt.lower() in ["min", "txt"]:
+    cells = [[str(cell) for cell in line] for line in cells]
+    widths = [max([len(column)] + [len(line[i]) for line in cells])
+              for i, column in enumerate(columns)]
+    lines = [columns] + cells
+    return "".join("  ".join(cell.ljust(width)
+                             for cell, width in zip(line, widths)).rstrip() +
+                   "\n" for line in lines)
+
+  s = io.StringIO()
+  writer = _writer(s, fmt)
+  writer.writerow(columns)
+  writer.writerows(cells)
+  return s.getvalue()
+
+
+# Return a csv writer of rows to a file in the tsv or csv format. In
+# the csv format, strings are quoted, and in the tsv format they are
+# quoted only if they contain a tab, quote or newline.
+def _writer(f, fmt):
+  if fmt.lower() == "tsv":
+    return csv.writer(f, delimiter="\t", lineterminator="\n")
+  return csv.writer(f, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+
+
+# Return a formatted string of ordered attribute pairs, labelled with
+# "name" if given, in the txt, tsv or csv format. The min format is the
+# same as txt.
+def format_attrs(attrs, name, fmt, precision):
+  if name:
+    attrs = [("name", name)] + attrs
+
+  rows = []
+  for prop, val in attrs:
+    if isinstance(val, (int, float)):
+      val = round(val, precision)
+    rows.append((prop, val))
+
+  if fmt.lower() in ["min", "txt"]:
+    return "".join("{0}: {1}\n".format(prop, val) for prop, val in rows)
+  s = io.StringIO()
+  _writer(s, fmt).writerows(rows)
+  return s.getvalue()
@@ -0,0 +1,189 @@
+# An append-only, binary sample store.
+#
+# A store is a fixed-size header followed by fixed-width records, one
+# per sample:
+#
+#   header   8 byte magic, followed by a table of MAX_METRICS metric
+#            names, each NUL padded to NAME_SIZE bytes. The id of a
+#            metric is its index in the table.
+#   records  <f8 timestamp, <u4 iteration, <u2 benchmark, <u2 metric
+#            id, <f8 value. The timestamp is the number of seconds since
+#            the start of the run, which accumulates across resumed
+#            runs. The benchmark is the index of the command when
+#            several are compared, so the metrics are shared by every
+#            command.
+#
+# Records are only ever appended, and the header is rewritten in place
+# when a new metric is added. Stores are read back using mmap and
+# numpy, without creating a Python object per sample.
+import mmap
+import os
+import struct
+
+from srtime.exceptions import StoreException
+from srtime.stats import Accumulator
+
+
+MAGIC = b"SRTIME\x00\x02"
+MAX_METRICS = 64
+NAME_SIZE = 32
+HEADER_SIZE = len(MAGIC) + MAX_METRICS * NAME_SIZE
+
+MAX_BENCHMARKS = 1 << 16
+
+RECORD = struct.Struct("<dIHHd")
+
+
+# Return the numpy dtype of a record.
+def record_dtype():
+  import numpy as np
+
+  return np.dtype([("timestamp", "<f8"), ("iteration", "<u4"),
+                   ("benchmark", "<u2"), ("metric", "<u2"), ("value", "<f8")])
+
+
+# Read and validate the header of an open store, returning the list of
+# metric names.
+def _read_header(f, path):
+  header = f.read(HEADER_SIZE)
+  if len(header) != HEADER_SIZE or not header.startswith(MAGIC):
+    raise StoreException(path, "not a sample store")
+
+  metrics = []
+  for i in range(MAX_METRICS):
+    offset = len(MAGIC) + i * NAME_SIZE
+    name = header[offset:offset + NAME_SIZE].rstrip(b"\x00")
+    if not name:
+      break
+    metrics.append(name.decode())
+  return metrics
+
+
+# A sample store opened for appending. If "resume" is true and the
+# file exists, new samples are appended to it, else it is truncated.
+class Store:
+  def __init__(self, path, resume=False):
+    self.path = path
+
+    if resume and os.path.exists(path):
+      self._file = open(path, "r+b")
+      self.metrics = _read_header(self._file, path)
+      # Discard a partially written record, e.g. after a crash:
+      size = os.path.getsize(path) - HEADER_SIZE
+      self._file.truncate(HEADER_SIZE + size - size % RECORD.size)
+    else:
+      self._file = open(path, "w+b")
+      self.metrics = []
+      self._write_header()
+
+    self._ids = dict((name, i) for i, name in enumerate(self.metrics))
+    self._file.seek(0, os.SEEK_END)
+
+  def _write_header(self):
+    header = bytearray(HEADER_SIZE)
+    header[:len(MAGIC)] = MAGIC
+    for i, name in enumerate(self.metrics):
+      offset = len(MAGIC) + i * NAME_SIZE
+      header[offset:offset + len(name)] = name.encode()
+
+    self._file.seek(0)
+    self._file.write(header)
+    self._file.seek(0, os.SEEK_END)
+
+  # Return the id of a metric, adding it to the header if required.
+  def _id(self, metric):
+    if metric not in self._ids:
+      if len(self.metrics) == MAX_METRICS:
+        raise StoreException(self.path, "too many metrics")
+      if len(metric.encode()) > NAME_SIZE:
+        raise StoreException(self.path,
+                             "metric name '{0}' is too long".format(metric))
+      self._ids[metric] = len(self.metrics)
+      self.metrics.append(metric)
+      self._write_header()
+    return self._ids[metric]
+
+  # Append a sample of the benchmark with index "benchmark".
+  def append(self, timestamp, iteration, metric, value, benchmark=0):
+    if not 0 <= benchmark < MAX_BENCHMARKS:
+      raise StoreException(self.path, "too many benchmarks")
+    self._file.write(RECORD.pack(timestamp, iteration, benchmark,
+                                 self._id(metric), value))
+
+  # Write the appended samples to the file.
+  def flush(self):
+    self._file.flush()
+
+  def close(self):
+    self._file.close()
+
+
+# The samples of a store, read using mmap. "records" is a numpy array
+# of records, which is a view of the mapped file.
+class Samples:
+  def __init__(self, path):
+    import numpy as np
+
+    with open(path, "rb") as f:
+      self.metrics = _read_header(f, path)
+      size = os.path.getsize(path)
+      if size > HEADER_SIZE:
+        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        count = (size - HEADER_SIZE) // RECORD.size
+        self.records = np.frombuffer(self._mmap, dtype=record_dtype(),
+                                     count=count, offset=HEADER_SIZE)
+      else:
+        self.records = np.zeros(0, dtype=record_dtype())
+
+  def __len__(self):
+    return len(self.records)
+
+  # Return a numpy array of the values of a metric, of the benchmark
+  # with index "benchmark", or of every benchmark if None.
+  def values(self, metric, benchmark=None):
+    if metric not in self.metrics:
+      return self.records["value"][:0]
+    mask = self.records["metric"] == self.metrics.index(metric)
+    if benchmark is not None:
+      mask &= self.records["benchmark"] == benchmark
+    return self.records["value"][mask]
+
+  # Return an Accumulator of the values of a metric. This is
+  # vectorised, so it does not create a Python object per sample.
+  def accumulator(self, metric, benchmark=None):
+    return Accumulator(self.values(metric, benchmark))
+
+  # Return the number of iterations.
+  def iterations(self):
+    if not len(self.records):
+      return 0
+    return int(self.records["iteration"].max()) + 1
+
+  # Return the timestamp of the last sample.
+  def elapsed(self):
+    if not len(self.records):
+      return 0
+    return float(self.records["timestamp"].max())
+
+  # Yield the iteration, benchmark index and values of each iteration,
+  # in order, with the values as a dict mapping metrics to lists of
+  # values.
+  def by_iteration(self):
+    import numpy as np
+
+    records = self.records
+    if not len(records):
+      return
+    # The records of each iteration are contiguous:
+    bounds = np.flatnonzero(np.diff(records["iteration"])) + 1
+    for chunk in np.split(records, bounds):
+      values = {}
+      for metric, value in zip(chunk["metric"].tolist(),
+                               chunk["value"].tolist()):
+        values.setdefault(self.metrics[metric], []).append(value)
+      yield int(chunk["iteration"][0]), int(chunk["benchmark"][0]), values
+
+
+# Load the samples of a store.
+def load(path):
+  return Samples(path)
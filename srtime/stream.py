@@ -0,0 +1,39 @@
+# A stream of progress updates in the JSON Lines format.
+#
+# One JSON object is written per iteration, so that a supervisor can
+# watch a run converge. Updates are buffered, and only flushed once
+# "interval" seconds have passed since the last flush, so that
+# streaming does not slow down runs of short iterations.
+import sys
+from time import monotonic
+
+
+class Stream:
+  # "path" is the file to write to, or "-" for stdout.
+  def __init__(self, path, interval=1):
+    # Only import json when streaming:
+    import json
+
+    self._encoder = json.JSONEncoder(separators=(",", ":"))
+    self.path = path
+    self.interval = interval
+    if path == "-":
+      self._file = sys.stdout
+    else:
+      self._file = open(path, "w")
+    self._last_flush = monotonic()
+
+  # Write an update, a dict, flushing the stream if the interval has
+  # passed.
+  def write(self, update):
+    self._file.write(self._encoder.encode(update) + "\n")
+    now = monotonic()
+    if now - self._last_flush >= self.interval:
+      self._file.flush()
+      self._last_flush = now
+
+  def close(self):
+    if self._file is sys.stdout:
+      self._file.flush()
+    else:
+      self._file.close()
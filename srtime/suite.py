@@ -0,0 +1,219 @@
+# A suite of benchmarks which share a single time budget.
+#
+# A suite is described by a TOML file, with a table of options for
+# every benchmark, and an array of benchmarks, each a command with its
+# own options. The options are the fields of srtime.config.Config, and
+# default to those of the command line:
+#
+#   [defaults]
+#   spawn = "posix_spawn"
+#
+#   [[benchmark]]
+#   name = "startup"
+#   command = "python -c pass"
+#
+#   [[benchmark]]
+#   command = "./sort 100000"
+#   warmup = 2
+#
+# Each benchmark first runs its minimum number of iterations. Then each
+# iteration is spent on the benchmark whose confidence interval it is
+# expected to narrow the most per second: the width of the interval
+# relative to the mean shrinks with 1 / sqrt(n), so one more iteration
+# narrows it by a fraction 1 - sqrt(n / (n + 1)), at the cost of the
+# mean time of an iteration, excluding the time taken to prepare to run
+# the first, such as measuring the harness overhead. Benchmarks with no
+# iterations yet come first, since their cost is unknown. This stops
+# once no iteration fits in the time left, or every benchmark has met
+# its target precision.
+from math import inf, sqrt
+from time import perf_counter
+
+from srtime.config import Config
+from srtime.exceptions import (ArgumentParserException,
+                               InvalidParameterException, SuiteException)
+from srtime.stats import format_table
+from srtime.timer import Timer
+
+
+# The options which are set by the suite, rather than per benchmark:
+_RESERVED = ["commands", "sweep", "target_time"]
+
+
+# Return the contents of a TOML file. tomllib is in the standard
+# library from Python 3.11, and tomli provides it before then.
+def _load_toml(path):
+  try:
+    import tomllib
+  except ImportError:
+    try:
+      import tomli as tomllib
+    except ImportError:
+      raise SuiteException(path, "reading TOML requires Python 3.11 or "
+                           "the tomli package")
+
+  try:
+    with open(path, "rb") as f:
+      return tomllib.load(f)
+  except OSError as err:
+    raise SuiteException(path, err.strerror)
+  except tomllib.TOMLDecodeError as err:
+    raise SuiteException(path, str(err))
+
+
+class Suite:
+  # Load the suite from "path". "options" are the parsed command line
+  # arguments, which give the defaults of the options of each benchmark,
+  # and the time budget of the whole suite as the target time.
+  def __init__(self, path, options):
+    self.path = path
+    self.budget = options.target_time
+
+    suite = _load_toml(path)
+    unknown = set(suite) - {"defaults", "benchmark"}
+    if unknown:
+      raise SuiteException(path, "unknown table '{0}'"
+                           .format(sorted(unknown)[0]))
+    benchmarks = suite.get("benchmark", [])
+    if not benchmarks:
+      raise SuiteException(path, "no benchmarks")
+
+    fields = [name for name in Config.__dataclass_fields__
+              if name not in _RESERVED]
+    base = dict((name, getattr(options, name)) for name in fields)
+    defaults = suite.get("defaults", {})
+    self._check_keys("defaults", defaults, fields)
+
+    # The name, config, options and timer of each benchmark:
+    self.names, self._configs, self._options, self._timers = [], [], [], []
+    try:
+      for i, benchmark in enumerate(benchmarks):
+        benchmark = dict(benchmark)
+        command = benchmark.pop("command", None)
+        name = benchmark.pop("name", command)
+        label = name or "benchmark {0}".format(i + 1)
+        if not isinstance(command, str):
+          raise SuiteException(path, "{0} has no command".format(label))
+        if name in self.names:
+          raise SuiteException(path, "{0} is repeated".format(name))
+        self._check_keys(label, benchmark, fields)
+
+        kwargs = dict(base, **defaults)
+        kwargs.update(benchmark)
+        config = Config([command], target_time=self.budget, **kwargs)
+        try:
+          options = config.options()
+          self._options.append(options)
+          timer = Timer(options, start=False)
+        except (ArgumentParserException, InvalidParameterException) as err:
+          raise SuiteException(path, "{0}: {1}".format(label, err))
+        self.names.append(name)
+        self._configs.append(config)
+        self._timers.append(timer)
+    except Exception:
+      self.close()
+      raise
+
+    # The time spent on, and number of iterations of, each benchmark:
+    self.elapsed = [0] * len(self._timers)
+    self._iterations = [0] * len(self._timers)
+
+  # Raise an exception if a table of options has unknown keys.
+  def _check_keys(self, label, table, fields):
+    for key in table:
+      if key not in fields:
+        reason = ("is set by the suite" if key in _RESERVED
+                  else "is not an option")
+        raise SuiteException(self.path, "{0}: '{1}' {2}"
+                             .format(label, key, reason))
+
+  # Return the timers, one per benchmark.
+  def timers(self):
+    return self._timers
+
+  # Run iterations until the time budget is spent, or every benchmark
+  # has met its stopping criteria.
+  def run(self):
+    samples = [timer.samples() for timer in self._timers]
+    # The benchmarks which have not met their stopping criteria:
+    active = set(range(len(self._timers)))
+    try:
+      while active:
+        i = self._next(active)
+        if i is None:
+          break
+        start = perf_counter()
+        sample = next(samples[i], None)
+        self.elapsed[i] += perf_counter() - start
+        if sample is None:
+          active.discard(i)
+        else:
+          self._iterations[i] += 1
+    finally:
+      for generator in samples:
+        generator.close()
+      self.close()
+
+  # Return the benchmark to run the next iteration of, or None if no
+  # iteration fits in the time left. Benchmarks with fewer than their
+  # minimum number of iterations, or none at all, come first, the
+  # fewest first.
+  def _next(self, active):
+    time_left = self.budget - sum(self.elapsed)
+    best, best_gain = None, None
+    for i in sorted(active):
+      benchmark = self._timers[i].benchmarks()[0]
+      n = benchmark.n + benchmark.timeouts
+      iterations = self._iterations[i]
+      if n < self._configs[i].min_iterations or not iterations:
+        gain = inf, -n
+      else:
+        cost = (self.elapsed[i] - self._timers[i].open_time) / iterations
+        if cost > time_left:
+          continue
+        # The precision is unknown with fewer than two results, and
+        # cannot be improved if the mean is zero:
+        precision = benchmark.precision()
+        if precision is None:
+          gain = (inf, -n) if n < 2 else (0, 0)
+        else:
+          gain = 0, precision * (1 - sqrt(n / (n + 1))) / max(cost, 1e-9)
+      if best is None or gain > best_gain:
+        best, best_gain = i, gain
+    return best
+
+  # Stop the page cache helpers of the benchmarks, if any.
+  def close(self):
+    for options in self._options:
+      if options.cache_control:
+        options.cache_control.close()
+
+  # Return a table of the results of each benchmark, with a row per
+  # metric, labelled with the metric unless only the time is reported.
+  # The first row of each benchmark has the precision reached and the
+  # time spent on it. The min format only has the main columns, and the
+  # statistics of metrics with no results are empty.
+  def format(self, fmt="min", precision=2):
+    label = any(options.metrics != ["time"] for options in self._options)
+    rows = []
+    for name, timer, elapsed, options in zip(self.names, self._timers,
+                                             self.elapsed, self._options):
+      benchmark = timer.benchmarks()[0]
+      for i, metric in enumerate(options.metrics):
+        row = [("name", name)]
+        if label:
+          row.append(("metric", metric))
+        if (benchmark.accumulator(metric).n or
+            (metric == "time" and benchmark.timeouts)):
+          row += timer.stats(metric).items()
+        else:
+          row.append(("n", 0))
+        if not i:
+          row += [("precision", benchmark.precision()),
+                  ("elapsed", elapsed)]
+        if fmt.lower() == "min":
+          row = [(prop, value) for prop, value in row
+                 if prop in ["name", "metric", "n", "mean", "c1", "c2",
+                             "precision", "elapsed"]]
+        rows.append(row)
+    return format_table(rows, fmt, precision)
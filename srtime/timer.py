@@ -1,15 +1,367 @@
 import logging as log
+import os
+import random
+import resource
+from argparse import Namespace
+from copy import copy
+from queue import SimpleQueue
+from threading import Lock, Thread
 from time import time
 
-from srtime.exceptions import InvalidParameterException
-from srtime.process import FilterProcess, TimedProcess
-from srtime.stats import mean
+from srtime.exceptions import InvalidParameterException, TimeoutException
+from srtime.process import (METRICS, ExtractProcess, FilterProcess,
+                            PythonProcess, TimedProcess)
+from srtime.stats import (KLL, Accumulator, Comparison, OutlierDetector,
+                          Reservoir, Stats, SteadyState, classify, fences,
+                          ratiointerval)
+from srtime.store import Store, load
+from srtime.stream import Stream
+
+
+# The results of timing a single command.
+class Benchmark:
+  # "index" is the index of the command, which distinguishes the
+  # results of multiple benchmarks in the sample store. If the command
+  # is a point of a sweep, "point" is a dict mapping each parameter to
+  # its value.
+  def __init__(self, options, command, index=0, point=None):
+    self.command = command
+    self.index = index
+    self.point = point
+    self._options = copy(options)
+    self._options.command = command
+
+    # In Python mode, the command names a callable, which is imported
+    # once for every iteration:
+    self._target = None
+    if options.python:
+      # Only import the Python benchmarking module when it is used:
+      from srtime.pycall import Target
+
+      self._target = Target(command, setup=options.setup, gc=options.gc,
+                            isolate=options.isolate)
+
+    self._results = []
+    # The number of results of each recorded iteration which has any:
+    self._counts = []
+    # The (worker, core) pair which produced each result:
+    self._origins = []
+    # The metrics extracted from the output, if any:
+    self._filtered = options.extractor.metrics if options.extractor else []
+    # The resource usage of each iteration, and the filtered samples,
+    # by metric:
+    self._usage = dict((metric, [])
+                       for metric in METRICS[1:] + self._filtered)
+    # Running summary statistics of each metric:
+    self._accs = dict((metric, Accumulator())
+                      for metric in METRICS + self._filtered)
+    self._acc = self._accs["time"]
+    # The harness overhead, if it is to be subtracted:
+    self.overhead = None
+
+    # The number of iterations, and the number of results excluding
+    # warmup:
+    self.iterations, self.n = 0, 0
+    # The number of iterations which timed out, excluding warmup:
+    self.timeouts = 0
+
+    # Warmup. Either a fixed number of iterations are discarded, or
+    # a detector is used to find the steady state. "sizes" is the
+    # number of values of each metric recorded by each iteration until
+    # then, or None if it timed out, and "pushed" is the index in
+    # "sizes" of each iteration pushed to the detector:
+    self._warmup = []
+    self._detector, self._sizes, self._pushed = None, None, None
+    if options.warmup == "auto":
+      self._warmup_iterations = 0
+      self._detector = SteadyState(options.warmup_window,
+                                   options.confidence)
+      self._sizes, self._pushed = [], []
+    else:
+      self._warmup_iterations = options.warmup
+
+    # Outliers are classified as the results are recorded, so that
+    # the stopping criteria can use the statistics without them:
+    self._outliers = None
+    if options.outliers != "keep":
+      self._outliers = OutlierDetector(options.outlier_method)
+
+    # In sketch mode, the results of each metric are summarised in
+    # bounded memory by a quantile sketch and a reservoir sample, rather
+    # than kept in lists. Until the end of the warmup is detected, the
+    # results are also kept, so that the warmup can be trimmed:
+    self._sketches, self._reservoirs = None, None
+    if options.sketch:
+      self._reset_sketches()
+
+  # Create empty sketches and reservoirs of each metric.
+  def _reset_sketches(self):
+    options = self._options
+    self._sketches = dict((metric, KLL(options.sketch_k))
+                          for metric in self._accs)
+    self._reservoirs = dict((metric, Reservoir(options.reservoir))
+                            for metric in self._accs)
+
+  # Add results of a metric to its sketch and reservoir.
+  def _sketch(self, metric, values):
+    self._sketches[metric].extend(values)
+    self._reservoirs[metric].extend(values)
+
+  # Return a new process to run an iteration of the command.
+  def process(self):
+    if self._target:
+      return PythonProcess(self._options, self._target)
+    elif self._options.filter:
+      return FilterProcess(self._options)
+    elif self._options.extractor:
+      return ExtractProcess(self._options)
+    else:
+      return TimedProcess(self._options)
+
+  # Record the times, resource usage and filtered samples of an
+  # iteration.
+  def record(self, times, usage, worker=0, core=None, samples=None):
+    iteration = self.iterations
+    self.iterations += 1
+
+    # Discard a fixed number of warmup iterations:
+    if iteration < self._warmup_iterations:
+      self._warmup += times
+      return
+
+    keep = self._sketches is None or self._detector is not None
+    if keep:
+      self._results += times
+      if times:
+        self._counts.append(len(times))
+      self._origins += [(worker, core)] * len(times)
+    for t in times:
+      self._acc.push(t)
+      if self._outliers:
+        self._outliers.push(t)
+    for metric, value in usage.items():
+      if keep:
+        self._usage[metric].append(value)
+      self._accs[metric].push(value)
+    samples = samples or {}
+    for metric in self._filtered:
+      values = samples.get(metric, [])
+      if keep:
+        self._usage[metric] += values
+      for value in values:
+        self._accs[metric].push(value)
+    self.n += len(times)
+
+    if self._sketches is not None:
+      self._sketch("time", times)
+      for metric, value in usage.items():
+        self._sketch(metric, [value])
+      for metric in self._filtered:
+        self._sketch(metric, samples.get(metric, []))
+
+    # Detect the end of the warmup iterations. Iterations without
+    # results are not pushed, but are still trimmed with the warmup:
+    if self._detector:
+      sizes = dict((metric, len(samples.get(metric, [])))
+                   for metric in self._filtered)
+      sizes.update((metric, 1) for metric in usage)
+      sizes["time"] = len(times)
+      self._sizes.append(sizes)
+    if self._detector and times:
+      self._pushed.append(len(self._sizes) - 1)
+      self._detector.push(sum(times) / len(times))
+      if self._detector.steady:
+        self._trim(self._detector.warmup)
+
+  # Record an iteration which timed out. Its result is censored: it
+  # is only known to be longer than the timeout.
+  def record_timeout(self):
+    iteration = self.iterations
+    self.iterations += 1
+    if iteration >= self._warmup_iterations:
+      self.timeouts += 1
+    if self._detector:
+      self._sizes.append(None)
+
+  # Move the results of the recorded iterations before the "n"th one
+  # pushed to the detector to the warmup results, including those
+  # without results or which timed out. The statistics of the
+  # remaining results are recomputed, which is cheap since detection
+  # happens soon after the end of the warmup.
+  def _trim(self, n):
+    end = self._pushed[n]
+    log.info("Detected steady state after {0} iterations.".format(end))
+    trimmed = self._sizes[:end]
+    nsamples = dict((metric, sum(sizes.get(metric, 0) for sizes in trimmed
+                                 if sizes))
+                    for metric in self._accs)
+    nresults = nsamples["time"]
+    self.timeouts -= trimmed.count(None)
+    self._detector, self._sizes, self._pushed = None, None, None
+
+    self._warmup += self._results[:nresults]
+    del self._results[:nresults]
+    del self._counts[:n]
+    del self._origins[:nresults]
+    self._acc = self._accs["time"] = Accumulator(self._results)
+    if self._outliers:
+      self._outliers = OutlierDetector(self._options.outlier_method)
+      for result in self._results:
+        self._outliers.push(result)
+    for metric, results in self._usage.items():
+      del results[:nsamples[metric]]
+      self._accs[metric] = Accumulator(results)
+    self.n = len(self._results)
+
+    # In sketch mode, the remaining results are summarised, and no
+    # longer kept:
+    if self._sketches is not None:
+      self._reset_sketches()
+      self._sketch("time", self._results)
+      for metric, results in self._usage.items():
+        self._sketch(metric, results)
+        del results[:]
+      del self._results[:]
+      del self._counts[:]
+      del self._origins[:]
+
+  # Return whether the end of the warmup iterations is still to be
+  # detected.
+  def warming_up(self):
+    return self._detector is not None
+
+  # Return whether the confidence interval of the results is narrow
+  # enough to satisfy the target precision. If there is no target
+  # precision, return False.
+  def precise(self):
+    options = self._options
+    if options.target_precision is None:
+      return False
+    # Don't stop until the warmup iterations have been detected:
+    if self._detector:
+      return False
+
+    precision = self.precision()
+    return precision is not None and precision <= options.target_precision
+
+  # Return the half-width of the confidence interval of the results as
+  # a fraction of their mean, or None if it cannot be determined.
+  def precision(self):
+    options = self._options
+    return self.robust_accumulator().precision(options.confidence,
+                                               options.threshold)
+
+  # Return the results of a metric. The "time" results are the
+  # samples of the primary metric, the resource usage metrics have one
+  # result per iteration, and the filtered metrics have any number. In
+  # sketch mode, this is a uniform random sample of the results.
+  def results(self, metric="time"):
+    if self._sketches is not None:
+      return self._reservoirs[metric].samples
+    elif metric == "time":
+      return self._results
+    else:
+      return self._usage[metric]
+
+  # Return the results, excluding any outliers if they are rejected.
+  def robust_results(self):
+    options = self._options
+    if options.outliers != "reject" or not self._results:
+      return self.results()
+    bounds = fences(self._results, options.outlier_method)
+    return [x for x in self._results if not classify(x, bounds)]
+
+  # Return the number of results of each iteration which has any,
+  # excluding warmup. In sketch mode, these are not kept, so return
+  # None.
+  def counts(self):
+    if self._sketches is not None:
+      return None
+    return self._counts
+
+  # Return the results of the warmup iterations, which are excluded
+  # from results().
+  def warmup(self):
+    return self._warmup
+
+  # Return the (worker, core) pair which produced each result. If not
+  # running in parallel, the core is None.
+  def origins(self):
+    return self._origins
+
+  # Return the results grouped by the core which produced them.
+  def results_by_core(self):
+    cores = {}
+    for result, origin in zip(self._results, self._origins):
+      cores.setdefault(origin[1], []).append(result)
+    return cores
+
+  # Return the running summary statistics of a metric.
+  def accumulator(self, metric="time"):
+    return self._accs[metric]
+
+  # Return the running summary statistics of the results, excluding
+  # any outliers if they are rejected. Outliers are classified as they
+  # arrive, against the streaming estimates of the earlier results.
+  def robust_accumulator(self):
+    if self._options.outliers == "reject":
+      return self._outliers.robust
+    return self._acc
+
+  # Return the statistics of a metric. The summary statistics do not
+  # require another pass over the results, but the percentiles and
+  # bootstrap intervals do. If "name" is given, the statistics are
+  # labelled with it.
+  def stats(self, metric="time", name=None):
+    options = self._options
+    sketch = self._sketches[metric] if self._sketches else None
+    kwargs = dict(confidence=options.confidence,
+                  threshold=options.threshold, name=name,
+                  samples=None if sketch else self.results(metric),
+                  sketch=sketch,
+                  ci_method=options.ci_method,
+                  bootstrap_method=options.bootstrap_method,
+                  resamples=options.resamples,
+                  outliers=options.outliers,
+                  outlier_method=options.outlier_method)
+    if metric != "time":
+      return Stats(self._accs[metric], **kwargs)
+
+    cores = (self.results_by_core()
+             if options.jobs > 1 and not sketch else None)
+    warmup = Accumulator(self._warmup) if self._warmup else None
+    timeouts = self.timeouts if options.iteration_timeout else None
+    return Stats(self._acc, cores=cores, overhead=self.overhead,
+                 warmup=warmup, timeouts=timeouts, **kwargs)
+
+
+# The results of an iteration of a benchmark, as yielded by
+# Timer.samples(): its times, resource usage and filtered samples, the
+# index of the iteration, and the elapsed time once it was recorded.
+class Sample:
+  def __init__(self, benchmark, iteration, elapsed, times, usage, samples,
+               timed_out=False):
+    self.benchmark = benchmark
+    self.iteration = iteration
+    self.elapsed = elapsed
+    self.times = times
+    self.usage = usage
+    self.samples = samples
+    self.timed_out = timed_out
 
 
 class Timer:
-  def __init__(self, options):
+  # "options" is a srtime.config.Config, or the arguments parsed by
+  # srtime.parser.ArgumentParser. Unless "start" is false, the
+  # iterations are run to completion on construction. "callback" is
+  # called with the Sample of each iteration as it is recorded, from
+  # the worker threads when running in parallel.
+  def __init__(self, options, start=True, callback=None):
+    # A Config is converted to arguments, without importing the config
+    # module, which is slow to import:
+    if not isinstance(options, Namespace):
+      options = options.options()
     self._options = options
-    self._results = []
 
     # Check that options are valid:
     if (options.confidence >= 1 or options.confidence <= 0):
@@ -24,49 +376,669 @@ class Timer:
                                       msg=("Threshold value must be "
                                            "greater than 0"))
 
+    if (options.target_precision is not None and
+        options.target_precision <= 0):
+      raise InvalidParameterException("target-precision",
+                                      options.target_precision,
+                                      msg=("Target precision must be "
+                                           "greater than 0"))
+
     log.info("Significance: {0}.".format(round(1 - options.confidence, 2)))
     log.info("Threshold: {0}.".format(options.threshold))
+    if options.target_precision is not None:
+      log.info("Target precision: {0}.".format(options.target_precision))
+
+    metrics = METRICS + (options.extractor.metrics
+                         if options.extractor else [])
+    for metric in options.metrics:
+      if metric not in metrics:
+        raise InvalidParameterException("metrics", metric,
+                                        msg=("Valid metrics are: " +
+                                             ", ".join(metrics)))
+
+    if options.warmup != "auto" and options.warmup < 0:
+      raise InvalidParameterException("warmup", options.warmup,
+                                      msg=("Number of warmup iterations "
+                                           "must not be negative"))
+
+    if options.warmup_window < 2:
+      raise InvalidParameterException("warmup-window",
+                                      options.warmup_window,
+                                      msg=("Warmup window must be at "
+                                           "least 2"))
+
+    if options.resume and not options.output:
+      raise InvalidParameterException("resume", True,
+                                      msg=("An output file is required "
+                                           "to resume"))
+
+    if options.jobs < 1:
+      raise InvalidParameterException("jobs", options.jobs,
+                                      msg=("Number of jobs must be "
+                                           "greater than 0"))
+
+    if (options.iteration_timeout is not None and
+        options.iteration_timeout <= 0):
+      raise InvalidParameterException("iteration-timeout",
+                                      options.iteration_timeout,
+                                      msg=("Iteration timeout must be "
+                                           "greater than 0"))
+
+    if options.effect_size < 0:
+      raise InvalidParameterException("effect-size", options.effect_size,
+                                      msg=("Effect size must not be "
+                                           "negative"))
+
+    if options.stream_interval < 0:
+      raise InvalidParameterException("stream-interval",
+                                      options.stream_interval,
+                                      msg=("Stream interval must not be "
+                                           "negative"))
+
+    if options.max_timeouts is not None and options.max_timeouts < 1:
+      raise InvalidParameterException("max-timeouts", options.max_timeouts,
+                                      msg=("Maximum number of timeouts "
+                                           "must be greater than 0"))
+
+    if options.resamples < 1:
+      raise InvalidParameterException("resamples", options.resamples,
+                                      msg=("Number of resamples must be "
+                                           "greater than 0"))
+
+    if options.subtract_overhead and options.filter:
+      raise InvalidParameterException("subtract-overhead", True,
+                                      msg=("Harness overhead cannot be "
+                                           "subtracted in filter mode"))
+
+    if options.subtract_overhead and options.ci_method == "bootstrap":
+      raise InvalidParameterException("subtract-overhead", True,
+                                      msg=("Harness overhead cannot be "
+                                           "subtracted from bootstrap "
+                                           "confidence intervals"))
+
+    if options.python:
+      for param, value, invalid in [
+          ("jobs", options.jobs, options.jobs > 1),
+          ("subtract-overhead", True, options.subtract_overhead),
+          ("iteration-timeout", options.iteration_timeout,
+           options.iteration_timeout is not None)]:
+        if invalid:
+          raise InvalidParameterException(param, value,
+                                          msg=("Not supported when timing "
+                                               "a Python callable"))
+
+    # The kernel counts the memory of the child before it execs the
+    # command, which is a copy of srtime, or srtime itself with
+    # posix_spawn:
+    if "maxrss" in options.metrics and not options.python:
+      rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+      log.warning("maxrss is at least the {0:.0f} MB used by srtime when "
+                  "it starts the command, so smaller peaks are not "
+                  "measured{1}.".format(rss / 1024,
+                                        ", and with the pty backend it is "
+                                        "the peak of every command so far"
+                                        if options.spawn == "pty" else ""))
+
+    environment = options.environment
+    if environment:
+      settings = dict(environment.settings())
+      if options.python:
+        param = next(iter(settings))
+        raise InvalidParameterException(param, settings[param],
+                                        msg=("Not supported when timing "
+                                             "a Python callable, since "
+                                             "there is no child process"))
+      if options.spawn == "posix_spawn" and environment.child_settings():
+        param = environment.child_settings()[0]
+        raise InvalidParameterException(param, settings[param],
+                                        msg=("Not supported by the "
+                                             "posix_spawn backend. Use "
+                                             "pipe or pty"))
+      if environment.nice is not None and not -20 <= environment.nice <= 19:
+        raise InvalidParameterException("nice", environment.nice,
+                                        msg=("Niceness must be within "
+                                             "range: -20 <= n <= 19"))
+      # Report a setting which cannot be applied before running:
+      environment.check()
+
+    if options.sketch:
+      for param, value, invalid in [
+          ("ci-method", options.ci_method, options.ci_method != "parametric"),
+          ("outliers", options.outliers, options.outliers != "keep")]:
+        if invalid:
+          raise InvalidParameterException(param, value,
+                                          msg=("Not supported in sketch "
+                                               "mode, since it requires "
+                                               "every sample"))
+      if options.sketch_k < 2:
+        raise InvalidParameterException("sketch-k", options.sketch_k,
+                                        msg=("Sketch size must be at "
+                                             "least 2"))
+      if options.reservoir < 0:
+        raise InvalidParameterException("reservoir", options.reservoir,
+                                        msg=("Reservoir size must not be "
+                                             "negative"))
+
+    if options.compare and len(options.commands) < 2:
+      raise InvalidParameterException("compare", options.command,
+                                      msg=("At least two commands are "
+                                           "required to compare"))
+
+    # Guards the results when running in parallel:
+    self._lock = Lock()
+
+    # Create a benchmark for each command:
+    points = options.points or [None] * len(options.commands)
+    self._benchmarks = [Benchmark(options, command, i, point)
+                        for i, (command, point)
+                        in enumerate(zip(options.commands, points))]
+
+    # The harness overhead, which is measured on starting if required:
+    self.overhead = None
+    # The time taken to prepare to run the first iteration, which is
+    # not included in the elapsed time:
+    self.open_time = 0
+    # Called with each sample as it is recorded:
+    self._callback = callback
+    # Counters:
+    self._elapsed_time, self._iterations = 0, 0
+    # The time taken to prepare the page cache before each iteration:
+    self.cache_times = Accumulator()
+    # Whether the timer has been started, and whether it has been
+    # stopped before meeting the stopping criteria:
+    self._started, self._stopped = False, False
+    # The order in which to run the benchmarks of the current round:
+    self._queue = []
+    self._store, self._stream = None, None
 
     # Run the command:
-    self.run()
+    if start:
+      self.run()
 
+  # Run iterations until the stopping criteria are met.
   def run(self):
-    # Counters:
-    i, elapsed_time, avg_p = 0, 0, 0
+    for _ in self.samples():
+      pass
+
+  # Stop the timer once the iterations in progress have finished. The
+  # results recorded so far are kept.
+  def cancel(self):
+    self._stopped = True
+
+  # Run iterations until the stopping criteria are met or the timer is
+  # cancelled, yielding a Sample for each iteration once it is
+  # recorded. Closing the generator cancels the timer. A timer can only
+  # be started once.
+  def samples(self):
+    self._open()
+    try:
+      if self._options.jobs > 1:
+        yield from self._run_parallel()
+      else:
+        yield from self._iterate()
+    finally:
+      self._close()
+    self._finish()
+
+  # As samples(), but for asyncio: each iteration runs in the default
+  # executor, so that many timers can run at once in one event loop.
+  # Cancelling the task iterating over the samples cancels the timer,
+  # and the iteration in progress is not recorded.
+  async def asamples(self):
+    # Only import asyncio when it is used:
+    import asyncio
+
+    if self._options.jobs > 1:
+      raise InvalidParameterException("jobs", self._options.jobs,
+                                      msg=("Not supported by asamples(). "
+                                           "Run several timers at once "
+                                           "instead"))
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, self._open)
+    try:
+      while True:
+        begun = self._begin()
+        if not begun:
+          break
+        benchmark, start_time = begun
+        process = benchmark.process()
+        try:
+          await loop.run_in_executor(None, process.run)
+        except asyncio.CancelledError:
+          self._stopped = True
+          raise
+        yield self._end(benchmark, process, start_time)
+    finally:
+      self._close()
+    self._finish()
+
+  # Prepare to run the first iteration: measure the harness overhead if
+  # it is to be subtracted, load the results of a previous run, and
+  # open the sample store and the stream of progress updates.
+  def _open(self):
+    options = self._options
+    if self._started:
+      raise RuntimeError("The timer has already been started")
+    self._started = True
+    start_time = time()
 
-    # The target amount of time to run for (in ms):
+    if options.subtract_overhead:
+      self.overhead = calibrate(options)
+      for benchmark in self._benchmarks:
+        benchmark.overhead = self.overhead
+
+    if options.output:
+      if options.resume and os.path.exists(options.output):
+        self._resume(load(options.output))
+      self._store = Store(options.output, resume=options.resume)
+
+    if options.stream:
+      self._stream = Stream(options.stream, options.stream_interval)
+    self.open_time = time() - start_time
+
+  # Close the sample store and the stream.
+  def _close(self):
+    if self._store:
+      self._store.close()
+    if self._stream:
+      self._stream.close()
+
+  # Warn if the stopping criteria were met before the end of the warmup.
+  def _finish(self):
+    if (not self._stopped and
+        any(benchmark.warming_up() for benchmark in self._benchmarks)):
+      log.warning("Steady state not detected. Increase the target time, "
+                  "or set the number of warmup iterations.")
+
+  # Return whether to start another iteration.
+  def _continue(self):
+    # The target amount of time to run for (in seconds):
     target_time = self._options.target_time
     # The minimum number of iterations to run:
     min_iterations = self._options.min_iterations
 
-    # Keep running the command while there is time left, or until
-    # we have executed the minimum number of iterations:
-    while elapsed_time < target_time - avg_p or i < min_iterations:
-      start_time = time()
+    if self._stopped:
+      return False
+
+    # Keep running the commands until we have executed the minimum
+    # number of iterations of each, including those which timed out:
+    if any(b.n + b.timeouts < min_iterations for b in self._benchmarks):
+      return True
+
+    # Then, keep running while there is time left for another round
+    # and the stopping criteria have not been met:
+    round_time = sum(b.accumulator().mean for b in self._benchmarks)
+    return self._elapsed_time < target_time - round_time and not self.done()
+
+  # Return the next benchmark to run. Multiple benchmarks are run in
+  # rounds, and the order of each round is randomised so that drift in
+  # the environment affects each of them equally.
+  def _next(self):
+    if not self._queue:
+      self._queue = list(self._benchmarks)
+      random.shuffle(self._queue)
+    return self._queue.pop()
+
+  # Run iterations until the stopping criteria are met, yielding the
+  # sample of each. When running in parallel, each worker is pinned to
+  # its own core.
+  def _iterate(self, worker=0, core=None):
+    if core is not None:
+      os.sched_setaffinity(0, [core])
+
+    while True:
+      begun = self._begin(worker)
+      if not begun:
+        return
+      benchmark, start_time = begun
+
+      # Create and execute a process:
+      process = benchmark.process()
+      process.run()
+      yield self._end(benchmark, process, start_time, worker, core)
+
+  # Return the benchmark to run the next iteration of, and the time it
+  # starts, or None if the stopping criteria are met.
+  def _begin(self, worker=0):
+    options = self._options
+    with self._lock:
+      if not self._continue():
+        return None
+      benchmark = self._next()
 
       # Logging:
-      t_exp = round(avg_p / 1000, 2)
-      t_rem = max(round(target_time - elapsed_time, 1), 0)
+      t_exp = round(benchmark.accumulator().mean / 1000, 2)
+      t_rem = max(round(options.target_time - self._elapsed_time, 1), 0)
       log.info("Time remaining: {0}s. Average execution time: {1}s. "
-               "Starting iteration. n = {2}."
-               .format(t_rem, t_exp, i + 1))
+               "Starting iteration. n = {2}. Worker: {3}."
+               .format(t_rem, t_exp, benchmark.n + 1, worker))
+      return benchmark, time()
 
-      # Create a process:
-      if self._options.filter:
-        process = FilterProcess(self._options)
+  # Record an iteration of a benchmark once its process has run, and
+  # return its sample.
+  def _end(self, benchmark, process, start_time, worker=0, core=None):
+    options = self._options
+    with self._lock:
+      # Update the counters:
+      if options.jobs > 1:
+        self._elapsed_time = time() - self._start_time
       else:
-        process = TimedProcess(self._options)
+        self._elapsed_time += time() - start_time
+      if process.cache_time is not None:
+        self.cache_times.push(process.cache_time)
 
-      # Execute the process:
-      process.run()
-      # Gather results:
-      times = process.times()
-      self._results += times
+      iteration = self._iterations
+      if process.timed_out:
+        self._record_timeout(benchmark)
+      else:
+        self._record(benchmark, process.times(), process.usage(),
+                     worker, core, process.samples())
+      sample = Sample(benchmark, iteration, self._elapsed_time,
+                      process.times(), process.usage(), process.samples(),
+                      process.timed_out)
 
-      # Update the counters:
-      i += len(times)
-      avg_p = mean(self._results)
-      elapsed_time += time() - start_time
+    if self._callback:
+      self._callback(sample)
+    return sample
+
+  # Record an iteration of a benchmark which timed out, and abort if
+  # there have been too many.
+  def _record_timeout(self, benchmark):
+    options = self._options
+    iteration = self._iterations
+    self._iterations += 1
+
+    if self._store:
+      self._store.append(self._elapsed_time, iteration, "timeout",
+                         options.iteration_timeout, benchmark.index)
+      self._store.flush()
+
+    benchmark.record_timeout()
+    if self._stream:
+      self._update(benchmark, iteration, timeout=True)
+    if (options.max_timeouts is not None and
+        benchmark.timeouts >= options.max_timeouts):
+      raise TimeoutException(benchmark.command, options.iteration_timeout,
+                             benchmark.timeouts)
+
+  # Record the times, resource usage and filtered samples of an
+  # iteration of a benchmark.
+  def _record(self, benchmark, times, usage, worker=0, core=None,
+              samples=None):
+    iteration = self._iterations
+    self._iterations += 1
+
+    # Append the results to the sample store:
+    if self._store:
+      for t in times:
+        self._store.append(self._elapsed_time, iteration, "time", t,
+                           benchmark.index)
+      for metric, value in usage.items():
+        self._store.append(self._elapsed_time, iteration, metric, value,
+                           benchmark.index)
+      for metric, values in (samples or {}).items():
+        for value in values:
+          self._store.append(self._elapsed_time, iteration, metric, value,
+                             benchmark.index)
+      self._store.flush()
+
+    benchmark.record(times, usage, worker, core, samples)
+    if self._stream:
+      self._update(benchmark, iteration, time=times)
+
+  # Write a progress update for an iteration of a benchmark to the
+  # stream. This only uses the running summary statistics, so it costs
+  # O(1) per iteration.
+  def _update(self, benchmark, iteration, **kwargs):
+    options = self._options
+    acc = benchmark.robust_accumulator()
+    c1, c2 = (acc.confinterval(options.confidence, options.threshold)
+              if acc.n > 1 else (None, None))
+
+    update = dict(iteration=iteration)
+    if len(self._benchmarks) > 1:
+      update["command"] = benchmark.command
+    if benchmark.point:
+      update["point"] = benchmark.point
+    update.update(kwargs)
+    update.update(n=benchmark.n, timeouts=benchmark.timeouts,
+                  mean=acc.mean if acc.n else None, c1=c1, c2=c2,
+                  elapsed=self._elapsed_time, eta=self._eta(benchmark))
+    self._stream.write(update)
+
+  # Return the estimated time in seconds until a benchmark meets the
+  # stopping criteria. This is the time left, unless there is a target
+  # precision, in which case the number of iterations required is
+  # extrapolated from the current precision, since the width of the
+  # confidence interval is proportional to 1 / sqrt(n).
+  def _eta(self, benchmark):
+    options = self._options
+    time_left = max(options.target_time - self._elapsed_time, 0)
+    if options.target_precision is None or not self._iterations:
+      return time_left
+    if benchmark.precise():
+      return 0
+
+    precision = benchmark.robust_accumulator().precision(options.confidence,
+                                                         options.threshold)
+    if precision is None:
+      return time_left
+    n = benchmark.n + benchmark.timeouts
+    required = max(n * (precision / options.target_precision) ** 2,
+                   options.min_iterations)
+    # Every benchmark runs an iteration per round:
+    round_time = self._elapsed_time / self._iterations * len(self._benchmarks)
+    return min(max(required - n, 0) * round_time, time_left)
+
+  # Replay the iterations of a previous run from its samples, so that
+  # the stopping criteria carry on from where it left off.
+  def _resume(self, samples):
+    log.info("Resuming from {0} iterations.".format(samples.iterations()))
+
+    for _, index, values in samples.by_iteration():
+      if index >= len(self._benchmarks):
+        raise InvalidParameterException("resume", self._options.output,
+                                        msg=("The sample store has results "
+                                             "for different commands"))
+      benchmark = self._benchmarks[index]
+
+      if "timeout" in values:
+        benchmark.record_timeout()
+        continue
+      times = values.pop("time", [])
+      # There is one resource usage value per iteration, and any
+      # number of filtered samples:
+      usage = dict((metric, v[0]) for metric, v in values.items()
+                   if metric in METRICS)
+      filtered = dict((metric, v) for metric, v in values.items()
+                      if metric not in METRICS)
+      benchmark.record(times, usage, samples=filtered)
+
+    self._iterations = samples.iterations()
+    self._elapsed_time = samples.elapsed()
+
+  # Run iterations concurrently in a pool of worker threads, yielding
+  # the samples of every worker. Child processes inherit the CPU
+  # affinity of the thread which spawns them. If the command is pinned
+  # to a set of CPUs, the workers are pinned to those.
+  def _run_parallel(self):
+    environment = self._options.environment
+    if environment and environment.cpus is not None:
+      cores = environment.cpus
+    else:
+      cores = sorted(os.sched_getaffinity(0))
+    if self._options.jobs > len(cores):
+      log.warning("Running {0} jobs on {1} available cores."
+                  .format(self._options.jobs, len(cores)))
+
+    # The samples of the workers, and None as each one finishes:
+    samples = SimpleQueue()
+    errors = []
+
+    def worker(i, core):
+      try:
+        for sample in self._iterate(i, core):
+          samples.put(sample)
+      except Exception as err:
+        errors.append(err)
+        # Stop the other workers:
+        self._stopped = True
+      finally:
+        samples.put(None)
+
+    # Carry on from the elapsed time of a resumed run:
+    self._start_time = time() - self._elapsed_time
+    threads = [Thread(target=worker, args=(i, cores[i % len(cores)]))
+               for i in range(self._options.jobs)]
+    for thread in threads:
+      thread.start()
+
+    finished = 0
+    try:
+      while finished < len(threads):
+        sample = samples.get()
+        if sample is None:
+          finished += 1
+        else:
+          yield sample
+    finally:
+      # Stop the workers if the generator is closed early:
+      if finished < len(threads):
+        self._stopped = True
+      for thread in threads:
+        thread.join()
+
+    if errors:
+      raise errors[0]
+
+  # Return whether the stopping criteria have been met: when comparing,
+  # that every comparison is resolved, otherwise that the results are
+  # precise enough.
+  def done(self):
+    if self._options.compare:
+      return self.resolved()
+    return all(benchmark.precise() for benchmark in self._benchmarks)
+
+  # Return whether the comparison of each command against the first is
+  # resolved. A comparison is resolved once the confidence interval of
+  # the speedup excludes 1, or if there is a target precision, once the
+  # interval lies within that fraction of 1.
+  def resolved(self):
+    options = self._options
+    baseline = self._benchmarks[0]
+    if baseline.warming_up():
+      return False
+
+    for benchmark in self._benchmarks[1:]:
+      if benchmark.warming_up():
+        return False
+      _, c1, c2 = ratiointerval(baseline.robust_accumulator(),
+                                benchmark.robust_accumulator(),
+                                options.confidence, options.threshold)
+      if c1 is None:
+        return False
+
+      significant = c1 > 1 or c2 < 1
+      equivalent = (options.target_precision is not None and
+                    1 - options.target_precision <= c1 and
+                    c2 <= 1 + options.target_precision)
+      if not (significant or equivalent):
+        return False
+
+    return True
+
+  # Return the benchmarks, one per command.
+  def benchmarks(self):
+    return self._benchmarks
+
+  # Return the comparisons of each command against the first, if
+  # comparing commands.
+  def comparisons(self):
+    options = self._options
+    if not options.compare:
+      return []
+    # In sketch mode, the results are a sample, so the means are those
+    # of the accumulators, and only the rank test uses the sample:
+    def accumulator(benchmark, results):
+      if options.sketch:
+        return benchmark.accumulator()
+      return Accumulator(results)
+
+    # Commands every iteration of which timed out have no results to
+    # compare:
+    baseline = self._benchmarks[0].robust_results()
+    if not self._benchmarks[0].n:
+      return []
+    baseline_acc = accumulator(self._benchmarks[0], baseline)
+    comparisons = []
+    for benchmark in self._benchmarks[1:]:
+      results = benchmark.robust_results()
+      if not benchmark.n:
+        continue
+      comparisons.append(
+          Comparison(baseline_acc, accumulator(benchmark, results),
+                     baseline, results, confidence=options.confidence,
+                     threshold=options.threshold,
+                     name="{0} vs {1}".format(benchmark.command,
+                                              self._benchmarks[0].command)))
+    return comparisons
+
+  # Return the results of a metric of the first command.
+  def results(self, metric="time"):
+    return self._benchmarks[0].results(metric)
+
+  # Return the results of the warmup iterations of the first command.
+  def warmup(self):
+    return self._benchmarks[0].warmup()
+
+  # Return the (worker, core) pair which produced each result of the
+  # first command.
+  def origins(self):
+    return self._benchmarks[0].origins()
+
+  # Return the results of the first command grouped by core.
+  def results_by_core(self):
+    return self._benchmarks[0].results_by_core()
+
+  # Return the running summary statistics of a metric of the first
+  # command.
+  def accumulator(self, metric="time"):
+    return self._benchmarks[0].accumulator(metric)
+
+  # Return the statistics of a metric of the first command.
+  def stats(self, metric="time", name=None):
+    return self._benchmarks[0].stats(metric, name)
+
+
+# The command which is timed to calibrate the harness overhead:
+CALIBRATION_COMMAND = "true"
+
+
+# Measure the overhead of the harness by timing a null command, using
+# the same spawn backend and cache flushing options as "options".
+# Returns an Accumulator of the overhead samples.
+def calibrate(options):
+  calibration = copy(options)
+  calibration.args = [CALIBRATION_COMMAND]
+  calibration.command = CALIBRATION_COMMAND
+  calibration.commands = [CALIBRATION_COMMAND]
+  calibration.compare = False
+  calibration.python = False
+  calibration.points = []
+  calibration.filter = False
+  calibration.extractor = None
+  calibration.metrics = ["time"]
+  calibration.quiet = True
+  calibration.target_time = options.calibration_time
+  calibration.target_precision = None
+  calibration.subtract_overhead = False
+  calibration.warmup = 0
+  calibration.outliers = "keep"
+  calibration.max_timeouts = None
+  calibration.output = None
+  calibration.stream = None
+  calibration.resume = False
 
-  def results(self):
-    return self._results
+  log.info("Calibrating harness overhead.")
+  return Timer(calibration).accumulator()
@@ -0,0 +1,88 @@
+import os
+import random
+import shutil
+import tempfile
+from unittest import TestCase, main
+
+from srtime.exceptions import *
+from srtime.stats import Accumulator
+
+from srtime.baseline import *
+
+
+# Return a list of "n" normally distributed samples.
+def samples(mean, n=100, seed=0):
+  rng = random.Random(seed)
+  return [rng.gauss(mean, mean * 0.01) for _ in range(n)]
+
+
+# Return the Check of list "b" against list "a".
+def check(a, b, effect=0.05):
+  return Check(Accumulator(a), Accumulator(b), a, b, effect=effect)
+
+
+class TestBaseline(TestCase):
+
+  def setUp(self):
+    self._dir = tempfile.mkdtemp()
+    self._path = os.path.join(self._dir, "baselines")
+
+  def tearDown(self):
+    shutil.rmtree(self._dir)
+
+  def test_check_verdicts(self):
+    baseline = samples(1)
+    self.assertTrue(check(baseline, samples(1, seed=1)).verdict ==
+                    "unchanged")
+    self.assertTrue(check(baseline, samples(1.5, seed=1)).verdict ==
+                    "regressed")
+    self.assertTrue(check(baseline, samples(0.5, seed=1)).verdict ==
+                    "improved")
+    # Significant, but smaller than the effect size, and too few
+    # samples to be within it:
+    self.assertTrue(check(baseline[:3], samples(1.04, 3, 1)).verdict ==
+                    "inconclusive")
+
+  def test_check_status(self):
+    baseline = samples(1)
+    for mean, status in [(1, 0), (1.5, 3), (0.5, 4)]:
+      self.assertTrue(check(baseline, samples(mean, seed=1)).status() ==
+                      status)
+
+  def test_check_format(self):
+    c = check(samples(1), samples(1.5, seed=1))
+    self.assertTrue("regressed" in c.format())
+    self.assertTrue('"verdict","regressed"' in c.format(fmt="csv"))
+
+  def test_baselines_save(self):
+    results = samples(1)
+    Baselines(self._path).save("foo bar", "cmd", results)
+
+    # The baseline is found by a new instance using the index:
+    baselines = Baselines(self._path)
+    self.assertTrue(baselines.find("foo bar")["command"] == "cmd")
+    self.assertTrue(baselines.find("foo bar")["n"] == 100)
+    self.assertTrue(list(baselines.samples("foo bar")) == results)
+
+    # Saving again replaces the baseline:
+    baselines.save("foo bar", "cmd", results[:10])
+    self.assertTrue(len(Baselines(self._path).samples("foo bar")) == 10)
+    self.assertTrue(sorted(os.listdir(self._path)) ==
+                    sorted([INDEX, os.path.basename(
+                        baselines._store_path("foo bar"))]))
+
+  def test_baselines_check(self):
+    baselines = Baselines(self._path)
+    baselines.save("foo", "cmd", samples(1))
+    self.assertTrue(baselines.check("foo", samples(1.5, seed=1)).verdict ==
+                    "regressed")
+
+  def test_baselines_missing(self):
+    baselines = Baselines(self._path)
+    self.assertRaises(BaselineException, baselines.find, "foo")
+    self.assertRaises(BaselineException, baselines.check, "foo", [1, 2])
+    self.assertRaises(BaselineException, baselines.save, "foo", "cmd", [])
+
+
+if __name__ == '__main__':
+  main()
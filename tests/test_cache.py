@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main, skipUnless
+
+from srtime.exceptions import *
+
+from srtime.cache import *
+
+
+class TestCache(TestCase):
+
+  def setUp(self):
+    self._dir = tempfile.mkdtemp()
+    os.mkdir(os.path.join(self._dir, "sub"))
+    self._files = [os.path.join(self._dir, "a"),
+                   os.path.join(self._dir, "sub", "b")]
+    for path in self._files:
+      with open(path, "wb") as f:
+        f.write(b"x" * 10000)
+
+  def tearDown(self):
+    shutil.rmtree(self._dir)
+
+  def test_files(self):
+    self.assertTrue(sorted(files([self._dir])) == sorted(self._files))
+    self.assertTrue(files([self._files[0]]) == [self._files[0]])
+
+  def test_drop_helper(self):
+    control = CacheControl("drop")
+    # A helper which drops the caches by writing to a file:
+    path = os.path.join(self._dir, "drop_caches")
+    control._helper_argv = ["sh", "-c", helper_script(path)]
+    control._drop_with_helper()
+    with open(path) as f:
+      self.assertTrue(f.read() == "3\n")
+    control.close()
+
+  def test_drop_helper_failure(self):
+    control = CacheControl("drop")
+    # The helper acknowledges a failed write, rather than hanging:
+    path = os.path.join(self._dir, "nosuchdir", "drop_caches")
+    control._helper_argv = ["sh", "-c", helper_script(path)]
+    self.assertRaises(CacheException, control._drop_with_helper)
+    self.assertTrue(control._helper is None)
+
+  def test_evict(self):
+    control = CacheControl("evict", [self._dir])
+    self.assertTrue(control.prepare() >= 0)
+
+  def test_warm(self):
+    control = CacheControl("warm", [self._dir])
+    self.assertTrue(control.prepare() >= 0)
+
+  @skipUnless(os.geteuid() == 0 and os.access(DROP_CACHES, os.W_OK),
+              "requires root")
+  def test_drop(self):
+    control = CacheControl("drop")
+    self.assertTrue(control.prepare() >= 0)
+    control.close()
+
+  def test_invalid(self):
+    self.assertRaises(CacheException, CacheControl, "foo")
+    self.assertRaises(CacheException, CacheControl, "evict")
+    self.assertRaises(CacheException, CacheControl, "warm",
+                      [os.path.join(self._dir, "nosuchfile")])
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,49 @@
+from unittest import TestCase, main
+
+from srtime.exceptions import *
+from srtime.parser import ArgumentParser
+
+from srtime.config import *
+
+
+class TestConfig(TestCase):
+
+  def test_config_defaults(self):
+    # The defaults are those of the command line:
+    options = Config(["a"]).options()
+    args = ArgumentParser().parse_args(["a"])
+    for name in Config.__dataclass_fields__:
+      if name not in ["commands", "quiet"]:
+        self.assertTrue(getattr(options, name) == getattr(args, name), name)
+    self.assertTrue(options.commands == ["a"])
+    self.assertFalse(options.compare)
+    self.assertTrue(options.quiet)
+
+  def test_config_package(self):
+    # Config is imported lazily by the package:
+    import srtime
+    self.assertTrue(srtime.Config is Config)
+    self.assertRaises(AttributeError, getattr, srtime, "Foo")
+
+  def test_config_compare(self):
+    options = Config(["a", "b c"]).options()
+    self.assertTrue(options.compare)
+    self.assertTrue(options.commands == ["a", "b c"])
+
+  def test_config_options(self):
+    options = Config(["-a {k}"], sweep=["k=1,2"], metrics=["time", "utime"],
+                     warmup="auto", cpus="0").options()
+    self.assertTrue(options.commands == ["-a 1", "-a 2"])
+    self.assertTrue(options.metrics == ["time", "utime"])
+    self.assertTrue(options.warmup == "auto")
+    self.assertTrue(options.environment.cpus == [0])
+
+  def test_config_invalid(self):
+    self.assertRaises(ArgumentParserException,
+                      Config(["a"], filter=True, filter_kv="ms").options)
+    self.assertRaises(ArgumentParserException,
+                      Config(["a"], spawn="foo").options)
+
+
+if __name__ == '__main__':
+  main()
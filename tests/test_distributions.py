@@ -0,0 +1,67 @@
+from unittest import TestCase, main
+
+from srtime.distributions import *
+
+
+class TestDistributions(TestCase):
+
+  # normppf() tests
+  def test_normppf(self):
+    self.assertTrue(normppf(0.5) == 0)
+    self.assertAlmostEqual(normppf(0.975), 1.959963984540054, places=12)
+    self.assertAlmostEqual(normppf(0.025), -1.959963984540054, places=12)
+
+  def test_normcdf(self):
+    self.assertTrue(normcdf(0) == 0.5)
+    self.assertAlmostEqual(normcdf(normppf(0.9)), 0.9, places=12)
+
+  # tppf() tests
+  def test_tppf_median(self):
+    self.assertTrue(tppf(0.5, 10) == 0)
+
+  def test_tppf_limits(self):
+    self.assertTrue(tppf(0, 10) == float("-inf"))
+    self.assertTrue(tppf(1, 10) == float("inf"))
+
+  def test_tppf_closed_forms(self):
+    self.assertAlmostEqual(tppf(0.975, 1), 12.706204736174694, places=9)
+    self.assertAlmostEqual(tppf(0.975, 2), 4.302652729749462, places=12)
+
+  def test_tppf(self):
+    self.assertAlmostEqual(tppf(0.975, 10), 2.228138851986274, places=12)
+    self.assertAlmostEqual(tppf(0.95, 29), 1.6991270265334972, places=12)
+    self.assertAlmostEqual(tppf(0.75, 3), 0.7648923284043444, places=12)
+    self.assertAlmostEqual(tppf(0.025, 10), -2.228138851986274, places=12)
+
+  def test_tppf_fractional_df(self):
+    self.assertAlmostEqual(tppf(0.975, 7.5), 2.333039626864974, places=9)
+
+  def test_tppf_large_df(self):
+    self.assertAlmostEqual(tppf(0.975, 1e6), 1.959966356814107, places=9)
+    self.assertAlmostEqual(tppf(0.975, 1e9), normppf(0.975), places=9)
+
+  # tcdf() tests
+  def test_tcdf(self):
+    self.assertTrue(tcdf(0, 10) == 0.5)
+    self.assertAlmostEqual(tcdf(2.228138851986274, 10), 0.975, places=12)
+    self.assertAlmostEqual(tcdf(-1, 1), 0.25, places=12)
+
+  def test_tcdf_tppf_roundtrip(self):
+    for df in [3, 5.5, 30, 1000]:
+      for p in [0.01, 0.3, 0.9, 0.999]:
+        self.assertAlmostEqual(tcdf(tppf(p, df), df), p, places=12)
+
+  # betainc() tests
+  def test_betainc_limits(self):
+    self.assertTrue(betainc(2, 3, 0) == 0)
+    self.assertTrue(betainc(2, 3, 1) == 1)
+
+  def test_betainc(self):
+    # I_x(1, 1) is the uniform CDF:
+    self.assertAlmostEqual(betainc(1, 1, 0.3), 0.3, places=12)
+    # I_x(2, 3) = 1 - (1 - x)^4 - 4x(1 - x)^3 at x = 0.5:
+    self.assertAlmostEqual(betainc(2, 3, 0.5), 0.6875, places=12)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+
+from srtime.exceptions import *
+
+import srtime.environment
+from srtime.environment import *
+from srtime.spawn import spawn
+
+
+class TestEnvironment(TestCase):
+
+  def test_parse_cpus(self):
+    self.assertTrue(parse_cpus("0-3,6,2") == [0, 1, 2, 3, 6])
+    for s in ["", "a", "3-1", "-1"]:
+      self.assertRaises(ValueError, parse_cpus, s)
+
+  def test_format_cpus(self):
+    self.assertTrue(format_cpus([6, 0, 1, 2, 3, 8, 9]) == "0-3,6,8-9")
+
+  def test_pad_env(self):
+    env = pad_env({"A": "1", PAD_VARIABLE: "xx"}, 100)
+    self.assertTrue(env_size(env) == 100)
+    self.assertTrue(env["A"] == "1")
+    self.assertRaises(EnvironmentException, pad_env, {"A": "1"}, 10)
+
+  def test_settings(self):
+    environment = Environment(cpus=[0], nice=1, ionice=("idle", 0),
+                              scheduler=("batch", 0), aslr=False,
+                              env_size=100000)
+    self.assertTrue(environment.settings() ==
+                    [("cpus", "0"), ("nice", 1), ("ionice", "idle"),
+                     ("scheduler", "batch:0"), ("aslr", "off"),
+                     ("env-size", 100000)])
+    self.assertTrue(environment.child_settings() ==
+                    ["cpus", "nice", "ionice", "scheduler", "aslr"])
+    self.assertTrue(Environment(scheduler=("fifo", 1)).child_settings() == [])
+    self.assertTrue(Environment().settings() == [])
+
+  def test_libc_loaded_once(self):
+    environment = Environment(ionice=("best-effort", 4), aslr=False)
+    # The C library is loaded in the parent, so applying the settings in
+    # the child only makes the calls:
+    load = srtime.environment._libc_function
+    srtime.environment._libc_function = None
+    try:
+      environment.check()
+    finally:
+      srtime.environment._libc_function = load
+
+  def test_spawn(self):
+    environment = Environment(cpus=[0], nice=1, scheduler=("batch", 0),
+                              aslr=False, env_size=100000)
+    environment.check()
+    for backend in ["pty", "pipe"]:
+      lines = []
+      spawn("sh -c 'echo ${#SRTIME_PAD}; cat /proc/self/personality'",
+            backend=backend, hook=lines.append, quiet=True,
+            environment=environment)
+      self.assertTrue(int(lines[0]) == len(environment.env[PAD_VARIABLE]))
+      self.assertTrue(int(lines[1], 16) & 0x0040000)
+
+  def test_spawn_posix_spawn(self):
+    environment = Environment(scheduler=("other", 0), env_size=100000)
+    lines = []
+    spawn("sh -c 'echo ${#SRTIME_PAD}'", backend="posix_spawn",
+          hook=lines.append, quiet=True, environment=environment)
+    self.assertTrue(int(lines[0]) == len(environment.env[PAD_VARIABLE]))
+
+  def test_cpu_frequency(self):
+    root = tempfile.mkdtemp()
+    try:
+      for cpu, governor in [(0, "performance"), (1, "powersave")]:
+        path = os.path.join(root, "cpu{0}".format(cpu), "cpufreq")
+        os.makedirs(path)
+        with open(os.path.join(path, "scaling_governor"), "w") as f:
+          f.write(governor + "\n")
+      self.assertTrue(cpu_frequency(root=root) ==
+                      [("governor", "performance,powersave")])
+      self.assertTrue(cpu_frequency([0], root=root) ==
+                      [("governor", "performance")])
+
+      os.makedirs(os.path.join(root, "intel_pstate"))
+      with open(os.path.join(root, "intel_pstate", "no_turbo"), "w") as f:
+        f.write("0\n")
+      self.assertTrue(cpu_frequency([0], root=root) ==
+                      [("governor", "performance"), ("turbo", "on")])
+    finally:
+      shutil.rmtree(root)
+
+  def test_preflight(self):
+    self.assertTrue(preflight([]) == [])
+    self.assertTrue(preflight([("governor", "performance"),
+                               ("turbo", "off")]) == [])
+    self.assertTrue(len(preflight([("governor", "powersave"),
+                                   ("turbo", "on")])) == 2)
+
+
+if __name__ == '__main__':
+  main()
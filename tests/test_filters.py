@@ -0,0 +1,64 @@
+from unittest import TestCase, main
+
+from srtime.exceptions import *
+from srtime.filters import *
+
+
+OUTPUT = (b"starting\n"
+          b"phase=parse ms=12.3 bytes=40960\n"
+          b"log: something happened\n"
+          b"phase=eval ms=1.5e1 bytes=1024\n"
+          b"xms=99 ms=bad\n")
+
+
+class TestFilters(TestCase):
+
+  # RegexFilter tests
+  def test_regex_filter_metrics(self):
+    f = RegexFilter(r"ms=(?P<ms>[0-9.e]+) bytes=(?P<bytes>\d+)")
+    self.assertTrue(f.metrics == ["ms", "bytes"])
+
+  def test_regex_filter_extract(self):
+    f = RegexFilter(r"ms=(?P<ms>[0-9.e]+) bytes=(?P<bytes>\d+)")
+    samples = f.extract(OUTPUT)
+    self.assertTrue(samples == {"ms": [12.3, 15], "bytes": [40960, 1024]})
+
+  def test_regex_filter_single_group(self):
+    f = RegexFilter(r"^phase=\w+ ms=(?P<ms>\S+)")
+    self.assertTrue(f.extract(OUTPUT) == {"ms": [12.3, 15]})
+
+  def test_regex_filter_alternation(self):
+    f = RegexFilter(r"ms=(?P<ms>[0-9.]+) |bytes=(?P<bytes>\d+)")
+    samples = f.extract(b"ms=1 \nbytes=2\n")
+    self.assertTrue(samples == {"ms": [1], "bytes": [2]})
+
+  def test_regex_filter_no_match(self):
+    f = RegexFilter(r"ms=(?P<ms>\d+)")
+    self.assertTrue(f.extract(b"foo\nbar\n") == {"ms": []})
+
+  def test_regex_filter_invalid_value(self):
+    f = RegexFilter(r"ms=(?P<ms>\w+)")
+    self.assertRaises(FilterInputException, f.extract, b"ms=bad\n")
+
+  def test_regex_filter_no_groups(self):
+    self.assertRaises(ValueError, RegexFilter, r"ms=\d+")
+
+  def test_regex_filter_reserved(self):
+    self.assertRaises(ValueError, RegexFilter, r"(?P<time>\d+)")
+
+  # KeyValueFilter tests
+  def test_kv_filter_extract(self):
+    f = KeyValueFilter(["ms", "bytes"])
+    samples = f.extract(OUTPUT)
+    self.assertTrue(samples == {"ms": [12.3, 15], "bytes": [40960, 1024]})
+
+  def test_kv_filter_separators(self):
+    f = KeyValueFilter(["a"])
+    self.assertTrue(f.extract(b"a=1,a=2;a=3\r\nba=4 a=5x") == {"a": [1, 2, 3]})
+
+  def test_kv_filter_invalid_key(self):
+    self.assertRaises(ValueError, KeyValueFilter, ["a b"])
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,45 @@
+import io
+import shutil
+import tempfile
+from contextlib import redirect_stderr
+from unittest import TestCase, main
+
+from srtime import main as srtime_main
+
+
+class TestMain(TestCase):
+
+  def setUp(self):
+    self._dir = tempfile.mkdtemp()
+    self._baseline = ["--baseline", "x", "--baseline-dir", self._dir]
+
+  def tearDown(self):
+    shutil.rmtree(self._dir)
+
+  def _main(self, args):
+    return srtime_main(["-s", "posix_spawn", "-m", "2", "-t", "0"] + args)
+
+  def test_main_status(self):
+    self.assertTrue(self._main(["true"]) == 0)
+    self.assertTrue(self._main(["sh -c 'exit 4'"]) == 4)
+
+  def test_main_all_timeouts(self):
+    args = ["--iteration-timeout", "0.05", "-M", "all", "-C", "true",
+            "sleep 1"]
+    output = io.StringIO()
+    with redirect_stderr(output):
+      self.assertTrue(self._main(args) == 0)
+    self.assertTrue("All 2 iterations of sleep 1: time timed out"
+                    in output.getvalue())
+
+  def test_main_check_failure(self):
+    self.assertTrue(self._main(self._baseline + ["--save", "true"]) == 0)
+    # The exit status of the command is not mistaken for a verdict:
+    self.assertTrue(self._main(self._baseline +
+                               ["--check", "sh -c 'exit 4'"]) == 1)
+    self.assertTrue(self._main(self._baseline + ["--check", "true"])
+                    in [0, 3, 4, 5])
+
+
+if __name__ == '__main__':
+  main()
@@ -26,6 +26,20 @@ class TestProcess(TestCase):
     args = p.parse_args(l)
     self.assertTrue(args.command == " ".join(l))
 
+  # Flag: --suite
+  def test_parser_suite_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.suite is None)
+
+  def test_parser_suite(self):
+    args = ArgumentParser().parse_args(["--suite", "suite.toml"])
+    self.assertTrue(args.suite == "suite.toml")
+    self.assertTrue(args.args == [])
+    for flags in [["a"], ["-C"], ["--sweep", "k=1"], ["-o", "out"],
+                  ["--stream", "-"], ["-g"]]:
+      self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                        ["--suite", "suite.toml"] + flags)
+
   # Flag: -v / --verbose
   def test_parser_verbose_default(self):
     args = ArgumentParser().parse_args(["a"])
@@ -37,6 +51,87 @@ class TestProcess(TestCase):
     args = ArgumentParser().parse_args(["a", "--verbose"])
     self.assertTrue(args.verbose)
 
+  # Flag: -C / --compare
+  def test_parser_compare_default(self):
+    args = ArgumentParser().parse_args(["a", "b"])
+    self.assertFalse(args.compare)
+    self.assertTrue(args.commands == ["a b"])
+
+  def test_parser_compare(self):
+    args = ArgumentParser().parse_args(["-C", "a -x", "b"])
+    self.assertTrue(args.compare)
+    self.assertTrue(args.commands == ["a -x", "b"])
+    args = ArgumentParser().parse_args(["--compare", "a", "b"])
+    self.assertTrue(args.compare)
+
+  # Flag: --sweep
+  def test_parser_sweep_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.sweep is None)
+    self.assertTrue(args.points == [])
+
+  def test_parser_sweep(self):
+    args = ArgumentParser().parse_args(["--sweep", "t=1,2", "--sweep",
+                                        "s=a,b", "--", "x", "-t", "{t}",
+                                        "{s}"])
+    self.assertTrue(args.points == [{"t": "1", "s": "a"},
+                                    {"t": "1", "s": "b"},
+                                    {"t": "2", "s": "a"},
+                                    {"t": "2", "s": "b"}])
+    self.assertTrue(args.commands == ["x -t 1 a", "x -t 1 b",
+                                      "x -t 2 a", "x -t 2 b"])
+
+  def test_parser_sweep_invalid(self):
+    for sweep in ["t", "t=", "=1", "u=1", "n=1"]:
+      self.assertRaises(ArgumentParserException,
+                        ArgumentParser().parse_args,
+                        ["--sweep", sweep, "--", "x", "{t}", "{n}"])
+    self.assertRaises(ArgumentParserException,
+                      ArgumentParser().parse_args,
+                      ["--sweep", "t=1", "--sweep", "t=2", "x {t}"])
+    self.assertRaises(ArgumentParserException,
+                      ArgumentParser().parse_args,
+                      ["-C", "--sweep", "t=1", "x {t}", "y"])
+
+  # Flag: --python
+  def test_parser_python_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertFalse(args.python)
+
+  def test_parser_python(self):
+    args = ArgumentParser().parse_args(["--python", "m:f"])
+    self.assertTrue(args.python)
+    self.assertTrue(args.commands == ["m:f"])
+    self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                      ["--python", "-i", "m:f"])
+
+  # Flag: --setup
+  def test_parser_setup_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.setup == "pass")
+
+  def test_parser_setup(self):
+    args = ArgumentParser().parse_args(["--setup", "x = 1", "a"])
+    self.assertTrue(args.setup == "x = 1")
+
+  # Flag: --gc
+  def test_parser_gc_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertFalse(args.gc)
+
+  def test_parser_gc(self):
+    args = ArgumentParser().parse_args(["--gc", "a"])
+    self.assertTrue(args.gc)
+
+  # Flag: --isolate
+  def test_parser_isolate_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertFalse(args.isolate)
+
+  def test_parser_isolate(self):
+    args = ArgumentParser().parse_args(["--isolate", "a"])
+    self.assertTrue(args.isolate)
+
   # Flag: -i / --filter
   def test_parser_filter_default(self):
     args = ArgumentParser().parse_args(["a"])
@@ -48,6 +143,45 @@ class TestProcess(TestCase):
     args = ArgumentParser().parse_args(["a", "--filter"])
     self.assertTrue(args.filter)
 
+  # Flag: --filter-regex
+  def test_parser_filter_regex_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.filter_regex is None)
+    self.assertTrue(args.extractor is None)
+
+  def test_parser_filter_regex(self):
+    args = ArgumentParser().parse_args(["a", "--filter-regex",
+                                        "ms=(?P<ms>[0-9.]+)"])
+    self.assertTrue(args.extractor.metrics == ["ms"])
+    self.assertTrue(args.metrics == ["ms"])
+
+  def test_parser_filter_regex_invalid(self):
+    self.assertRaises(ArgumentParserException,
+                      ArgumentParser().parse_args,
+                      ["a", "--filter-regex", "(?P<ms>"])
+    self.assertRaises(ArgumentParserException,
+                      ArgumentParser().parse_args,
+                      ["a", "--filter-regex", "ms=\\d+"])
+
+  # Flag: --filter-kv
+  def test_parser_filter_kv_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.filter_kv is None)
+
+  def test_parser_filter_kv(self):
+    args = ArgumentParser().parse_args(["a", "--filter-kv", "ms,bytes",
+                                        "-M", "time,ms"])
+    self.assertTrue(args.extractor.metrics == ["ms", "bytes"])
+    self.assertTrue(args.metrics == ["time", "ms"])
+    args = ArgumentParser().parse_args(["a", "--filter-kv", "ms", "-M",
+                                        "all"])
+    self.assertTrue(args.metrics == METRICS + ["ms"])
+
+  def test_parser_filter_exclusive(self):
+    self.assertRaises(ArgumentParserException,
+                      ArgumentParser().parse_args,
+                      ["a", "-i", "--filter-kv", "ms"])
+
   # Flag: -f / --format
   def test_parser_format_default(self):
     args = ArgumentParser().parse_args(["a"])
@@ -59,6 +193,17 @@ class TestProcess(TestCase):
     args = ArgumentParser().parse_args(["a", "--format", "txt"])
     self.assertTrue(args.fmt == "txt")
 
+  # Flag: -M / --metrics
+  def test_parser_metrics_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.metrics == ["time"])
+
+  def test_parser_metrics(self):
+    args = ArgumentParser().parse_args(["a", "-M", "time,maxrss"])
+    self.assertTrue(args.metrics == ["time", "maxrss"])
+    args = ArgumentParser().parse_args(["a", "--metrics", "all"])
+    self.assertTrue(args.metrics == METRICS)
+
   # Flag: -m / --min-iterations
   def test_parser_min_iterations_default(self):
     args = ArgumentParser().parse_args(["a"])
@@ -81,6 +226,41 @@ class TestProcess(TestCase):
     args = ArgumentParser().parse_args(["a", "--target-time", "20"])
     self.assertTrue(args.target_time == 20)
 
+  # Flag: -P / --target-precision
+  def test_parser_target_precision_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.target_precision is None)
+
+  def test_parser_target_precision(self):
+    args = ArgumentParser().parse_args(["a", "-P", "0.01"])
+    self.assertTrue(args.target_precision == 0.01)
+    args = ArgumentParser().parse_args(["a", "--target-precision", "0.5"])
+    self.assertTrue(args.target_precision == 0.5)
+
+  # Flag: -w / --warmup
+  def test_parser_warmup_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.warmup == 0)
+
+  def test_parser_warmup(self):
+    args = ArgumentParser().parse_args(["a", "-w", "5"])
+    self.assertTrue(args.warmup == 5)
+    args = ArgumentParser().parse_args(["a", "--warmup", "auto"])
+    self.assertTrue(args.warmup == "auto")
+
+  def test_parser_warmup_invalid(self):
+    self.assertRaises(ArgumentParserException,
+                      ArgumentParser().parse_args, ["a", "-w", "foo"])
+
+  # Flag: --warmup-window
+  def test_parser_warmup_window_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.warmup_window == 10)
+
+  def test_parser_warmup_window(self):
+    args = ArgumentParser().parse_args(["a", "--warmup-window", "20"])
+    self.assertTrue(args.warmup_window == 20)
+
   # Flag: -N / --threshold
   def test_parser_threshold_default(self):
     args = ArgumentParser().parse_args(["a"])
@@ -114,6 +294,194 @@ class TestProcess(TestCase):
     args = ArgumentParser().parse_args(["a", "--confidence", "0.5"])
     self.assertTrue(args.confidence == 0.5)
 
+  # Flag: --ci-method
+  def test_parser_ci_method_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.ci_method == "parametric")
+
+  def test_parser_ci_method(self):
+    args = ArgumentParser().parse_args(["a", "--ci-method", "bootstrap"])
+    self.assertTrue(args.ci_method == "bootstrap")
+
+  def test_parser_ci_method_invalid(self):
+    self.assertRaises(ArgumentParserException,
+                      ArgumentParser().parse_args,
+                      ["a", "--ci-method", "foo"])
+
+  # Flag: --bootstrap-method
+  def test_parser_bootstrap_method_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.bootstrap_method == "bca")
+
+  def test_parser_bootstrap_method(self):
+    args = ArgumentParser().parse_args(["a", "--bootstrap-method",
+                                        "percentile"])
+    self.assertTrue(args.bootstrap_method == "percentile")
+
+  # Flag: --resamples
+  def test_parser_resamples_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.resamples == 10000)
+
+  def test_parser_resamples(self):
+    args = ArgumentParser().parse_args(["a", "--resamples", "500"])
+    self.assertTrue(args.resamples == 500)
+
+  # Flag: --sketch
+  def test_parser_sketch_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertFalse(args.sketch)
+
+  def test_parser_sketch(self):
+    args = ArgumentParser().parse_args(["--sketch", "a"])
+    self.assertTrue(args.sketch)
+
+  # Flag: --sketch-k
+  def test_parser_sketch_k_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.sketch_k == 200)
+
+  def test_parser_sketch_k(self):
+    args = ArgumentParser().parse_args(["--sketch-k", "50", "a"])
+    self.assertTrue(args.sketch_k == 50)
+
+  # Flag: --reservoir
+  def test_parser_reservoir_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.reservoir == 10000)
+
+  def test_parser_reservoir(self):
+    args = ArgumentParser().parse_args(["--reservoir", "0", "a"])
+    self.assertTrue(args.reservoir == 0)
+
+  # Flag: --outliers
+  def test_parser_outliers_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.outliers == "keep")
+
+  def test_parser_outliers(self):
+    args = ArgumentParser().parse_args(["a", "--outliers", "reject"])
+    self.assertTrue(args.outliers == "reject")
+
+  # Flag: --outlier-method
+  def test_parser_outlier_method_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.outlier_method == "tukey")
+
+  def test_parser_outlier_method(self):
+    args = ArgumentParser().parse_args(["a", "--outlier-method", "mad"])
+    self.assertTrue(args.outlier_method == "mad")
+
+  # Flag: --iteration-timeout
+  def test_parser_iteration_timeout_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.iteration_timeout is None)
+
+  def test_parser_iteration_timeout(self):
+    args = ArgumentParser().parse_args(["a", "--iteration-timeout", "2.5"])
+    self.assertTrue(args.iteration_timeout == 2.5)
+
+  # Flag: --max-timeouts
+  def test_parser_max_timeouts_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.max_timeouts is None)
+
+  def test_parser_max_timeouts(self):
+    args = ArgumentParser().parse_args(["a", "--max-timeouts", "3"])
+    self.assertTrue(args.max_timeouts == 3)
+
+  # Flag: -o / --output
+  def test_parser_output_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.output is None)
+
+  def test_parser_output(self):
+    args = ArgumentParser().parse_args(["a", "-o", "foo.bin"])
+    self.assertTrue(args.output == "foo.bin")
+    args = ArgumentParser().parse_args(["a", "--output", "bar.bin"])
+    self.assertTrue(args.output == "bar.bin")
+
+  # Flag: --resume
+  def test_parser_resume_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertFalse(args.resume)
+
+  def test_parser_resume(self):
+    args = ArgumentParser().parse_args(["a", "--resume"])
+    self.assertTrue(args.resume)
+
+  # Flag: --baseline
+  def test_parser_baseline_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.baseline is None)
+
+  def test_parser_baseline(self):
+    args = ArgumentParser().parse_args(["--baseline", "x", "--save", "a"])
+    self.assertTrue(args.baseline == "x")
+    for argv in [["--baseline", "x", "a"],
+                 ["--baseline", "x", "--save", "--check", "a"],
+                 ["--baseline", "x", "--save", "-C", "a", "b"]]:
+      self.assertRaises(ArgumentParserException,
+                        ArgumentParser().parse_args, argv)
+
+  # Flag: --save
+  def test_parser_save_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertFalse(args.save)
+
+  def test_parser_save(self):
+    args = ArgumentParser().parse_args(["--baseline", "x", "--save", "a"])
+    self.assertTrue(args.save)
+    self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                      ["--save", "a"])
+
+  # Flag: --check
+  def test_parser_check_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertFalse(args.check)
+
+  def test_parser_check(self):
+    args = ArgumentParser().parse_args(["--baseline", "x", "--check", "a"])
+    self.assertTrue(args.check)
+    self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                      ["--check", "a"])
+
+  # Flag: --baseline-dir
+  def test_parser_baseline_dir_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.baseline_dir == ".srtime")
+
+  def test_parser_baseline_dir(self):
+    args = ArgumentParser().parse_args(["--baseline-dir", "foo", "a"])
+    self.assertTrue(args.baseline_dir == "foo")
+
+  # Flag: --effect-size
+  def test_parser_effect_size_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.effect_size == 0.05)
+
+  def test_parser_effect_size(self):
+    args = ArgumentParser().parse_args(["--effect-size", "0.1", "a"])
+    self.assertTrue(args.effect_size == 0.1)
+
+  # Flag: --stream
+  def test_parser_stream_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.stream is None)
+
+  def test_parser_stream(self):
+    args = ArgumentParser().parse_args(["a", "--stream", "-"])
+    self.assertTrue(args.stream == "-")
+
+  # Flag: --stream-interval
+  def test_parser_stream_interval_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.stream_interval == 1)
+
+  def test_parser_stream_interval(self):
+    args = ArgumentParser().parse_args(["a", "--stream-interval", "0.5"])
+    self.assertTrue(args.stream_interval == 0.5)
+
   # Flag: -g / --graph
   def test_parser_graph_default(self):
     args = ArgumentParser().parse_args(["a"])
@@ -125,6 +493,67 @@ class TestProcess(TestCase):
     args = ArgumentParser().parse_args(["a", "--graph"])
     self.assertTrue(args.graph)
 
+  def test_parser_graph_file(self):
+    args = ArgumentParser().parse_args(["a", "-g", "out.png"])
+    self.assertTrue(args.graph == "out.png")
+    args = ArgumentParser().parse_args(["--graph", "out.SVG", "a"])
+    self.assertTrue(args.graph == "out.SVG")
+    self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                      ["a", "-g", "out.txt"])
+
+  # Flag: -j / --jobs
+  def test_parser_jobs_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.jobs == 1)
+
+  def test_parser_jobs(self):
+    args = ArgumentParser().parse_args(["a", "-j", "4"])
+    self.assertTrue(args.jobs == 4)
+    args = ArgumentParser().parse_args(["a", "--jobs", "8"])
+    self.assertTrue(args.jobs == 8)
+
+  # Flag: -s / --spawn
+  def test_parser_spawn_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.spawn == "pty")
+
+  def test_parser_spawn(self):
+    args = ArgumentParser().parse_args(["a", "-s", "pipe"])
+    self.assertTrue(args.spawn == "pipe")
+    args = ArgumentParser().parse_args(["a", "--spawn", "posix_spawn"])
+    self.assertTrue(args.spawn == "posix_spawn")
+
+  def test_parser_spawn_invalid(self):
+    self.assertRaises(ArgumentParserException,
+                      ArgumentParser().parse_args, ["a", "-s", "foo"])
+
+  # Flag: --calibrate
+  def test_parser_calibrate_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertFalse(args.calibrate)
+
+  def test_parser_calibrate(self):
+    args = ArgumentParser().parse_args(["a", "--calibrate"])
+    self.assertTrue(args.calibrate)
+
+  # Flag: --subtract-overhead
+  def test_parser_subtract_overhead_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertFalse(args.subtract_overhead)
+
+  def test_parser_subtract_overhead(self):
+    args = ArgumentParser().parse_args(["a", "--subtract-overhead"])
+    self.assertTrue(args.subtract_overhead)
+
+  # Flag: --calibration-time
+  def test_parser_calibration_time_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.calibration_time == 1)
+
+  def test_parser_calibration_time(self):
+    args = ArgumentParser().parse_args(["a", "--calibration-time", "2.5"])
+    self.assertTrue(args.calibration_time == 2.5)
+
   # Flag: -F / --flush-cache
   def test_parser_flush_caches_default(self):
     args = ArgumentParser().parse_args(["a"])
@@ -135,6 +564,113 @@ class TestProcess(TestCase):
     self.assertTrue(args.flush_caches)
     args = ArgumentParser().parse_args(["a", "--flush-cache"])
     self.assertTrue(args.flush_caches)
+    self.assertTrue(args.cache == "drop")
+    self.assertTrue(args.cache_control.mode == "drop")
+
+  # Flag: --cache
+  def test_parser_cache_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.cache is None)
+    self.assertTrue(args.cache_control is None)
+
+  def test_parser_cache(self):
+    args = ArgumentParser().parse_args(["--cache", "drop", "a"])
+    self.assertTrue(args.cache == "drop")
+    self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                      ["--cache", "foo", "a"])
+    self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                      ["--cache", "evict", "a"])
+    self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                      ["-F", "--cache", "warm", "--cache-path", ".", "a"])
+
+  # Flag: --cache-path
+  def test_parser_cache_path_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.cache_paths is None)
+
+  def test_parser_cache_path(self):
+    args = ArgumentParser().parse_args(["--cache", "evict", "--cache-path",
+                                        "srtime", "--cache-path", "tests",
+                                        "a"])
+    self.assertTrue(args.cache_paths == ["srtime", "tests"])
+    self.assertTrue(args.cache_control.paths == ["srtime", "tests"])
+    self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                      ["--cache-path", "srtime", "a"])
+    self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                      ["--cache", "evict", "--cache-path", "nosuchfile",
+                       "a"])
+
+  # Flag: --cpus
+  def test_parser_cpus_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.cpus is None)
+    self.assertTrue(args.environment is None)
+
+  def test_parser_cpus(self):
+    args = ArgumentParser().parse_args(["--cpus", "0", "a"])
+    self.assertTrue(args.environment.cpus == [0])
+    self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                      ["--cpus", "x", "a"])
+    self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                      ["--cpus", "100000", "a"])
+
+  # Flag: --nice
+  def test_parser_nice_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.nice is None)
+
+  def test_parser_nice(self):
+    args = ArgumentParser().parse_args(["--nice", "5", "a"])
+    self.assertTrue(args.environment.nice == 5)
+
+  # Flag: --ionice
+  def test_parser_ionice_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.ionice is None)
+
+  def test_parser_ionice(self):
+    args = ArgumentParser().parse_args(["--ionice", "best-effort:4", "a"])
+    self.assertTrue(args.environment.ionice == ("best-effort", 4))
+    args = ArgumentParser().parse_args(["--ionice", "idle", "a"])
+    self.assertTrue(args.environment.ionice == ("idle", 0))
+    for value in ["foo", "idle:1", "realtime:8"]:
+      self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                        ["--ionice", value, "a"])
+
+  # Flag: --scheduler
+  def test_parser_scheduler_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.scheduler is None)
+
+  def test_parser_scheduler(self):
+    args = ArgumentParser().parse_args(["--scheduler", "batch", "a"])
+    self.assertTrue(args.environment.scheduler == ("batch", 0))
+    args = ArgumentParser().parse_args(["--scheduler", "fifo:10", "a"])
+    self.assertTrue(args.environment.scheduler == ("fifo", 10))
+    for value in ["foo", "batch:1", "rr:x"]:
+      self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                        ["--scheduler", value, "a"])
+
+  # Flag: --no-aslr
+  def test_parser_aslr_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.aslr)
+
+  def test_parser_aslr(self):
+    args = ArgumentParser().parse_args(["--no-aslr", "a"])
+    self.assertFalse(args.aslr)
+    self.assertFalse(args.environment.aslr)
+
+  # Flag: --env-size
+  def test_parser_env_size_default(self):
+    args = ArgumentParser().parse_args(["a"])
+    self.assertTrue(args.env_size is None)
+
+  def test_parser_env_size(self):
+    args = ArgumentParser().parse_args(["--env-size", "1000000", "a"])
+    self.assertTrue(args.environment.env_size == 1000000)
+    self.assertRaises(ArgumentParserException, ArgumentParser().parse_args,
+                      ["--env-size", "1", "a"])
 
 
 if __name__ == '__main__':
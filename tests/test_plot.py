@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+
+from srtime.stats import Accumulator
+
+from srtime.plot import *
+
+
+class TestPlot(TestCase):
+
+  def setUp(self):
+    self._dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self._dir)
+
+  def test_decimated(self):
+    decimated = Decimated(list(range(100)), buckets=10)
+    self.assertTrue(len(decimated.x) == 10)
+    self.assertTrue(list(decimated.min) == list(range(0, 100, 10)))
+    self.assertTrue(list(decimated.max) == list(range(9, 100, 10)))
+    self.assertTrue(list(decimated.mean) == [x + 4.5
+                                             for x in range(0, 100, 10)])
+    self.assertTrue(all(decimated.lower < decimated.upper))
+
+  def test_decimated_short(self):
+    # There are no more buckets than samples:
+    decimated = Decimated([1, 2, 3], buckets=10)
+    self.assertTrue(list(decimated.x) == [1, 2, 3])
+    self.assertTrue(list(decimated.mean) == [1, 2, 3])
+
+  def test_histogram(self):
+    counts, edges = histogram([0, 1, 1, 2, 2, 2], 0, 2, bins=3)
+    self.assertTrue(list(counts) == [1, 2, 3])
+    self.assertTrue(len(edges) == 4)
+    counts, _ = histogram([1, 1], 1, 1, bins=3)
+    self.assertTrue(sum(counts) == 2)
+
+  def test_kde(self):
+    l = [x / 100 for x in range(1000)]
+    counts, edges = histogram(l, 0, 10)
+    acc = Accumulator(l)
+    density = kde(counts, edges, acc.stdev(), acc.n)
+    # The density integrates to about 1:
+    self.assertTrue(abs(sum(density) * (edges[1] - edges[0]) - 1) < 0.1)
+
+  def test_iteration_means(self):
+    self.assertTrue(iteration_means([1, 3, 5, 2, 4], [2, 1, 2]) ==
+                    [2, 5, 3])
+
+  def test_plot(self):
+    l = [1, 2, 3, 2, 1, 2]
+    for ext in FORMATS:
+      path = os.path.join(self._dir, "graph." + ext)
+      plot([("a", l, [2, 2, 2], Accumulator(l)),
+            ("b", l, [1] * 6, Accumulator(l))], path=path)
+      self.assertTrue(os.path.getsize(path) > 0)
+
+  def test_plot_unordered(self):
+    l = [1, 2, 3, 2, 1, 2]
+    path = os.path.join(self._dir, "graph.svg")
+    # Each panel is a group of the svg:
+    for ordered, panels in [(True, 2), (False, 1)]:
+      plot([("a", l, None, Accumulator(l))], path=path, ordered=ordered)
+      with open(path) as f:
+        self.assertTrue(f.read().count('id="axes_') == panels)
+
+  def test_plot_empty(self):
+    self.assertRaises(ValueError, plot, [("a", [], [], Accumulator())],
+                      os.path.join(self._dir, "graph.png"))
+
+
+if __name__ == '__main__':
+  main()
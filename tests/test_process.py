@@ -1,6 +1,17 @@
+from time import sleep
 from unittest import TestCase, main
 
-from srtime.process import Process
+from srtime.parser import ArgumentParser
+from srtime.process import ExtractProcess, Process
+
+
+# A filter which takes a long time to extract metrics from the output.
+class SlowFilter:
+  metrics = ["ms"]
+
+  def extract(self, output):
+    sleep(0.5)
+    return {"ms": [1]}
 
 
 class TestProcess(TestCase):
@@ -10,6 +21,16 @@ class TestProcess(TestCase):
     self.assertTrue(isinstance(times, list))
     self.assertTrue(len(times) == 0)
 
+  def test_extract_untimed(self):
+    options = ArgumentParser().parse_args(["-s", "posix_spawn", "true"])
+    options.quiet = True
+    options.extractor = SlowFilter()
+    process = ExtractProcess(options)
+    process.run()
+    self.assertTrue(process.samples() == {"ms": [1]})
+    # The time excludes the extraction:
+    self.assertTrue(process.times()[0] < 0.5)
+
 
 if __name__ == '__main__':
   main()
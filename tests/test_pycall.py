@@ -0,0 +1,72 @@
+import gc
+import os
+from unittest import TestCase, main
+
+from srtime.exceptions import *
+from srtime.process import METRICS
+
+from srtime.pycall import *
+
+
+# Whether the garbage collector was enabled on each call of
+# record_gc():
+GC_STATES = []
+
+
+def record_gc():
+  GC_STATES.append(gc.isenabled())
+
+
+def fail():
+  raise RuntimeError("fail")
+
+
+class TestPycall(TestCase):
+
+  def setUp(self):
+    del GC_STATES[:]
+
+  def test_load(self):
+    self.assertTrue(load("os.path:join") is os.path.join)
+    self.assertTrue(load("os:path.join") is os.path.join)
+
+  def test_load_invalid(self):
+    for spec in ["os", "os:", ":join", "nosuchmodule:f", "os:nosuchfunc",
+                 "os:sep"]:
+      self.assertRaises(InvalidParameterException, load, spec)
+
+  def test_target_sample(self):
+    target = Target("tests.test_pycall:record_gc")
+    elapsed, usage = target.sample()
+    self.assertTrue(elapsed > 0)
+    self.assertTrue(sorted(usage) == sorted(METRICS[1:]))
+    # The inner loop is calibrated once:
+    self.assertTrue(target.number >= 1)
+    self.assertTrue(len(GC_STATES) > target.number)
+
+  def test_target_gc(self):
+    Target("tests.test_pycall:record_gc").sample()
+    self.assertTrue(GC_STATES and not any(GC_STATES))
+    del GC_STATES[:]
+    Target("tests.test_pycall:record_gc", gc=True).sample()
+    self.assertTrue(GC_STATES and all(GC_STATES))
+
+  def test_target_setup(self):
+    Target("tests.test_pycall:record_gc", setup="GC_STATES.append(None)")
+    self.assertTrue(GC_STATES == [None])
+
+  def test_target_isolate(self):
+    target = Target("tests.test_pycall:record_gc", isolate=True)
+    elapsed, usage = target.sample()
+    self.assertTrue(elapsed > 0)
+    self.assertTrue(target.number >= 1)
+    # The calls are made by the children:
+    self.assertTrue(GC_STATES == [])
+
+  def test_target_isolate_exception(self):
+    target = Target("tests.test_pycall:fail", isolate=True)
+    self.assertRaises(ProcessException, target.sample)
+
+
+if __name__ == '__main__':
+  main()
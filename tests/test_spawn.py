@@ -0,0 +1,112 @@
+from time import monotonic
+from unittest import TestCase, main
+
+from srtime.exceptions import *
+
+from srtime.spawn import *
+
+
+class TestSpawn(TestCase):
+
+  def _test_spawn_output(self, backend):
+    lines = []
+    status, usage = spawn("echo foo bar", backend=backend,
+                          hook=lines.append, quiet=True)
+    self.assertTrue(status == 0)
+    self.assertTrue(sorted(usage) == sorted(name for name, _ in USAGE))
+    self.assertTrue(lines == ["foo bar"])
+
+  def _test_spawn_status(self, backend):
+    self.assertTrue(spawn("true", backend=backend, quiet=True)[0] == 0)
+    self.assertTrue(spawn("false", backend=backend, quiet=True)[0] == 1)
+
+  def test_spawn_pty(self):
+    self._test_spawn_output("pty")
+    self._test_spawn_status("pty")
+
+  def test_spawn_pipe(self):
+    self._test_spawn_output("pipe")
+    self._test_spawn_status("pipe")
+
+  def test_spawn_posix_spawn(self):
+    self._test_spawn_output("posix_spawn")
+    self._test_spawn_status("posix_spawn")
+
+  def test_spawn_pipe_lines(self):
+    lines = []
+    spawn("seq 1 1000", backend="pipe", hook=lines.append, quiet=True)
+    self.assertTrue(lines == [str(i) for i in range(1, 1001)])
+
+  def test_spawn_raw(self):
+    for backend in BACKENDS:
+      outputs = []
+      spawn("printf 'a\\nb\\n'", backend=backend, hook=outputs.append,
+            quiet=True, raw=True)
+      self.assertTrue(len(outputs) == 1)
+      self.assertTrue(outputs[0].split() == [b"a", b"b"])
+
+  def test_spawn_exit_hook(self):
+    for backend in BACKENDS:
+      events = []
+      spawn("echo a", backend=backend, quiet=True,
+            hook=lambda output: events.append("output"), raw=True,
+            exit_hook=lambda: events.append("exit"))
+      self.assertTrue(events == ["exit", "output"])
+
+  def test_spawn_pty_exit_time(self):
+    # The clock is stopped before the pty is closed, which sleeps for
+    # 0.1 s:
+    times = []
+    for _ in range(3):
+      start = monotonic()
+      spawn("true", backend="pty", quiet=True,
+            exit_hook=lambda: times.append(monotonic() - start))
+    self.assertTrue(min(times) < 0.05)
+
+  def test_spawn_timeout(self):
+    for backend in BACKENDS:
+      start = monotonic()
+      self.assertRaises(TimeoutException, spawn, "sleep 5", backend=backend,
+                        quiet=True, timeout=0.1)
+      self.assertTrue(monotonic() - start < 2)
+
+  def test_spawn_timeout_output(self):
+    lines = []
+    self.assertRaises(TimeoutException, spawn, "sh -c 'echo a; sleep 5'",
+                      backend="posix_spawn", hook=lines.append, quiet=True,
+                      timeout=0.1)
+    self.assertTrue(lines == [])
+
+  def test_spawn_timeout_kill(self):
+    # A process which ignores SIGTERM is killed after the grace period:
+    start = monotonic()
+    self.assertRaises(TimeoutException, spawn,
+                      "sh -c 'trap \"\" TERM; sleep 5'",
+                      backend="pipe", quiet=True, timeout=0.1)
+    self.assertTrue(KILL_GRACE <= monotonic() - start < KILL_GRACE + 2)
+
+  def test_spawn_within_timeout(self):
+    status, _ = spawn("true", backend="posix_spawn", quiet=True, timeout=5)
+    self.assertTrue(status == 0)
+
+  def test_spawn_usage(self):
+    _, usage = spawn("python -c 'x = bytearray(64 << 20)'",
+                     backend="posix_spawn", quiet=True)
+    # At least 64 MB:
+    self.assertTrue(usage["maxrss"] >= 64 << 10)
+    self.assertTrue(usage["minflt"] > 0)
+
+  def test_spawn_pipe_not_found(self):
+    self.assertTrue(spawn("/no/such/file", backend="pipe",
+                          quiet=True)[0] == 127)
+
+  def test_spawn_posix_spawn_not_found(self):
+    self.assertRaises(OSError, spawn, "/no/such/file",
+                      backend="posix_spawn", quiet=True)
+
+  def test_spawn_invalid_backend(self):
+    self.assertRaises(ValueError, spawn, "true", backend="foo")
+
+
+if __name__ == '__main__':
+  main()
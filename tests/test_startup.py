@@ -0,0 +1,41 @@
+import subprocess
+import sys
+from unittest import TestCase, main
+
+
+# Modules which are slow to import, and must only be imported when
+# they are actually used:
+HEAVY_MODULES = ["matplotlib", "numpy", "pexpect", "scipy", "dataclasses",
+                 "typing", "inspect", "hashlib", "json", "srtime.baseline",
+                 "srtime.config", "srtime.suite"]
+
+# Run srtime in a fresh interpreter, then print the heavy modules
+# which were imported.
+SCRIPT = """
+import sys
+import srtime
+srtime.main({args!r})
+print(",".join(m for m in {modules!r} if m in sys.modules))
+"""
+
+
+class TestStartup(TestCase):
+
+  def _imported_modules(self, args):
+    script = SCRIPT.format(args=args, modules=HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, "-c", script],
+                                     stderr=subprocess.DEVNULL)
+    return output.decode().strip().split("\n")[-1]
+
+  def test_startup_imports(self):
+    args = ["-s", "posix_spawn", "-m", "2", "-t", "0", "true"]
+    self.assertTrue(self._imported_modules(args) == "")
+
+  def test_startup_imports_txt(self):
+    args = ["-s", "pipe", "-m", "2", "-t", "0", "-f", "txt", "-M", "all",
+            "true"]
+    self.assertTrue(self._imported_modules(args) == "")
+
+
+if __name__ == '__main__':
+  main()
@@ -1,3 +1,5 @@
+import builtins
+from bisect import bisect_left
 from unittest import TestCase, main
 
 from srtime.exceptions import *
@@ -59,6 +61,12 @@ class TestStats(TestCase):
     self.assertTrue(stdev(l) == 1)
 
   # confinterval() tests
+  def _assert_interval(self, actual, expected):
+    # The quantiles are computed in pure Python, so allow for rounding
+    # differences with the reference values:
+    self.assertAlmostEqual(actual[0], expected[0], places=9)
+    self.assertAlmostEqual(actual[1], expected[1], places=9)
+
   def test_confinterval_empty_list(self):
     l = []
     self.assertTrue(confinterval(l) == (0, 0))
@@ -69,18 +77,386 @@ class TestStats(TestCase):
 
   def test_confinterval_123_list(self):
     l = [1, 2, 3]
-    self.assertTrue(confinterval(l) ==
-                    (-0.48413771184375287, 4.4841377118437524))
+    self._assert_interval(confinterval(l),
+                          (-0.48413771184375287, 4.4841377118437524))
+
+  def test_confinterval_identical(self):
+    self.assertTrue(confinterval([2, 2, 2]) == (2, 2))
+    self.assertTrue(confinterval([2] * 50) == (2, 2))
 
   def test_confinterval_c50(self):
     l = [1, 2, 3]
-    self.assertTrue(confinterval(l, c=0.5) ==
-                    (1.528595479208968, 2.4714045207910322))
+    self._assert_interval(confinterval(l, c=0.5),
+                          (1.528595479208968, 2.4714045207910322))
 
   def test_confinterval_t_dist(self):
     l = [1, 2, 3]
-    self.assertTrue(confinterval(l, n=1) ==
-                    (0.86841426592382809, 3.1315857340761717))
+    self._assert_interval(confinterval(l, n=1),
+                          (0.86841426592382809, 3.1315857340761717))
+
+  # diffinterval() tests
+  def test_diffinterval_small(self):
+    self.assertTrue(diffinterval(Accumulator([1]), Accumulator([1, 2])) ==
+                    (0, 0))
+
+  def test_diffinterval_equal_variance(self):
+    a = Accumulator([11, 12, 13, 14, 15])
+    b = Accumulator([1, 2, 3, 4, 5])
+    c1, c2 = diffinterval(a, b)
+    self.assertAlmostEqual((c1 + c2) / 2, 10)
+    self.assertTrue(c1 > 0)
+    # Wider than the interval of "a" alone:
+    d1, d2 = a.confinterval()
+    self.assertTrue(c2 - c1 > d2 - d1)
+
+  def test_diffinterval_zero_variance(self):
+    c1, c2 = diffinterval(Accumulator([3, 3]), Accumulator([1, 1]))
+    self.assertTrue(c1 == 2 and c2 == 2)
+
+  # ratiointerval() tests
+  def test_ratiointerval_small(self):
+    self.assertTrue(ratiointerval(Accumulator([1]), Accumulator([1, 2])) ==
+                    (None, None, None))
+
+  def test_ratiointerval_zero_mean(self):
+    self.assertTrue(ratiointerval(Accumulator([1, 2]), Accumulator([0, 0])) ==
+                    (None, None, None))
+
+  def test_ratiointerval(self):
+    r, c1, c2 = ratiointerval(Accumulator([19, 20, 21]),
+                              Accumulator([9, 10, 11]))
+    self.assertAlmostEqual(r, 2)
+    self.assertTrue(c1 < 2 < c2)
+
+  def test_ratiointerval_identical(self):
+    self.assertTrue(ratiointerval(Accumulator([2, 2]), Accumulator([1, 1])) ==
+                    (2, 2, 2))
+
+  # welch() tests
+  def test_welch_small(self):
+    self.assertTrue(welch(Accumulator([1]), Accumulator([1, 2])) is None)
+
+  def test_welch_same(self):
+    self.assertAlmostEqual(welch(Accumulator([1, 2, 3]),
+                                 Accumulator([1, 2, 3])), 1)
+
+  def test_welch_differ(self):
+    p = welch(Accumulator([1, 2, 3, 4, 5]), Accumulator([11, 12, 13, 14, 15]))
+    self.assertTrue(p < 0.001)
+
+  def test_welch_zero_variance(self):
+    self.assertTrue(welch(Accumulator([1, 1]), Accumulator([1, 1])) == 1)
+    self.assertTrue(welch(Accumulator([1, 1]), Accumulator([2, 2])) == 0)
+
+  # ranktest() tests
+  def test_ranktest_empty(self):
+    self.assertTrue(ranktest([], [1, 2]) is None)
+
+  def test_ranktest_differ(self):
+    self.assertTrue(ranktest([1, 2, 3, 4, 5], [11, 12, 13, 14, 15]) < 0.05)
+
+  # grouptest() tests
+  def test_grouptest_one_group(self):
+    self.assertTrue(grouptest([[1, 2, 3]]) is None)
+    self.assertTrue(grouptest([[1, 2, 3], []]) is None)
+
+  def test_grouptest_same(self):
+    self.assertTrue(grouptest([[1, 2, 3, 4], [1, 2, 3, 4]]) > 0.5)
+
+  def test_grouptest_differ(self):
+    self.assertTrue(grouptest([[1, 2, 3, 4, 5], [11, 12, 13, 14, 15]]) < 0.05)
+
+  # Accumulator() tests
+  def test_accumulator_empty(self):
+    a = Accumulator()
+    self.assertTrue(a.n == 0)
+    self.assertTrue(a.mean == 0)
+    self.assertTrue(a.variance() == 0)
+    self.assertTrue(a.range() == 0)
+    self.assertTrue(a.confinterval() == (0, 0))
+
+  def test_accumulator_push(self):
+    a = Accumulator()
+    for x in [1, 2, 3]:
+      a.push(x)
+    self.assertTrue(a.n == 3)
+    self.assertTrue(a.mean == 2)
+    self.assertTrue(a.variance() == 1)
+    self.assertTrue(a.stdev() == 1)
+    self.assertTrue(a.min == 1)
+    self.assertTrue(a.max == 3)
+    self.assertTrue(a.range() == 2)
+
+  def test_accumulator_list(self):
+    l = [4, 8, 15, 16, 23, 42]
+    a = Accumulator(l)
+    self.assertTrue(a.mean == mean(l))
+    self.assertTrue(a.variance() == variance(l))
+    self.assertTrue(a.confinterval() == confinterval(l))
+
+  def test_accumulator_push_matches_list(self):
+    l = [0.1 * x ** 1.5 for x in builtins.range(1, 500)]
+    a = Accumulator()
+    for x in l:
+      a.push(x)
+    self.assertAlmostEqual(a.mean, mean(l))
+    self.assertAlmostEqual(a.variance(), variance(l))
+
+  def test_accumulator_merge(self):
+    l1 = [4, 8, 15]
+    l2 = [16, 23, 42, 108]
+    a = Accumulator(l1).merge(Accumulator(l2))
+    self.assertTrue(a.n == 7)
+    self.assertAlmostEqual(a.mean, mean(l1 + l2))
+    self.assertAlmostEqual(a.variance(), variance(l1 + l2))
+    self.assertTrue(a.min == 4)
+    self.assertTrue(a.max == 108)
+
+  def test_accumulator_merge_empty(self):
+    a = Accumulator([1, 2, 3]).merge(Accumulator())
+    self.assertTrue(a.n == 3)
+    a = Accumulator().merge(Accumulator([1, 2, 3]))
+    self.assertTrue(a.n == 3)
+    self.assertTrue(a.variance() == 1)
+
+  def test_accumulator_precision(self):
+    a = Accumulator([1, 2, 3])
+    c1, c2 = confinterval([1, 2, 3])
+    self.assertAlmostEqual(a.precision(), (c2 - c1) / 4)
+
+  def test_accumulator_precision_undefined(self):
+    self.assertTrue(Accumulator().precision() is None)
+    self.assertTrue(Accumulator([1]).precision() is None)
+    self.assertTrue(Accumulator([0, 0]).precision() is None)
+
+  # fences() and classify() tests
+  def test_fences_tukey(self):
+    bounds = fences([1, 2, 3, 4, 5])
+    self.assertTrue(bounds == [(-1, 7), (-4, 10)])
+    self.assertTrue([classify(x, bounds) for x in [3, 8, 11]] == [0, 1, 2])
+
+  def test_fences_mad(self):
+    bounds = fences([1, 2, 3, 4, 5], "mad")
+    self.assertAlmostEqual(bounds[0][1], 3 + 3 * 1.4826)
+    self.assertAlmostEqual(bounds[1][0], 3 - 5 * 1.4826)
+
+  # P2Quantile() tests
+  def test_p2_quantile_empty(self):
+    self.assertTrue(P2Quantile(0.5).value() is None)
+
+  def test_p2_quantile_exact(self):
+    q = P2Quantile(0.5)
+    for x in [5, 1, 3]:
+      q.push(x)
+    self.assertTrue(q.value() == 3)
+
+  def test_p2_quantile_estimate(self):
+    import random
+    rng = random.Random(1)
+    l = [rng.gauss(0, 1) for _ in builtins.range(10000)]
+    for p in [0.25, 0.5, 0.9]:
+      q = P2Quantile(p)
+      for x in l:
+        q.push(x)
+      self.assertAlmostEqual(q.value(), percentiles(l, [p])[0], places=1)
+
+  # rankinterval() tests
+  def test_rankinterval(self):
+    lo, hi = rankinterval(100, 0.5)
+    self.assertAlmostEqual(lo, 0.5 - 1.96 * 0.05, places=3)
+    self.assertAlmostEqual(hi, 0.5 + 1.96 * 0.05, places=3)
+    self.assertTrue(rankinterval(10, 0.99)[1] == 1)
+
+  # KLL() tests
+  def test_kll_empty(self):
+    self.assertRaises(ValueError, KLL().quantile, 0.5)
+
+  def test_kll_exact(self):
+    # A sketch which is not full is exact:
+    sketch = KLL()
+    sketch.extend([5, 1, 3, 2, 4])
+    self.assertTrue(sketch.quantiles([0, 0.5, 1]) == [1, 3, 5])
+
+  def _test_kll_accuracy(self, sketch, l):
+    s = sorted(l)
+    for q in [0.01, 0.1, 0.5, 0.9, 0.99]:
+      rank = bisect_left(s, sketch.quantile(q)) / len(s)
+      self.assertTrue(abs(rank - q) < 0.02)
+
+  def test_kll_estimate(self):
+    import random
+    rng = random.Random(1)
+    l = [rng.gauss(0, 1) for _ in builtins.range(100000)]
+    sketch = KLL(200, rng=random.Random(1))
+    for x in l:
+      sketch.push(x)
+    self.assertTrue(sketch.n == len(l))
+    self.assertTrue(sketch.min == min(l))
+    self.assertTrue(sketch.max == max(l))
+    # The memory used is bounded by the size of the sketch:
+    self.assertTrue(sketch.size() < 1000)
+    self._test_kll_accuracy(sketch, l)
+
+  def test_kll_merge(self):
+    import random
+    rng = random.Random(1)
+    l = [rng.expovariate(1) for _ in builtins.range(100000)]
+    a, b = KLL(rng=random.Random(1)), KLL(rng=random.Random(2))
+    a.extend(l[:30000])
+    b.extend(l[30000:])
+    a.merge(b)
+    self.assertTrue(a.n == len(l))
+    self.assertTrue(a.size() < 1000)
+    self._test_kll_accuracy(a, l)
+
+  def test_kll_censored(self):
+    sketch = KLL()
+    sketch.extend([1, 2, 3, 4])
+    self.assertTrue(sketch.quantiles([0.5, 0.9], censored=4) ==
+                    percentiles([1, 2, 3, 4] + [float("inf")] * 4,
+                                [0.5, 0.9]))
+
+  # Reservoir() tests
+  def test_reservoir_short(self):
+    reservoir = Reservoir(10)
+    reservoir.extend([1, 2, 3])
+    self.assertTrue(reservoir.samples == [1, 2, 3])
+    reservoir = Reservoir(0)
+    reservoir.extend([1, 2, 3])
+    self.assertTrue(reservoir.n == 3)
+    self.assertTrue(reservoir.samples == [])
+
+  def test_reservoir_uniform(self):
+    import random
+    reservoir = Reservoir(1000, rng=random.Random(1))
+    reservoir.extend(builtins.range(100000))
+    self.assertTrue(reservoir.n == 100000)
+    self.assertTrue(len(reservoir.samples) == 1000)
+    self.assertTrue(len(set(reservoir.samples)) == 1000)
+    # The sample is spread across the stream:
+    self.assertAlmostEqual(mean(reservoir.samples) / 100000, 0.5, places=1)
+    self.assertTrue(sum(x >= 90000 for x in reservoir.samples) > 50)
+
+  # OutlierDetector() tests
+  def test_outlier_detector(self):
+    d = OutlierDetector()
+    l = [10, 11, 10, 12, 11, 10, 11, 100, 12, 10, 13]
+    classes = [d.push(x) for x in l]
+    self.assertTrue(classes[7] == 2)
+    self.assertTrue(d.severe == 1)
+    self.assertTrue(d.robust.n + d.mild + d.severe == len(l))
+    self.assertTrue(d.robust.max < 100)
+
+  def test_outlier_detector_mad(self):
+    d = OutlierDetector("mad")
+    for x in [10.1, 11.3, 10.4, 12.0, 11.1, 10.7, 11.5, 100]:
+      d.push(x)
+    self.assertTrue(d.severe == 1)
+
+  # SteadyState() tests
+  def test_steady_state_constant(self):
+    d = SteadyState(window=5)
+    for i in builtins.range(9):
+      d.push(1 + (i % 2) * 0.1)
+      self.assertFalse(d.steady)
+    d.push(1.1)
+    self.assertTrue(d.steady)
+    self.assertTrue(d.warmup == 0)
+
+  def test_steady_state_warmup(self):
+    d = SteadyState(window=5)
+    # Slow, decaying warmup followed by noisy steady state:
+    l = [10, 8, 6, 4, 3, 2] + [1 + (i % 3) * 0.1 for i in builtins.range(30)]
+    for x in l:
+      d.push(x)
+    self.assertTrue(d.steady)
+    self.assertTrue(d.warmup >= 4)
+    self.assertTrue(d.warmup <= 8)
+
+  def test_steady_state_stops(self):
+    d = SteadyState(window=2)
+    for x in [1, 1, 1, 1, 100, 100]:
+      d.push(x)
+    self.assertTrue(d.n == 4)
+
+  # percentiles() tests
+  def test_percentiles_empty_list(self):
+    self.assertTrue(percentiles([], [0.5, 0.9]) == [0, 0])
+
+  def test_percentiles_single_item_list(self):
+    self.assertTrue(percentiles([3], [0, 0.5, 1]) == [3, 3, 3])
+
+  def test_percentiles_interpolate(self):
+    l = [4, 1, 3, 2, 5]
+    self.assertTrue(percentiles(l, [0, 0.5, 1]) == [1, 3, 5])
+    self.assertAlmostEqual(percentiles(l, [0.9])[0], 4.6)
+
+  # median() tests
+  def test_median_odd_list(self):
+    self.assertTrue(median([3, 1, 2]) == 2)
+
+  def test_median_even_list(self):
+    self.assertTrue(median([4, 1, 3, 2]) == 2.5)
+
+  # bootstrap() tests
+  def _rng(self):
+    import numpy as np
+    return np.random.default_rng(0)
+
+  def test_bootstrap_single_item_list(self):
+    self.assertTrue(bootstrap([3]) == (3, 3))
+
+  def test_bootstrap_identical(self):
+    self.assertTrue(bootstrap([2] * 10, rng=self._rng()) == (2, 2))
+
+  def test_bootstrap_mean(self):
+    import numpy as np
+    l = np.random.default_rng(1).normal(10, 1, 1000)
+    c1, c2 = confinterval(list(l))
+    for method in BOOTSTRAP_METHODS:
+      b1, b2 = bootstrap(l, "mean", method=method, resamples=2000,
+                         rng=self._rng())
+      # For normal samples, close to the parametric interval:
+      self.assertAlmostEqual(b1, c1, places=1)
+      self.assertAlmostEqual(b2, c2, places=1)
+
+  def test_bootstrap_median(self):
+    import numpy as np
+    l = np.random.default_rng(1).lognormal(0, 1, 500)
+    for method in BOOTSTRAP_METHODS:
+      c1, c2 = bootstrap(l, "median", method=method, resamples=2000,
+                         rng=self._rng())
+      self.assertTrue(c1 < np.median(l) < c2)
+      self.assertTrue(c1 < 1 < c2)
+
+  def test_bootstrap_median_order_statistic(self):
+    import numpy as np
+    rng = np.random.default_rng(2)
+    # The medians drawn as order statistics are distributed as the
+    # medians of resamples, for odd and even sizes:
+    for n in [10, 11]:
+      l = np.sort(rng.lognormal(0, 1, n))
+      resamples = np.median(l[rng.integers(0, n, size=(20000, n))], axis=1)
+      c1, c2 = bootstrap(l, "median", 0.9, "percentile", 20000,
+                         self._rng())
+      lo = np.quantile(resamples, [0.04, 0.06])
+      hi = np.quantile(resamples, [0.94, 0.96])
+      self.assertTrue(lo[0] <= c1 <= lo[1] and hi[0] <= c2 <= hi[1])
+
+  def test_bootstrap_skewed(self):
+    import numpy as np
+    l = np.random.default_rng(1).lognormal(0, 1, 200)
+    c1, c2 = bootstrap(l, "mean", resamples=2000, rng=self._rng())
+    # The interval is skewed to the right:
+    self.assertTrue(c2 - l.mean() > l.mean() - c1)
+
+  def test_jackknife_median(self):
+    import numpy as np
+    from srtime.stats import _jackknife
+    for n in [5, 6]:
+      x = np.random.default_rng(n).normal(size=n)
+      expected = [np.median(np.delete(x, i)) for i in builtins.range(n)]
+      self.assertTrue(np.allclose(_jackknife(x, "median"), expected))
 
   # Stats() tests
   def _test_stats(self, l, confidence, threshold):
@@ -115,6 +491,208 @@ class TestStats(TestCase):
   def test_stats_threshold(self):
     self._test_stats([1, 2, 3], 0.5, 1)
 
+  def test_stats_accumulator(self):
+    l = [1, 2, 3, 4]
+    a = Stats(Accumulator(l))
+    s = Stats(l)
+    self.assertTrue(a.mean == s.mean)
+    self.assertTrue(a.variance == s.variance)
+    self.assertTrue(a.n == s.n)
+    self.assertTrue(a.format() == s.format())
+
+  def test_stats_cores(self):
+    s = Stats([1, 2, 3, 4, 5, 11, 12, 13, 14, 15],
+              cores={0: [1, 2, 3, 4, 5], 1: [11, 12, 13, 14, 15]})
+    self.assertTrue(s.cores_p < 0.05)
+    self.assertTrue("per-core distributions differ" in s.format())
+    self.assertTrue("cores_p" in s.format(fmt="txt"))
+
+  def test_stats_overhead(self):
+    s = Stats([11, 12, 13, 14, 15], overhead=Accumulator([1, 2, 3, 4, 5]))
+    self.assertAlmostEqual(s.mean, 10)
+    self.assertTrue(s.overhead == 3)
+    self.assertTrue(s.c1 < 10 < s.c2)
+
+  def test_stats_overhead_bounds(self):
+    s = Stats([11, 12, 13, 14, 15], overhead=Accumulator([1, 2, 3, 4, 5]),
+              warmup=Accumulator([20, 30]))
+    self.assertTrue(s.min <= s.median <= s.max)
+    self.assertTrue(s.min <= s.mean <= s.max)
+    self.assertTrue((s.min, s.median, s.max) == (8, 10, 12))
+    self.assertTrue((s.warmup_min, s.warmup_mean, s.warmup_max) ==
+                    (17, 22, 27))
+
+  def test_stats_name(self):
+    s = Stats([1, 2, 3], name="maxrss")
+    self.assertTrue(s.name == "maxrss")
+    self.assertTrue(s.format().startswith(
+        "95% confidence values of maxrss from 3 iterations:"))
+    self.assertTrue(s.format(fmt="txt").startswith("name: maxrss\n"))
+    self.assertTrue(s.format(fmt="csv").startswith('"name","maxrss"\n'))
+
+  def test_stats_name_quoted(self):
+    s = Stats([1, 2, 3], name='echo "a,b"')
+    self.assertTrue(s.format(fmt="csv").startswith(
+        '"name","echo ""a,b"""\n"mean",2'))
+    self.assertTrue(s.format(fmt="tsv").startswith(
+        'name\t"echo ""a,b"""\nmean\t2'))
+
+  def test_stats_warmup(self):
+    s = Stats([1, 2, 3], warmup=Accumulator([10, 20]))
+    self.assertTrue(s.mean == 2)
+    self.assertTrue(s.warmup_n == 2)
+    self.assertTrue(s.warmup_mean == 15)
+    self.assertTrue("Excluded 2 warmup samples with mean 15" in s.format())
+    self.assertTrue("warmup_n: 2" in s.format(fmt="txt"))
+
+  def test_stats_empty_accumulator(self):
+    self.assertRaises(ValueError, Stats, Accumulator())
+
+  def test_stats_percentiles(self):
+    s = Stats(list(builtins.range(1, 1002)))
+    self.assertTrue(s.median == 501)
+    self.assertTrue(s.p90 == 901)
+    self.assertTrue(s.p99 == 991)
+    self.assertTrue(s.p999 == 1000)
+    self.assertTrue("p99: 991" in s.format(fmt="txt"))
+    self.assertTrue('"median",501' in s.format(fmt="csv"))
+
+  def test_stats_accumulator_without_samples(self):
+    s = Stats(Accumulator([1, 2, 3]))
+    self.assertFalse(hasattr(s, "median"))
+    s = Stats(Accumulator([1, 2, 3]), samples=[1, 2, 3])
+    self.assertTrue(s.median == 2)
+
+  def test_stats_sketch(self):
+    l = list(builtins.range(1, 1002))
+    sketch = KLL()
+    sketch.extend(l)
+    s = Stats(Accumulator(l), sketch=sketch)
+    self.assertTrue(s.n == 1001)
+    self.assertTrue(abs(s.median - 501) <= 10)
+    self.assertTrue(abs(s.p90 - 901) <= 10)
+    self.assertTrue(s.median_c1 < s.median < s.median_c2)
+    self.assertTrue("median_c1" in s.format(fmt="tsv"))
+
+  def test_stats_bootstrap(self):
+    l = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 50]
+    s = Stats(l, ci_method="bootstrap", resamples=1000)
+    self.assertTrue(s.c1 < s.mean < s.c2)
+    self.assertTrue(s.median_c1 <= s.median <= s.median_c2)
+    self.assertTrue("median_c1" in s.format(fmt="tsv"))
+
+  def test_stats_outliers_flag(self):
+    l = [10, 11, 10, 12, 11, 10, 11, 100, 12, 10, 13, 11]
+    s = Stats(l, outliers="flag")
+    self.assertTrue(s.n == 12)
+    self.assertTrue(s.outliers_mild == 0)
+    self.assertTrue(s.outliers_severe == 1)
+    self.assertTrue(s.robust_n == 11)
+    self.assertTrue(s.robust_mean < s.mean)
+    self.assertTrue("Found 1 outliers (0 mild, 1 severe)" in s.format())
+    self.assertTrue("robust_mean" in s.format(fmt="txt"))
+
+  def test_stats_outliers_reject(self):
+    l = [10, 11, 10, 12, 11, 10, 11, 100, 12, 10, 13, 11]
+    s = Stats(l, outliers="reject")
+    self.assertTrue(s.n == 11)
+    self.assertTrue(s.max == 13)
+    self.assertTrue(s.all_n == 12)
+    self.assertTrue(s.all_variance > s.variance)
+    self.assertTrue("Rejected 1 outliers" in s.format())
+
+  def test_stats_outliers_requires_samples(self):
+    self.assertRaises(ValueError, Stats, Accumulator([1, 2, 3]),
+                      outliers="flag")
+
+  def test_stats_timeouts(self):
+    s = Stats([1, 2, 3], timeouts=2)
+    self.assertTrue(s.n == 3)
+    self.assertTrue(s.mean == 2)
+    self.assertTrue(s.timeouts == 2)
+    self.assertTrue(s.median == 3)
+    self.assertTrue(s.p90 == float("inf"))
+    self.assertTrue("2 iterations timed out" in s.format())
+    self.assertTrue("timeouts: 2" in s.format(fmt="txt"))
+
+  def test_stats_all_timeouts(self):
+    s = Stats([], timeouts=2)
+    self.assertTrue(s.n == 0)
+    self.assertTrue(s.timeouts == 2)
+    self.assertTrue(s.mean is None and s.c1 is None and s.c2 is None)
+    self.assertTrue(s.median == float("inf"))
+    self.assertTrue(s.confidence == 0.95)
+    self.assertTrue("All 2 iterations timed out" in s.format())
+    self.assertTrue("mean: None" in s.format(fmt="txt"))
+    self.assertRaises(ValueError, Stats, [], timeouts=0)
+
+  def test_stats_bootstrap_overhead(self):
+    self.assertRaises(ValueError, Stats, [1, 2, 3], ci_method="bootstrap",
+                      overhead=Accumulator([1, 2]))
+
+  def test_stats_bootstrap_requires_samples(self):
+    self.assertRaises(ValueError, Stats, Accumulator([1, 2, 3]),
+                      ci_method="bootstrap")
+
+  def test_stats_items(self):
+    s = Stats([1, 2, 3])
+    self.assertTrue(s.items()[0] == ("mean", 2))
+    self.assertTrue([prop for prop, _ in s.items()][:len(ATTRIBUTES)] ==
+                    ATTRIBUTES)
+
+  # format_table() tests
+  def test_format_table_csv(self):
+    rows = [[("x", "1"), ("mean", 1.2345)],
+            [("x", "2"), ("mean", 2), ("warmup_n", 3)]]
+    self.assertTrue(format_table(rows, "csv", 2) ==
+                    '"x","mean","warmup_n"\n"1",1.23,""\n"2",2,3\n')
+
+  def test_format_table_csv_quoting(self):
+    rows = [[("command", 'grep -c "a,b" x'), ("mean", 1)]]
+    self.assertTrue(format_table(rows, "csv", 2) ==
+                    '"command","mean"\n"grep -c ""a,b"" x",1\n')
+
+  def test_format_table_tsv(self):
+    rows = [[("x", "1"), ("mean", None)]]
+    self.assertTrue(format_table(rows, "tsv", 2) == "x\tmean\n1\t\n")
+    rows = [[("x", "a\tb"), ("mean", 1)]]
+    self.assertTrue(format_table(rows, "tsv", 2) == 'x\tmean\n"a\tb"\t1\n')
+
+  def test_format_table_txt(self):
+    rows = [[("name", "a"), ("mean", 1.2345)],
+            [("name", "bcd"), ("mean", 10)]]
+    self.assertTrue(format_table(rows, "txt", 2) ==
+                    "name  mean\na     1.23\nbcd   10\n")
+
+  # Comparison() tests
+  def _comparison(self, la, lb, **kwargs):
+    return Comparison(Accumulator(la), Accumulator(lb), la, lb, **kwargs)
+
+  def test_comparison(self):
+    c = self._comparison([19, 20, 21, 20, 19, 21], [9, 10, 11, 10, 9, 11])
+    self.assertAlmostEqual(c.speedup, 2)
+    self.assertTrue(c.c1 < 2 < c.c2)
+    self.assertTrue(c.confidence == 0.95)
+    self.assertTrue(c.significant())
+
+  def test_comparison_not_significant(self):
+    c = self._comparison([1, 2, 3], [1, 2, 3])
+    self.assertFalse(c.significant())
+
+  def test_comparison_empty(self):
+    self.assertRaises(ValueError, self._comparison, [], [1])
+
+  def test_comparison_format(self):
+    c = self._comparison([2, 2], [1, 1], name="b vs a")
+    self.assertTrue(c.format() ==
+                    "b vs a: 95% confidence speedup:\n"
+                    "2.0 2.0 2.0\n"
+                    "Welch's t-test p = 0.0, rank test p = 0.1939: "
+                    "not significant\n")
+    self.assertTrue(c.format(fmt="txt").startswith("name: b vs a\n"
+                                                   "speedup: 2.0\n"))
+    self.assertRaises(InvalidParameterException, c.format, fmt="foobar")
+
   # Stats.format() tests
   def test_stats_format(self):
     output = ("95% confidence values from 3 iterations:\n"
@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+
+from srtime.exceptions import *
+from srtime.stats import *
+from srtime.store import *
+
+
+class TestStore(TestCase):
+
+  def setUp(self):
+    self._dir = tempfile.mkdtemp()
+    self._path = os.path.join(self._dir, "samples.bin")
+
+  def tearDown(self):
+    shutil.rmtree(self._dir)
+
+  def _write(self, samples, resume=False):
+    store = Store(self._path, resume=resume)
+    for sample in samples:
+      store.append(*sample)
+    store.close()
+
+  def test_store_empty(self):
+    self._write([])
+    s = load(self._path)
+    self.assertTrue(len(s) == 0)
+    self.assertTrue(s.metrics == [])
+    self.assertTrue(s.iterations() == 0)
+    self.assertTrue(s.elapsed() == 0)
+    self.assertTrue(len(s.values("time")) == 0)
+
+  def test_store_values(self):
+    self._write([(0.1, 0, "time", 1), (0.1, 0, "maxrss", 100),
+                 (0.2, 1, "time", 2), (0.2, 1, "maxrss", 200),
+                 (0.3, 2, "time", 3), (0.3, 2, "maxrss", 300)])
+    s = load(self._path)
+    self.assertTrue(len(s) == 6)
+    self.assertTrue(s.metrics == ["time", "maxrss"])
+    self.assertTrue(s.values("time").tolist() == [1, 2, 3])
+    self.assertTrue(s.values("maxrss").tolist() == [100, 200, 300])
+    self.assertTrue(s.iterations() == 3)
+    self.assertTrue(s.elapsed() == 0.3)
+
+  def test_store_accumulator(self):
+    self._write([(0, i, "time", x) for i, x in enumerate([1, 2, 3])])
+    a = load(self._path).accumulator("time")
+    self.assertTrue(a.n == 3)
+    self.assertTrue(a.mean == 2)
+    self.assertTrue(a.variance() == 1)
+    self.assertTrue(Stats(a).format() == Stats([1, 2, 3]).format())
+
+  def test_store_by_iteration(self):
+    self._write([(0, 0, "time", 1), (0, 0, "time", 2), (0, 0, "utime", 5),
+                 (0, 1, "time", 3), (0, 1, "utime", 6)])
+    iterations = list(load(self._path).by_iteration())
+    self.assertTrue(iterations == [(0, 0, {"time": [1, 2], "utime": [5]}),
+                                   (1, 0, {"time": [3], "utime": [6]})])
+
+  def test_store_benchmarks(self):
+    # Every benchmark shares the metrics:
+    self._write([(0, i, "time", i, i % 100) for i, _ in enumerate([0] * 200)])
+    s = load(self._path)
+    self.assertTrue(s.metrics == ["time"])
+    self.assertTrue(len(s.values("time")) == 200)
+    self.assertTrue(s.values("time", 99).tolist() == [99, 199])
+    self.assertTrue([b for _, b, _ in s.by_iteration()][98:101] ==
+                    [98, 99, 0])
+
+  def test_store_resume(self):
+    self._write([(0.1, 0, "time", 1)])
+    self._write([(0.2, 1, "utime", 2)], resume=True)
+    s = load(self._path)
+    self.assertTrue(s.metrics == ["time", "utime"])
+    self.assertTrue(s.values("time").tolist() == [1])
+    self.assertTrue(s.values("utime").tolist() == [2])
+
+  def test_store_no_resume(self):
+    self._write([(0.1, 0, "time", 1)])
+    self._write([(0.2, 0, "time", 2)])
+    self.assertTrue(load(self._path).values("time").tolist() == [2])
+
+  def test_store_partial_record(self):
+    self._write([(0.1, 0, "time", 1)])
+    with open(self._path, "ab") as f:
+      f.write(b"\x00" * 5)
+    self.assertTrue(len(load(self._path)) == 1)
+    self._write([(0.2, 1, "time", 2)], resume=True)
+    self.assertTrue(load(self._path).values("time").tolist() == [1, 2])
+
+  def test_store_invalid(self):
+    with open(self._path, "wb") as f:
+      f.write(b"foo")
+    self.assertRaises(StoreException, load, self._path)
+    self.assertRaises(StoreException, Store, self._path, True)
+
+  def test_store_too_many_benchmarks(self):
+    store = Store(self._path)
+    self.assertRaises(StoreException, store.append, 0, 0, "time", 1,
+                      MAX_BENCHMARKS)
+    store.close()
+
+  def test_store_name_too_long(self):
+    store = Store(self._path)
+    self.assertRaises(StoreException, store.append, 0, 0, "x" * 64, 1)
+    store.close()
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,45 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+
+from srtime.stream import *
+
+
+class TestStream(TestCase):
+
+  def setUp(self):
+    self._dir = tempfile.mkdtemp()
+    self._path = os.path.join(self._dir, "stream.jsonl")
+
+  def tearDown(self):
+    shutil.rmtree(self._dir)
+
+  def _read(self):
+    with open(self._path) as f:
+      return [json.loads(line) for line in f]
+
+  def test_stream_write(self):
+    stream = Stream(self._path)
+    stream.write({"n": 1})
+    stream.write({"n": 2, "mean": None})
+    stream.close()
+    self.assertTrue(self._read() == [{"n": 1}, {"n": 2, "mean": None}])
+
+  def test_stream_interval(self):
+    stream = Stream(self._path, interval=0)
+    stream.write({"n": 1})
+    # The update is flushed without closing the stream:
+    self.assertTrue(self._read() == [{"n": 1}])
+    stream.close()
+
+    stream = Stream(self._path, interval=3600)
+    stream.write({"n": 1})
+    self.assertTrue(self._read() == [])
+    stream.close()
+    self.assertTrue(self._read() == [{"n": 1}])
+
+
+if __name__ == '__main__':
+  main()
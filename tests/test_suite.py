@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+
+from srtime.exceptions import *
+from srtime.parser import ArgumentParser
+
+from srtime.suite import *
+
+
+# The defaults of a quick suite: filtered results, so that their
+# variance does not depend on the machine.
+DEFAULTS = """
+[defaults]
+spawn = "posix_spawn"
+filter = true
+quiet = true
+min_iterations = 3
+"""
+
+
+class TestSuite(TestCase):
+
+  def setUp(self):
+    self._dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self._dir)
+
+  # Return a suite of a TOML string, with a time budget of "t" seconds,
+  # and any other command line arguments "args".
+  def _suite(self, toml, t=1, args=[]):
+    path = os.path.join(self._dir, "suite.toml")
+    with open(path, "w") as f:
+      f.write(toml)
+    return Suite(path, ArgumentParser().parse_args(["--suite", path,
+                                                    "-t", str(t)] + args))
+
+  def test_suite(self):
+    suite = self._suite(DEFAULTS + """
+[[benchmark]]
+name = "stable"
+command = "echo 1"
+
+[[benchmark]]
+command = "sh -c 'echo 0.0$$'"
+""")
+    self.assertTrue(suite.names == ["stable", "sh -c 'echo 0.0$$'"])
+    suite.run()
+    stable, noisy = [timer.benchmarks()[0] for timer in suite.timers()]
+    # The stable benchmark cannot be made more precise, so the rest of
+    # the budget is spent on the noisy one:
+    self.assertTrue(stable.n == 3)
+    self.assertTrue(noisy.n > 3)
+    self.assertTrue(sum(suite.elapsed) <= 1.5)
+
+  def test_suite_target_precision(self):
+    suite = self._suite(DEFAULTS + """
+[[benchmark]]
+command = "echo 1"
+target_precision = 0.1
+""", t=60)
+    suite.run()
+    self.assertTrue(suite.timers()[0].benchmarks()[0].n == 3)
+
+  def test_suite_no_min_iterations(self):
+    suite = self._suite(DEFAULTS + """
+[[benchmark]]
+command = "echo 1"
+min_iterations = 0
+
+[[benchmark]]
+command = "echo 2"
+min_iterations = 0
+""")
+    suite.run()
+    self.assertTrue(all(timer.benchmarks()[0].n > 0
+                        for timer in suite.timers()))
+
+  def test_suite_open_time(self):
+    suite = self._suite(DEFAULTS + """
+[[benchmark]]
+command = "true"
+filter = false
+subtract_overhead = true
+calibration_time = 1
+""", t=2)
+    suite.run()
+    # The calibration is not counted as the cost of the iterations:
+    timer = suite.timers()[0]
+    self.assertTrue(timer.open_time >= 1)
+    self.assertTrue(timer.benchmarks()[0].n > 3)
+
+  def test_suite_format_no_results(self):
+    suite = self._suite(DEFAULTS + """
+[[benchmark]]
+name = "a"
+command = "echo 1"
+""")
+    lines = suite.format(fmt="txt").splitlines()
+    self.assertTrue(lines[0].split() == ["name", "n", "precision", "elapsed"])
+    self.assertTrue(lines[1].split() == ["a", "0", "0"])
+
+  def test_suite_format(self):
+    suite = self._suite(DEFAULTS + """
+[[benchmark]]
+name = "a"
+command = "echo 1"
+""")
+    suite.run()
+    lines = suite.format().splitlines()
+    self.assertTrue(lines[0].split() == ["name", "mean", "c1", "c2", "n",
+                                         "precision", "elapsed"])
+    self.assertTrue(lines[1].split()[0] == "a")
+    self.assertTrue([float(x) for x in lines[1].split()[1:5]] == [1, 1, 1, 3])
+    csv = suite.format(fmt="csv").splitlines()
+    self.assertTrue(csv[0].startswith('"name","mean"'))
+    self.assertTrue(csv[1].split(",")[:2] == ['"a"', "1.0"])
+
+  def test_suite_format_metrics(self):
+    suite = self._suite("""
+[defaults]
+spawn = "posix_spawn"
+quiet = true
+
+[[benchmark]]
+name = "a"
+command = "true"
+
+[[benchmark]]
+name = "b"
+command = "true"
+metrics = ["maxrss"]
+""", t=0, args=["-M", "time,utime"])
+    suite.run()
+    lines = [line.split() for line in suite.format().splitlines()]
+    self.assertTrue(lines[0][:3] == ["name", "metric", "mean"])
+    self.assertTrue([line[:2] for line in lines[1:]] ==
+                    [["a", "time"], ["a", "utime"], ["b", "maxrss"]])
+
+  def test_suite_invalid(self):
+    for toml in ["", "x = 1", "[[benchmark]]\nname = 'a'",
+                 "[[benchmark]]\ncommand = 'a'\nfoo = 1",
+                 "[[benchmark]]\ncommand = 'a'\ntarget_time = 1",
+                 "[[benchmark]]\ncommand = 'a'\n[[benchmark]]\ncommand = 'a'",
+                 "[[benchmark]]\ncommand = 'a'\nconfidence = 2",
+                 "[[benchmark]]\ncommand = 'a'\nspawn = 'foo'",
+                 "[[benchmark"]:
+      self.assertRaises(SuiteException, self._suite, toml)
+
+  def test_suite_missing(self):
+    self.assertRaises(SuiteException, Suite, "nosuchfile.toml",
+                      ArgumentParser().parse_args(["--suite", "x"]))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,353 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+
+from srtime.config import Config
+from srtime.exceptions import *
+from srtime.parser import ArgumentParser
+from srtime.store import load
+from srtime.timer import *
+
+
+# Return the options to quickly time a command.
+def options(args):
+  args = ArgumentParser().parse_args(["-s", "posix_spawn", "-t", "0"] + args)
+  args.quiet = True
+  return args
+
+
+class TestTimer(TestCase):
+
+  def test_timer_min_iterations(self):
+    timer = Timer(options(["-m", "7", "true"]))
+    self.assertTrue(len(timer.results()) == 7)
+    self.assertTrue(timer.accumulator().n == 7)
+    self.assertTrue(timer.stats().n == 7)
+
+  def test_timer_usage(self):
+    timer = Timer(options(["-m", "3", "true"]))
+    for metric in METRICS:
+      self.assertTrue(len(timer.results(metric)) == 3)
+
+  def test_timer_warmup(self):
+    timer = Timer(options(["-m", "3", "-w", "2", "true"]))
+    self.assertTrue(len(timer.warmup()) == 2)
+    self.assertTrue(len(timer.results()) == 3)
+    self.assertTrue(timer.stats().warmup_n == 2)
+
+  def test_timer_target_precision(self):
+    # A very loose precision is met as soon as possible:
+    args = options(["-m", "3", "-P", "1000", "true"])
+    args.target_time = 60
+    self.assertTrue(len(Timer(args).results()) == 3)
+
+  def test_timer_invalid_confidence(self):
+    self.assertRaises(InvalidParameterException, Timer,
+                      options(["-c", "1.5", "true"]))
+
+  def test_timer_invalid_resamples(self):
+    self.assertRaises(InvalidParameterException, Timer,
+                      options(["--resamples", "0", "true"]))
+
+  def test_timer_maxrss_warning(self):
+    with self.assertLogs(level="WARNING") as logs:
+      Timer(options(["-m", "1", "-M", "maxrss", "true"]))
+    self.assertTrue("maxrss is at least" in logs.output[0])
+
+  def test_timer_pty(self):
+    timer = Timer(options(["-s", "pty", "-m", "5", "true"]))
+    self.assertTrue(timer.stats().median < 0.05)
+
+  def test_timer_bootstrap_subtract_overhead(self):
+    self.assertRaises(InvalidParameterException, Timer,
+                      options(["--ci-method", "bootstrap",
+                               "--subtract-overhead", "true"]))
+
+  def test_timer_bootstrap(self):
+    timer = Timer(options(["-m", "5", "--ci-method", "bootstrap",
+                           "--resamples", "100", "true"]))
+    stats = timer.stats()
+    self.assertTrue(stats.c1 <= stats.mean <= stats.c2)
+    self.assertTrue(stats.median_c1 <= stats.median <= stats.median_c2)
+
+  def test_timer_counts(self):
+    timer = Timer(options(["-m", "5", "-w", "1", "-i", "printf '1\\n2\\n'"]))
+    self.assertTrue(timer.benchmarks()[0].counts() == [2, 2, 2])
+
+  def test_timer_filter_kv(self):
+    timer = Timer(options(["-m", "3", "--filter-kv", "ms,n",
+                           "printf 'log\\nms=2 n=1\\nms=4\\n'"]))
+    self.assertTrue(len(timer.results()) == 3)
+    self.assertTrue(timer.results("ms") == [2, 4] * 3)
+    self.assertTrue(timer.results("n") == [1] * 3)
+    self.assertTrue(timer.stats("ms").mean == 3)
+
+  def test_timer_filter_kv_resume(self):
+    path = tempfile.mkdtemp()
+    try:
+      output = os.path.join(path, "samples.bin")
+      args = ["-o", output, "--filter-kv", "ms", "echo ms=1"]
+      Timer(options(["-m", "2"] + args))
+      timer = Timer(options(["-m", "3", "--resume"] + args))
+      self.assertTrue(timer.results("ms") == [1] * 3)
+    finally:
+      shutil.rmtree(path)
+
+  def test_timer_output_many_commands(self):
+    path = tempfile.mkdtemp()
+    try:
+      output = os.path.join(path, "samples.bin")
+      commands = ["echo {0}".format(i) for i in range(70)]
+      args = ["-o", output, "-M", "all", "-C"] + commands
+      Timer(options(["-m", "1"] + args))
+      samples = load(output)
+      self.assertTrue(len(samples.values("time")) == 70)
+      self.assertTrue(len(samples.values("utime", 69)) == 1)
+      timer = Timer(options(["-m", "2", "--resume"] + args))
+      self.assertTrue(all(b.n == 2 for b in timer.benchmarks()))
+    finally:
+      shutil.rmtree(path)
+
+  def test_timer_calibrate_filter_kv(self):
+    # The calibration command times only, without extracted metrics:
+    overhead = calibrate(options(["--filter-kv", "ms", "--calibration-time",
+                                  "0.1", "echo ms=1"]))
+    self.assertTrue(overhead.n > 0)
+
+  def test_timer_invalid_filtered_metric(self):
+    self.assertRaises(InvalidParameterException, Timer,
+                      options(["--filter-kv", "ms", "-M", "bytes", "true"]))
+
+  def test_timer_outliers(self):
+    timer = Timer(options(["-m", "10", "--outliers", "reject", "true"]))
+    benchmark = timer.benchmarks()[0]
+    robust = benchmark.robust_accumulator()
+    self.assertTrue(robust.n <= 10)
+    self.assertTrue(len(benchmark.robust_results()) <= 10)
+    stats = timer.stats()
+    self.assertTrue(stats.all_n == 10)
+    self.assertTrue(stats.n + stats.outliers_mild +
+                    stats.outliers_severe == 10)
+
+  def test_timer_iteration_timeout(self):
+    timer = Timer(options(["-m", "2", "--iteration-timeout", "0.05",
+                           "sleep 1"]))
+    benchmark = timer.benchmarks()[0]
+    self.assertTrue(benchmark.timeouts == 2)
+    self.assertTrue(benchmark.n == 0)
+
+  def test_timer_max_timeouts(self):
+    self.assertRaises(TimeoutException, Timer,
+                      options(["-m", "5", "--iteration-timeout", "0.05",
+                               "--max-timeouts", "2", "sleep 1"]))
+
+  def test_timer_invalid_iteration_timeout(self):
+    self.assertRaises(InvalidParameterException, Timer,
+                      options(["--iteration-timeout", "0", "true"]))
+
+  def test_timer_sweep(self):
+    timer = Timer(options(["-m", "3", "--sweep", "k=1,2", "--",
+                           "true {k}"]))
+    benchmarks = timer.benchmarks()
+    self.assertTrue([b.point for b in benchmarks] == [{"k": "1"},
+                                                      {"k": "2"}])
+    self.assertTrue([b.command for b in benchmarks] == ["true 1", "true 2"])
+    self.assertTrue([len(b.results()) for b in benchmarks] == [3, 3])
+    self.assertTrue(timer.comparisons() == [])
+
+  def test_timer_python(self):
+    timer = Timer(options(["-m", "3", "--python", "os:getpid"]))
+    self.assertTrue(len(timer.results()) == 3)
+    self.assertTrue(len(timer.results("utime")) == 3)
+    self.assertTrue(timer.stats().mean > 0)
+
+  def test_timer_python_compare(self):
+    timer = Timer(options(["-C", "-m", "3", "--python", "os:getpid",
+                           "os:getcwd"]))
+    self.assertTrue([len(b.results()) for b in timer.benchmarks()] == [3, 3])
+
+  def test_timer_python_invalid(self):
+    for args in [["-j", "2"], ["--subtract-overhead"],
+                 ["--iteration-timeout", "1"]]:
+      self.assertRaises(InvalidParameterException, Timer,
+                        options(args + ["--python", "os:getpid"]))
+
+  def test_timer_cache(self):
+    timer = Timer(options(["-m", "3", "--cache", "warm", "--cache-path",
+                           "srtime", "true"]))
+    self.assertTrue(timer.cache_times.n == 3)
+
+  def test_timer_stream(self):
+    path = tempfile.mkdtemp()
+    try:
+      stream = os.path.join(path, "stream.jsonl")
+      Timer(options(["-m", "3", "-P", "0.5", "--stream", stream, "true"]))
+      with open(stream) as f:
+        updates = [json.loads(line) for line in f]
+      self.assertTrue([u["iteration"] for u in updates] == [0, 1, 2])
+      self.assertTrue([u["n"] for u in updates] == [1, 2, 3])
+      self.assertTrue(all(len(u["time"]) == 1 for u in updates))
+      self.assertTrue(updates[0]["c1"] is None)
+      last = updates[-1]
+      self.assertTrue(last["c1"] <= last["mean"] <= last["c2"])
+      self.assertTrue(last["eta"] >= 0)
+    finally:
+      shutil.rmtree(path)
+
+  def test_timer_invalid_effect_size(self):
+    self.assertRaises(InvalidParameterException, Timer,
+                      options(["--effect-size", "-1", "true"]))
+
+  def test_timer_invalid_stream_interval(self):
+    self.assertRaises(InvalidParameterException, Timer,
+                      options(["--stream-interval", "-1", "true"]))
+
+  def test_timer_sketch(self):
+    timer = Timer(options(["-m", "2", "--sketch", "--reservoir", "10",
+                           "-i", "seq 1 100"]))
+    benchmark = timer.benchmarks()[0]
+    self.assertTrue(benchmark.n == 100)
+    # Only the reservoir sample of the results is kept:
+    self.assertTrue(len(timer.results()) == 10)
+    self.assertTrue(benchmark.counts() is None)
+    stats = timer.stats()
+    self.assertTrue(stats.n == 100)
+    self.assertTrue(stats.mean == 50.5)
+    self.assertTrue(stats.median_c1 <= stats.median <= stats.median_c2)
+
+  def test_timer_warmup_empty_iteration(self):
+    timer = Timer(options(["-w", "auto", "--warmup-window", "2", "true"]),
+                  start=False)
+    benchmark = timer.benchmarks()[0]
+    # An iteration without results and a timeout within the warmup:
+    benchmark.record([10], {"maxrss": 0})
+    benchmark.record([], {"maxrss": 1})
+    benchmark.record_timeout()
+    for i in [3, 4, 5, 6]:
+      benchmark.record([1], {"maxrss": i})
+    self.assertTrue(not benchmark.warming_up())
+    self.assertTrue(benchmark.warmup() == [10])
+    self.assertTrue(benchmark.results() == [1, 1, 1, 1])
+    self.assertTrue(benchmark.results("maxrss") == [3, 4, 5, 6])
+    self.assertTrue(benchmark.counts() == [1, 1, 1, 1])
+    self.assertTrue(benchmark.timeouts == 0)
+
+  def test_timer_sketch_warmup(self):
+    timer = Timer(options(["-m", "20", "-w", "auto", "--warmup-window", "2",
+                           "--sketch", "-i", "echo 1"]))
+    self.assertTrue(timer.stats().median == 1)
+    self.assertTrue(timer.benchmarks()[0]._results == [])
+
+  def test_timer_sketch_invalid(self):
+    for args in [["--ci-method", "bootstrap"], ["--outliers", "flag"],
+                 ["--sketch-k", "1"], ["--reservoir", "-1"]]:
+      self.assertRaises(InvalidParameterException, Timer,
+                        options(args + ["--sketch", "true"]))
+
+  def test_timer_environment(self):
+    timer = Timer(options(["-m", "3", "-s", "pipe", "--cpus", "0",
+                           "--nice", "1", "--env-size", "100000", "-i",
+                           "sh -c 'echo ${#SRTIME_PAD}'"]))
+    self.assertTrue(len(set(timer.results())) == 1)
+
+  def test_timer_environment_invalid(self):
+    for args in [["--nice", "20"], ["--cpus", "0", "--python", "os:getpid"],
+                 ["-s", "posix_spawn", "--no-aslr"]]:
+      self.assertRaises(InvalidParameterException, Timer,
+                        options(["-s", "pipe"] + args + ["true"]))
+
+  def test_timer_config(self):
+    timer = Timer(Config(["true"], spawn="posix_spawn", target_time=0,
+                         min_iterations=3))
+    self.assertTrue(len(timer.results()) == 3)
+
+  def test_timer_samples(self):
+    timer = Timer(options(["-m", "3", "-i", "echo 1"]), start=False)
+    self.assertTrue(timer.results() == [])
+    samples = list(timer.samples())
+    self.assertTrue([s.iteration for s in samples] == [0, 1, 2])
+    self.assertTrue(all(s.times == [1] for s in samples))
+    self.assertTrue(samples[-1].elapsed > 0)
+    self.assertTrue(len(timer.results()) == 3)
+    self.assertRaises(RuntimeError, timer.run)
+
+  def test_timer_samples_cancel(self):
+    timer = Timer(options(["-m", "100", "true"]), start=False)
+    for sample in timer.samples():
+      if sample.iteration == 1:
+        timer.cancel()
+    self.assertTrue(timer.stats().n == 2)
+
+  def test_timer_samples_parallel(self):
+    timer = Timer(options(["-m", "100", "-j", "2", "true"]), start=False)
+    for sample in timer.samples():
+      break
+    # The workers are stopped after the iterations in progress:
+    self.assertTrue(timer.stats().n < 100)
+
+  def test_timer_callback(self):
+    samples = []
+    timer = Timer(options(["-C", "-m", "2", "true", "echo"]),
+                  callback=samples.append)
+    self.assertTrue(len(samples) == 4)
+    self.assertTrue(sorted(s.benchmark.command for s in samples) ==
+                    ["echo", "echo", "true", "true"])
+
+  def test_timer_asamples(self):
+    async def run(timer):
+      return [sample async for sample in timer.asamples()]
+
+    async def gather(timers):
+      return await asyncio.gather(*map(run, timers))
+
+    timers = [Timer(options(["-m", "3", "true"]), start=False)
+              for _ in range(3)]
+    results = asyncio.run(gather(timers))
+    self.assertTrue([len(samples) for samples in results] == [3, 3, 3])
+    self.assertTrue(all(timer.stats().n == 3 for timer in timers))
+
+  def test_timer_asamples_cancel(self):
+    async def cancel(timer):
+      task = asyncio.ensure_future(run(timer))
+      await asyncio.sleep(0.3)
+      task.cancel()
+      await asyncio.gather(task, return_exceptions=True)
+
+    async def run(timer):
+      async for _ in timer.asamples():
+        pass
+
+    timer = Timer(options(["-m", "100", "sleep 0.05"]), start=False)
+    asyncio.run(cancel(timer))
+    self.assertTrue(0 < timer.stats().n < 100)
+
+  def test_timer_process_exception(self):
+    self.assertRaises(ProcessException, Timer, options(["false"]))
+
+  def test_timer_compare(self):
+    timer = Timer(options(["-C", "-m", "5", "true", "sleep 0.01"]))
+    benchmarks = timer.benchmarks()
+    self.assertTrue([b.command for b in benchmarks] == ["true", "sleep 0.01"])
+    self.assertTrue([len(b.results()) for b in benchmarks] == [5, 5])
+    comparisons = timer.comparisons()
+    self.assertTrue(len(comparisons) == 1)
+    self.assertTrue(comparisons[0].speedup < 1)
+
+  def test_timer_compare_one_command(self):
+    self.assertRaises(InvalidParameterException, Timer,
+                      options(["-C", "true"]))
+
+  def test_timer_compare_resolved(self):
+    args = options(["-C", "-m", "5", "true", "sleep 0.05"])
+    args.target_time = 60
+    timer = Timer(args)
+    # The difference is resolved long before the target time:
+    self.assertTrue(timer.resolved())
+    self.assertTrue(len(timer.results()) < 50)
+
+
+if __name__ == '__main__':
+  main()